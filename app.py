@@ -1,22 +1,37 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 import json
 import os
+import sys
 from datetime import datetime
 import uuid
 
+from assets import StaticAssets
+from authors import AuthorCache
+from credentials import HasherBusy, PasswordHasher
+from pagination import page_args, page_response
+from reactions import ReactionBuffer
+from store import MemoryStore
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'aura_social_pro_secret_key_2024')
+# The shared templates link CSS/JS through asset_url()
+StaticAssets(app)
 
 # In-memory database (replace with real database in production)
-users_db = {}
-posts_db = []
+store = MemoryStore()
+reaction_buffer = ReactionBuffer(store)
+authors = AuthorCache(store)
+hasher = PasswordHasher()
 
 class User:
-    def __init__(self, username, email, password):
+    __slots__ = ('id', 'username', 'email', 'password', 'display_name', 'bio', 'avatar', 'created_at',
+                 'followers', 'following')
+
+    def __init__(self, username, email, password_hash):
         self.id = str(uuid.uuid4())
         self.username = username
         self.email = email
-        self.password = password
+        self.password = password_hash
         self.display_name = username
         self.bio = "Welcome to my Aura! ✨"
         self.avatar = "👤"
@@ -25,16 +40,16 @@ class User:
         self.following = []
 
 class Post:
+    __slots__ = ('id', 'seq', 'user_id', 'content', 'timestamp', 'likes', 'comments')
+
     def __init__(self, user_id, content):
         self.id = str(uuid.uuid4())
+        self.seq = None
         self.user_id = user_id
         self.content = content
-        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.timestamp = sys.intern(datetime.now().strftime("%Y-%m-%d %H:%M"))
         self.likes = 0
         self.comments = []
-        self.username = ""
-        self.display_name = ""
-        self.avatar = "👤"
 
 # Routes
 @app.route('/')
@@ -73,16 +88,18 @@ def api_register():
         if not username or not email or not password:
             return jsonify({'success': False, 'error': 'All fields are required'})
 
-        if username in users_db:
+        if store.has_username(username):
             return jsonify({'success': False, 'error': 'Username already exists'})
 
-        user = User(username, email, password)
-        users_db[username] = user
+        user = User(username, email, hasher.hash(password))
+        store.add_user(user)
 
         session['user_id'] = user.id
         session['username'] = user.username
 
         return jsonify({'success': True, 'message': 'Registration successful'})
+    except HasherBusy:
+        return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': 'Registration failed'})
 
@@ -96,14 +113,22 @@ def api_login():
         if not username or not password:
             return jsonify({'success': False, 'error': 'Username and password are required'})
 
-        user = users_db.get(username)
-        if not user or user.password != password:
+        user = store.get_user_by_username(username)
+        if not user:
             return jsonify({'success': False, 'error': 'Invalid credentials'})
 
+        ok, needs_rehash = hasher.verify(password, user.password)
+        if not ok:
+            return jsonify({'success': False, 'error': 'Invalid credentials'})
+        if needs_rehash:
+            store.update_user(user, password=hasher.hash(password))
+
         session['user_id'] = user.id
         session['username'] = user.username
 
         return jsonify({'success': True, 'message': 'Login successful'})
+    except HasherBusy:
+        return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': 'Login failed'})
 
@@ -118,7 +143,7 @@ def api_current_user():
         return jsonify({'error': 'Not logged in'})
 
     username = session['username']
-    user = users_db.get(username)
+    user = store.get_user_by_username(username)
     
     if not user:
         return jsonify({'error': 'User not found'})
@@ -135,40 +160,35 @@ def api_current_user():
 
 @app.route('/api/posts')
 def api_posts():
-    # Add user info to posts
-    for post in posts_db:
-        user = next((u for u in users_db.values() if u.id == post.user_id), None)
-        if user:
-            post.username = user.username
-            post.display_name = user.display_name
-            post.avatar = user.avatar
+    before, limit = page_args(request.args)
+    posts, next_cursor = store.timeline_page(before, limit)
 
+    # Author fields are joined from the cache, not stored on posts
     posts_data = [{
         'id': post.id,
         'content': post.content,
         'timestamp': post.timestamp,
-        'likes': post.likes,
-        'username': post.username,
-        'display_name': post.display_name,
-        'avatar': post.avatar
-    } for post in posts_db]
+        'likes': reaction_buffer.counts(post)['likes'],
+        **authors.get(post.user_id)
+    } for post in posts]
 
-    return jsonify(posts_data)
+    return jsonify(page_response(posts_data, next_cursor))
 
 @app.route('/api/user_posts')
 def api_user_posts():
     if 'user_id' not in session:
-        return jsonify([])
+        return jsonify(page_response([], None))
 
-    user_posts = [post for post in posts_db if post.user_id == session['user_id']]
+    before, limit = page_args(request.args)
+    user_posts, next_cursor = store.author_page(session['user_id'], before, limit)
     posts_data = [{
         'id': post.id,
         'content': post.content,
         'timestamp': post.timestamp,
-        'likes': post.likes
+        'likes': reaction_buffer.counts(post)['likes']
     } for post in user_posts]
 
-    return jsonify(posts_data)
+    return jsonify(page_response(posts_data, next_cursor))
 
 @app.route('/api/create_post', methods=['POST'])
 def api_create_post():
@@ -183,14 +203,7 @@ def api_create_post():
             return jsonify({'success': False, 'error': 'Post content cannot be empty'})
 
         post = Post(session['user_id'], content)
-        
-        user = users_db.get(session['username'])
-        if user:
-            post.username = user.username
-            post.display_name = user.display_name
-            post.avatar = user.avatar
-
-        posts_db.append(post)
+        store.add_post(post)
         return jsonify({'success': True, 'message': 'Post created successfully'})
 
     except Exception as e:
@@ -202,10 +215,10 @@ def api_like_post(post_id):
         return jsonify({'success': False, 'error': 'Not logged in'})
 
     try:
-        post = next((p for p in posts_db if p.id == post_id), None)
+        post = store.get_post(post_id)
         if post:
-            post.likes += 1
-            return jsonify({'success': True, 'likes': post.likes})
+            likes = reaction_buffer.add(post, 'likes')
+            return jsonify({'success': True, 'likes': likes})
         else:
             return jsonify({'success': False, 'error': 'Post not found'})
     except Exception as e:
@@ -213,21 +226,15 @@ def api_like_post(post_id):
 
 if __name__ == '__main__':
     # Create sample data for demonstration
-    if not users_db:
-        sample_user = User('demo', 'demo@aura.social', 'demo')
-        users_db['demo'] = sample_user
+    if not store.count_users():
+        sample_user = User('demo', 'demo@aura.social', hasher.hash('demo'))
+        store.add_user(sample_user)
         
         sample_post = Post(sample_user.id, "Welcome to Aura Social! 🌟 This is a sample post to get things started. Share your aura with the world!")
-        sample_post.username = sample_user.username
-        sample_post.display_name = sample_user.display_name
-        sample_post.avatar = sample_user.avatar
-        posts_db.append(sample_post)
+        store.add_post(sample_post)
 
         sample_post2 = Post(sample_user.id, "Just discovered this amazing platform! The design is incredible and the community seems so friendly. Can't wait to connect with everyone! ✨")
-        sample_post2.username = sample_user.username
-        sample_post2.display_name = sample_user.display_name
-        sample_post2.avatar = sample_user.avatar
-        posts_db.append(sample_post2)
+        store.add_post(sample_post2)
 
     # Production settings
     debug_mode = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,134 @@
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, render_template, request, send_from_directory, url_for
+
+from compression import COMPRESSIBLE, available_encodings, compress, negotiate
+
+# Fingerprinted URLs never change content, so browsers and CDNs may keep them for good
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Assets are compressed once at startup, so spend the CPU on the smallest output
+STATIC_LEVELS = {'gzip': 9, 'br': 11}
+
+class Asset:
+    __slots__ = ('data', 'mimetype', 'etag', 'encoded')
+
+    def __init__(self, data, mimetype, etag, encoded):
+        self.data = data
+        self.mimetype = mimetype
+        self.etag = etag
+        self.encoded = encoded
+
+class StaticAssets:
+    """Fingerprinted, precompressed copies of the files under ``static/``.
+
+    At startup every file is hashed and held in memory with its gzip (and
+    brotli, if installed) encodings.  The template global
+    ``asset_url('css/aura.css')`` gives ``/static/css/aura.<hash>.css``.
+    That URL is served from memory with a one-year ``immutable``
+    Cache-Control and the smallest encoding the client accepts; a new
+    deploy that changes the file changes the URL.  Unfingerprinted names
+    (e.g. favicon.ico) still come from disk with a short ``max_age``.
+    The files are read on first use rather than at startup.
+    """
+
+    def __init__(self, app=None, max_age=300, min_size=256):
+        self.max_age = max_age
+        self.min_size = min_size
+        self.folder = None
+        self.urls = {}
+        self.assets = {}
+        self._scanned = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        app.add_template_global(self.url, 'asset_url')
+        app.view_functions['static'] = self.serve
+
+    def scan(self):
+        urls, assets = {}, {}
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                filename = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    data = f.read()
+                digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+                stem, ext = os.path.splitext(filename)
+                fingerprinted = f'{stem}.{digest}{ext}'
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                encoded = {}
+                if mimetype in COMPRESSIBLE and len(data) >= self.min_size:
+                    for encoding in available_encodings():
+                        body = compress(data, encoding, STATIC_LEVELS[encoding])
+                        if len(body) < len(data):
+                            encoded[encoding] = body
+                urls[filename] = fingerprinted
+                assets[fingerprinted] = Asset(data, mimetype, digest, encoded)
+        self.urls, self.assets = urls, assets
+        self._scanned = True
+
+    def _ensure_scanned(self):
+        if not self._scanned:
+            with self._lock:
+                if not self._scanned:
+                    self.scan()
+
+    def url(self, filename):
+        self._ensure_scanned()
+        return url_for('static', filename=self.urls.get(filename, filename))
+
+    def serve(self, filename):
+        self._ensure_scanned()
+        asset = self.assets.get(filename)
+        if asset is None:
+            return send_from_directory(self.folder, filename, max_age=self.max_age)
+
+        encoding = negotiate(request.accept_encodings, asset.encoded) if asset.encoded else None
+        response = Response(asset.encoded[encoding] if encoding else asset.data, mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.encoded:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(f'{asset.etag}-{encoding}' if encoding else asset.etag)
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response.make_conditional(request)
+
+class PageCache:
+    """Rendered bytes of templates that take no per-request context.
+
+    The page templates only differ by the user's data, which they fetch
+    from the API, so each is rendered once and reused with a content-hash
+    ETag.  Browsers revalidate every time (``no-cache``) so a deploy's new
+    asset URLs are picked up at once, and unchanged pages cost a bodiless
+    304.  Disabled while templates auto-reload (debug mode).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def render(self, template):
+        page = self._pages.get(template)
+        if page is None:
+            body = render_template(template).encode()
+            page = (body, hashlib.blake2b(body, digest_size=12).hexdigest())
+            if not self.app.jinja_env.auto_reload:
+                with self._lock:
+                    self._pages[template] = page
+
+        body, etag = page
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
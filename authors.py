@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+UNKNOWN_AUTHOR = {'username': 'Unknown', 'display_name': 'Unknown', 'avatar': '👤'}
+
+class AuthorCache:
+    """LRU cache of the author fields feed serialization joins onto posts.
+
+    Posts only carry ``user_id``; the card is looked up here at read time,
+    so a profile edit is one ``invalidate`` call instead of rewriting every
+    post the author ever made.
+    """
+
+    def __init__(self, store, maxsize=10000):
+        self.store = store
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._cards = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            card = self._cards.get(user_id)
+            if card is not None:
+                self.hits += 1
+                self._cards.move_to_end(user_id)
+                return card
+            self.misses += 1
+
+        user = self.store.get_user(user_id)
+        if user is None:
+            return UNKNOWN_AUTHOR
+        card = {'username': user.username, 'display_name': user.display_name, 'avatar': user.avatar}
+
+        with self._lock:
+            self._cards[user_id] = card
+            if len(self._cards) > self.maxsize:
+                self._cards.popitem(last=False)
+        return card
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._cards.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
@@ -0,0 +1,351 @@
+"""Throughput and p50/p99 latency of the main API routes at a given data scale.
+
+    python -m benchmarks.bench_api [--posts 10000] [--backend memory|sqlite]
+                                   [--target client|gunicorn] [--json]
+                                   [--save-baseline FILE] [--baseline FILE]
+
+The store is seeded from a fixed ``--seed`` (users, posts with a small
+vocabulary so search has realistic posting lists), then each scenario
+sends ``--requests`` requests from ``--concurrency`` threads, each with
+its own logged-in session.  ``client`` drives the app in-process through
+Flask's test client; ``gunicorn`` starts ``gunicorn -c gunicorn.conf.py
+wsgi:app`` on the seeded SQLite file and talks HTTP to it.  Rate limits
+are disabled for the run.
+
+``--baseline`` compares against an earlier ``--save-baseline`` run and
+exits 1 if any scenario's p50, p99 or throughput regressed by more than
+``--tolerance``.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+WORDS = ('aura energy morning meditation vibes friends coffee sunset music travel code garden '
+         'river mountain city night dream light ocean book movie game run yoga art').split()
+BENCH_PASSWORD = 'bench-password'
+LOGIN_USERS = 20
+ADMIN = ('admin', 'admin')
+
+SCENARIOS = ('feed', 'feed_deep', 'feed_hot', 'create_post', 'like_post', 'login', 'search',
+             'admin_stats', 'admin_users', 'admin_posts')
+
+def content(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))) + f' #{rng.randint(0, 999)}'
+
+# ---------- Seeding ---------- #
+def make_users(n, hasher):
+    from models import User
+    # Only the login users need a real hash; the rest never log in
+    login_hash = hasher.hash_sync(BENCH_PASSWORD)
+    users = []
+    for i in range(n):
+        users.append(User(f'bench{i}', f'bench{i}@aura.social', login_hash if i < LOGIN_USERS else '!'))
+    return users
+
+def make_posts(n, users, rng):
+    from models import Post
+    for _ in range(n):
+        yield Post(rng.choice(users).id, content(rng))
+
+def seed_sqlite(path, users, posts, progress):
+    """Bulk insert straight into a fresh file, one transaction per 10k rows"""
+    from database import SQL_INSERT_USER, get_db_connection, init_db
+    init_db(path)
+    conn = get_db_connection(path)
+    with conn:
+        conn.executemany(SQL_INSERT_USER, [
+            (u.id, u.username, u.email, u.password, u.display_name, u.bio, u.avatar, u.created_at,
+             u.is_admin, u.is_active, u.last_login) for u in users])
+    sql = ('INSERT INTO posts (id, seq, user_id, content, timestamp, likes, loves, laughs, wows, is_approved, reports) '
+           'VALUES (?, ?, ?, ?, ?, 0, 0, 0, 0, 1, 0)')
+    batch = []
+    sample = []
+    for seq, post in enumerate(posts, 1):
+        batch.append((post.id, seq, post.user_id, post.content, post.timestamp))
+        if len(sample) < 1000:
+            sample.append(post.id)
+        if len(batch) == 10000:
+            with conn:
+                conn.executemany(sql, batch)
+            batch = []
+            progress(seq)
+    with conn:
+        conn.executemany(sql, batch)
+    return sample
+
+def seed_memory(main, users, posts, progress):
+    store = main.store
+    sample = []
+    for user in users:
+        store.add_user(user)
+    for i, post in enumerate(posts, 1):
+        store.add_post(post)
+        main.search_index.add(post)
+        if len(sample) < 1000:
+            sample.append(post.id)
+        if i % 10000 == 0:
+            progress(i)
+    return sample
+
+# ---------- Drivers ---------- #
+class ClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+
+class HTTPSession:
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.cookie = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status
+
+def start_gunicorn(path, port, workers):
+    env = dict(os.environ, STORAGE_BACKEND='sqlite', DATABASE_PATH=path, PORT=str(port),
+               WEB_CONCURRENCY=str(workers), RATE_LIMIT_ENABLED='false', LOG_LEVEL='WARNING',
+               GUNICORN_ACCESS_LOG='', SEED_SAMPLE_DATA='true')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup (is it installed?)')
+        try:
+            if HTTPSession(port).request('GET', '/favicon.ico') == 204:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start within 60s')
+
+# ---------- Scenarios ---------- #
+class Context:
+    def __init__(self, post_ids, max_seq, seed):
+        self.post_ids = post_ids
+        self.max_seq = max_seq
+        self.seed = seed
+
+def scenario_request(name, rng, ctx):
+    if name == 'feed':
+        return 'GET', '/api/posts', None
+    if name == 'feed_deep':
+        return 'GET', f'/api/posts?before={rng.randint(2, ctx.max_seq)}', None
+    if name == 'feed_hot':
+        return 'GET', f"/api/posts?sort={rng.choice(('hot', 'top'))}&before={rng.randrange(0, 200, 20)}", None
+    if name == 'create_post':
+        return 'POST', '/api/create_post', {'content': content(rng)}
+    if name == 'like_post':
+        return 'POST', f'/api/like_post/{rng.choice(ctx.post_ids)}', None
+    if name == 'login':
+        return 'POST', '/api/login', {'username': f'bench{rng.randrange(LOGIN_USERS)}', 'password': BENCH_PASSWORD}
+    if name == 'search':
+        return 'GET', f'/api/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}', None
+    if name == 'admin_stats':
+        return 'GET', '/api/admin/stats', None
+    if name == 'admin_users':
+        return 'GET', '/api/admin/users', None
+    if name == 'admin_posts':
+        return 'GET', f'/api/admin/posts?before={rng.randint(2, ctx.max_seq)}', None
+    raise ValueError(name)
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+def run_scenario(name, sessions, requests, ctx):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = [requests // len(sessions) + (i < requests % len(sessions)) for i in range(len(sessions))]
+
+    def worker(i):
+        rng = random.Random(f'{ctx.seed}:{name}:{i}')
+        session = sessions[i]
+        mine = []
+        failed = 0
+        for _ in range(per_thread[i]):
+            method, path, body = scenario_request(name, rng, ctx)
+            start = time.perf_counter()
+            status = session.request(method, path, body)
+            mine.append(time.perf_counter() - start)
+            if status >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(sessions))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / max(len(latencies), 1) * 1000, 3),
+    }
+
+def compare(results, baseline, tolerance):
+    """Per-scenario ratios against ``baseline``; returns (rows, regressed)"""
+    previous = {r['scenario']: r for r in baseline['results']}
+    rows = []
+    regressed = False
+    for result in results:
+        before = previous.get(result['scenario'])
+        if before is None:
+            continue
+        row = {'scenario': result['scenario']}
+        for key, higher_is_better in (('p50_ms', False), ('p99_ms', False), ('rps', True)):
+            ratio = result[key] / before[key] if before[key] else 1.0
+            row[key] = round(ratio, 3)
+            worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+            if worse:
+                row.setdefault('regressed', []).append(key)
+                regressed = True
+        rows.append(row)
+    return rows, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=10000, help='e.g. 10000, 100000, 1000000')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--target', choices=('client', 'gunicorn'), default='client')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--requests', type=int, default=2000, help='per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='SQLite file to seed (default: a temporary file)')
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.target == 'gunicorn' and args.backend != 'sqlite':
+        parser.error('--target gunicorn needs --backend sqlite so every worker sees the seeded data')
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name!r}')
+
+    def progress(n):
+        print(f'  seeded {n:,} posts', file=sys.stderr)
+
+    # create_app() reads its configuration from the environment
+    db_path = args.database or os.path.join(tempfile.mkdtemp(prefix='aura-bench-'), 'bench.db')
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if args.backend == 'sqlite':
+        os.environ['STORAGE_BACKEND'] = 'sqlite'
+        os.environ['DATABASE_PATH'] = db_path
+
+    from credentials import PasswordHasher
+    rng = random.Random(args.seed)
+    users = make_users(args.users, PasswordHasher())
+    posts = make_posts(args.posts, users, rng)
+
+    seed_started = time.perf_counter()
+    server = None
+    if args.backend == 'sqlite':
+        if os.path.exists(db_path):
+            parser.error(f'{db_path} already exists; benchmarks need a fresh file')
+        post_ids = seed_sqlite(db_path, users, posts, progress)
+    if args.target == 'client':
+        import main as app_module
+        app = app_module.create_app()
+        if args.backend == 'memory':
+            post_ids = seed_memory(app_module, users, posts, progress)
+        app_module.init_sample_data()
+        make_session = lambda: ClientSession(app)
+    else:
+        server = start_gunicorn(db_path, args.port, args.workers)
+        make_session = lambda: HTTPSession(args.port)
+    seed_seconds = time.perf_counter() - seed_started
+
+    try:
+        sessions = []
+        for _ in range(args.concurrency):
+            session = make_session()
+            session.request('POST', '/api/login', {'username': ADMIN[0], 'password': ADMIN[1]})
+            sessions.append(session)
+        ctx = Context(post_ids, args.posts, args.seed)
+        results = []
+        for name in scenarios:
+            # Logging in replaces the session, so 'login' gets its own
+            own = [make_session() for _ in sessions] if name == 'login' else sessions
+            results.append(run_scenario(name, own, args.requests, ctx))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    report = {
+        'meta': {
+            'posts': args.posts, 'users': args.users, 'backend': args.backend, 'target': args.target,
+            'workers': args.workers if args.target == 'gunicorn' else 1, 'concurrency': args.concurrency,
+            'requests': args.requests, 'seed': args.seed, 'seed_seconds': round(seed_seconds, 2),
+            'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'run_id': str(uuid.uuid4()), 'started_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'], regressed = compare(results, json.load(f), args.tolerance)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.posts:,} posts, {args.backend} store, {args.target}, concurrency {args.concurrency}")
+        for r in results:
+            print(f"{r['scenario']:<12} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.3f} ms  "
+                  f"p99 {r['p99_ms']:>8.3f} ms  errors {r['errors']}")
+        for row in report.get('comparison', ()):
+            flag = '  REGRESSED ' + ','.join(row['regressed']) if 'regressed' in row else ''
+            print(f"vs baseline {row['scenario']:<12} p50 x{row['p50_ms']}  p99 x{row['p99_ms']}  "
+                  f"rps x{row['rps']}{flag}")
+    sys.exit(1 if regressed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Bytes per post held in memory, legacy layout vs models.Post.
+
+    python -m benchmarks.bench_memory [--posts 1000000] [--json]
+
+"record" measures the post objects alone; "store" also counts the
+MemoryStore indexes a post is entered into.  Content strings are
+excluded from both since every layout has to keep them.
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from models import Post, User
+from store import MemoryStore
+
+class LegacyPost:
+    # The pre-slots layout: per-instance __dict__, author fields copied
+    # onto every post and a fresh timestamp string per post.
+    def __init__(self, user_id, content):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.content = content
+        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.likes = 0
+        self.loves = 0
+        self.laughs = 0
+        self.wows = 0
+        self.is_approved = True
+        self.reports = 0
+        self.username = ""
+        self.display_name = ""
+        self.avatar = "👤"
+
+def measure(post_cls, n, authors, contents, with_store):
+    store = MemoryStore() if with_store else None
+    posts = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        author = authors[i % len(authors)]
+        post = post_cls(author.id, contents[i % len(contents)])
+        if post_cls is LegacyPost:
+            post.username = author.username
+            post.display_name = author.display_name
+            post.avatar = author.avatar
+        if store is not None:
+            store.add_post(post)
+        else:
+            posts.append(post)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    if store is None:
+        # The holding list is not part of a record's cost
+        used -= sys.getsizeof(posts)
+    return used / n
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    authors = [User(f'user{i}', f'user{i}@aura.social', 'x') for i in range(1000)]
+    contents = [f'Sample post body number {i} ✨' for i in range(1000)]
+
+    results = []
+    for mode in ('record', 'store'):
+        for post_cls in (LegacyPost, Post):
+            # LegacyPost has a __dict__, so MemoryStore can set seq on it too
+            bytes_per_post = measure(post_cls, args.posts, authors, contents, mode == 'store')
+            results.append({'mode': mode, 'layout': post_cls.__name__, 'posts': args.posts,
+                            'bytes_per_post': round(bytes_per_post, 1)})
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{result['mode']:>6} {result['layout']:<10} {result['bytes_per_post']:>8} bytes/post "
+                  f"at {result['posts']:,} posts")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Logins per second at each password-hashing cost setting.
+
+    python -m benchmarks.bench_passwords [--seconds 2] [--json]
+
+Each setting hashes one password, then verifies it from ``--clients``
+threads through ``PasswordHasher.verify`` for ``--seconds``.  The
+verify-result cache is disabled so every login pays the full KDF.
+"""
+import argparse
+import json
+import threading
+import time
+
+from credentials import PasswordHasher
+
+SETTINGS = [
+    {'scheme': 'scrypt', 'scrypt_n': 2 ** 12},
+    {'scheme': 'scrypt', 'scrypt_n': 2 ** 14},
+    {'scheme': 'scrypt', 'scrypt_n': 2 ** 15},
+    {'scheme': 'pbkdf2_sha256', 'pbkdf2_iterations': 100000},
+    {'scheme': 'pbkdf2_sha256', 'pbkdf2_iterations': 310000},
+    {'scheme': 'pbkdf2_sha256', 'pbkdf2_iterations': 600000},
+]
+
+def bench(setting, seconds, clients):
+    hasher = PasswordHasher(cache_size=0, **setting)
+    encoded = hasher.hash_sync('correct horse battery staple')
+    deadline = time.perf_counter() + seconds
+    counts = [0] * clients
+    latencies = []
+    lock = threading.Lock()
+
+    def client(i):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            hasher.verify('correct horse battery staple', encoded)
+            elapsed = time.perf_counter() - start
+            counts[i] += 1
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        **setting,
+        'workers': hasher.max_workers,
+        'clients': clients,
+        'logins_per_sec': round(sum(counts) / wall, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='print one JSON object per setting')
+    args = parser.parse_args()
+
+    for setting in SETTINGS:
+        result = bench(setting, args.seconds, args.clients)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            cost = f"n={setting['scrypt_n']}" if 'scrypt_n' in setting else f"iterations={setting['pbkdf2_iterations']}"
+            print(f"{setting['scheme']:>14} {cost:<18} {result['logins_per_sec']:>8} logins/s  "
+                  f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Snapshot write, restart and log replay times for snapshot.SnapshotStore.
+
+    python -m benchmarks.bench_snapshot [--posts 200000] [--users 1000] [--tail 20000] [--json]
+
+Fills a store with ``--posts`` posts, snapshots it, then writes ``--tail``
+more posts, likes and moderation actions to the log.  A new process then
+restarts from the files, mapping the snapshot and replaying that tail.
+The appends are timed too, since every write pays for its log frame.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_api import content, make_posts
+from models import Post, User
+from snapshot import SnapshotStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The restart runs in a fresh interpreter, as after a deploy
+CHILD = '''
+import json, sys, time
+from snapshot import SnapshotStore
+started = time.perf_counter()
+store = SnapshotStore(sys.argv[1], interval=float('inf'))
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, store.count_posts(), len(store.timeline)]))
+'''
+
+def churn(store, users, posts, n, rng):
+    """``n`` log records: a mix of new posts, reaction batches and moderation"""
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            store.add_post(Post(rng.choice(users).id, content(rng)))
+        elif kind == 1:
+            store.apply_reactions({rng.choice(posts).id: {'likes': 1}})
+        elif kind == 2:
+            store.set_approved(rng.choice(posts), rng.random() < 0.5)
+        else:
+            store.update_user(rng.choice(users), last_login=str(i))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--tail', type=int, default=20000, help='log records written after the snapshot')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    directory = tempfile.mkdtemp(prefix='aura-snapshot-')
+    path = os.path.join(directory, 'bench.snap')
+    try:
+        store = SnapshotStore(path, interval=float('inf'))
+        users = [store.add_user(User(f'user{i}', f'user{i}@example.com', 'x')) for i in range(args.users)]
+        started = time.perf_counter()
+        posts = [store.add_post(post) for post in make_posts(args.posts, users, rng)]
+        append_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        size = store.snapshot()
+        snapshot_s = time.perf_counter() - started
+
+        churn(store, users, posts, args.tail, rng)
+        log_size = os.path.getsize(store._log_path(store.generation))
+        expected = (store.count_posts(), len(store.timeline))
+        store.close()
+
+        result = subprocess.run([sys.executable, '-c', CHILD, path], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f'restart failed:\n{result.stderr}')
+        restart_s, *restored = json.loads(result.stdout.strip().splitlines()[-1])
+        if tuple(restored) != expected:
+            raise SystemExit(f'restored {restored[0]} posts, expected {expected[0]}')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'posts': args.posts, 'users': args.users, 'tail': args.tail,
+        'append_per_s': round(args.posts / append_s),
+        'snapshot_s': round(snapshot_s, 3), 'snapshot_bytes': size,
+        'bytes_per_post': round(size / max(args.posts, 1), 1),
+        'log_bytes': log_size,
+        'restart_s': round(restart_s, 3),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.posts:,} posts, {args.users:,} users, {args.tail:,} log records after the snapshot")
+        print(f"logged add_post      {report['append_per_s']:>12,} /s")
+        print(f"snapshot             {report['snapshot_s']:>12.3f} s  {size:,} bytes "
+              f"({report['bytes_per_post']} per post)")
+        print(f"log tail             {log_size:>12,} bytes")
+        print(f"restart              {report['restart_s']:>12.3f} s")
+
+if __name__ == '__main__':
+    main()
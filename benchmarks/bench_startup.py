@@ -0,0 +1,170 @@
+"""Cold-start cost: interpreter, ``import main``, ``create_app()`` and the first requests.
+
+    python -m benchmarks.bench_startup [--runs 5] [--backend memory|sqlite] [--posts 0]
+                                       [--seed-data] [--json]
+                                       [--save-baseline FILE] [--baseline FILE]
+
+Every run is a fresh interpreter, so module imports and the lazily built
+subsystems start cold, as in a new gunicorn worker (bytecode caches stay
+warm, as they do after a deploy's first boot).  The child times the
+import, ``create_app()``, optionally seeding the sample accounts
+(``--seed-data``), then the first GET of a page and of the feed API, a
+login when seeded, and a second feed request for comparison.  With
+``--backend sqlite`` the runs share one file, prepared beforehand with
+``--posts`` posts, so they measure a restart rather than a first boot.
+
+``--baseline`` compares medians against an earlier ``--save-baseline``
+run and exits 1 if any phase slowed by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.bench_api import make_posts, make_users, seed_sqlite
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child with nothing but time and sys imported beforehand
+CHILD = '''
+import sys, time
+started = time.perf_counter()
+timings = {}
+
+def mark(name, since):
+    now = time.perf_counter()
+    timings[name] = (now - since) * 1000
+    return now
+
+import main
+t = mark('import_ms', started)
+app = main.create_app({'SEED_SAMPLE_DATA': False, 'RATE_LIMIT_ENABLED': False})
+t = mark('create_app_ms', t)
+seeded = sys.argv[1] == '1'
+if seeded:
+    main.seed_sample_data()
+    t = mark('seed_ms', t)
+client = app.test_client()
+requests = [('first_page_ms', 'GET', '/login', None), ('first_feed_ms', 'GET', '/api/posts', None)]
+if seeded:
+    requests.append(('first_login_ms', 'POST', '/api/login', {'username': 'admin', 'password': 'admin'}))
+requests.append(('second_feed_ms', 'GET', '/api/posts', None))
+for name, method, path, body in requests:
+    t = time.perf_counter()
+    response = client.open(path, method=method, json=body)
+    response.close()
+    if response.status_code != 200:
+        raise SystemExit(f'{method} {path} returned {response.status_code}')
+    mark(name, t)
+timings['ready_ms'] = (time.perf_counter() - started) * 1000
+
+import json
+print(json.dumps(timings))
+'''
+
+def run_child(env, seed_data):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, '1' if seed_data else '0'], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f'startup run failed:\n{result.stderr}')
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_ms'] = elapsed
+    return timings
+
+def summarize(runs):
+    phases = list(runs[0])
+    return [{
+        'phase': phase,
+        'median_ms': round(statistics.median(run[phase] for run in runs), 2),
+        'min_ms': round(min(run[phase] for run in runs), 2),
+        'max_ms': round(max(run[phase] for run in runs), 2),
+    } for phase in phases]
+
+def compare(results, baseline, tolerance):
+    """Per-phase median ratios against ``baseline``; returns (rows, regressed)"""
+    previous = {r['phase']: r for r in baseline['results']}
+    rows = []
+    regressed = False
+    for result in results:
+        before = previous.get(result['phase'])
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+        row = {'phase': result['phase'], 'median_ms': round(ratio, 3)}
+        if ratio > 1 + tolerance:
+            row['regressed'] = True
+            regressed = True
+        rows.append(row)
+    return rows, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--posts', type=int, default=0, help='posts in the SQLite file (sqlite only)')
+    parser.add_argument('--seed-data', action='store_true', help='also time seeding the sample accounts')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.posts and args.backend != 'sqlite':
+        parser.error('--posts needs --backend sqlite; a memory store starts empty in every process')
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    env = dict(os.environ, STORAGE_BACKEND=args.backend)
+    if args.backend == 'sqlite':
+        db_path = os.path.join(tempfile.mkdtemp(prefix='aura-startup-'), 'startup.db')
+        env['DATABASE_PATH'] = db_path
+        from credentials import PasswordHasher
+        rng = random.Random(args.seed)
+        users = make_users(max(1, min(1000, args.posts // 10)), PasswordHasher())
+        seed_sqlite(db_path, users, make_posts(args.posts, users, rng), lambda n: None)
+        # One unmeasured boot creates the search, hashtag and session tables
+        run_child(env, args.seed_data)
+
+    runs = [run_child(env, args.seed_data) for _ in range(args.runs)]
+    results = summarize(runs)
+    report = {
+        'meta': {
+            'runs': args.runs, 'backend': args.backend, 'posts': args.posts, 'seed_data': args.seed_data,
+            'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'run_id': str(uuid.uuid4()), 'started_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'], regressed = compare(results, json.load(f), args.tolerance)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.runs} runs, {args.backend} store, {args.posts:,} posts")
+        for r in results:
+            print(f"{r['phase']:<16} median {r['median_ms']:>9.2f} ms  min {r['min_ms']:>9.2f} ms  "
+                  f"max {r['max_ms']:>9.2f} ms")
+        for row in report.get('comparison', ()):
+            flag = '  REGRESSED' if row.get('regressed') else ''
+            print(f"vs baseline {row['phase']:<16} median x{row['median_ms']}{flag}")
+    sys.exit(1 if regressed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""Streaming NDJSON export and import of users, follows, posts and reports.
+
+    python -m bulk export backup.ndjson.gz [--database aura_social.db]
+    python -m bulk import backup.ndjson.gz [--database aura_social.db] [--chunk 10000] [--renumber] [--restart]
+
+One JSON object per line, tagged with ``type``.  Reaction counts travel
+on the post records.  Exports read posts in seq order a page at a time,
+and imports parse one line at a time, so memory stays flat however large
+the file is.  ``-`` reads stdin or writes stdout, and a ``.gz`` suffix
+compresses.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from database import (DATABASE_PATH, SQL_ADVANCE_POST_SEQ, SQL_LAST_POST_SEQ, SQL_TAG_POST, SQL_UNTAG_POST,
+                      SQLiteStore, get_db_connection, init_db)
+from events import INTERNAL
+from reactions import REACTIONS
+from response_cache import FOLLOWS, POSTS, REPORTS, STATS, USERS
+from topics import extract_hashtags
+
+FORMAT = 'aura-ndjson'
+VERSION = 1
+CHUNK = 10000
+
+USER_FIELDS = ('id', 'username', 'email', 'password', 'display_name', 'bio', 'avatar', 'created_at',
+               'is_admin', 'is_active', 'last_login')
+POST_FIELDS = ('id', 'seq', 'user_id', 'content', 'timestamp') + REACTIONS + ('is_approved', 'reports', 'hidden_by')
+# For fields that files exported by older versions lack
+POST_DEFAULTS = {'hidden_by': ''}
+REPORT_FIELDS = ('id', 'post_id', 'reporter_id', 'reason', 'status', 'created_at')
+
+# Rows replace existing ones with the same key, so a chunk re-applied after
+# a crash (or a whole file loaded twice) leaves the same end state.
+SQL_IMPORT_USER = 'INSERT OR REPLACE INTO users ({}) VALUES ({})'.format(
+    ', '.join(USER_FIELDS), ', '.join('?' * len(USER_FIELDS)))
+SQL_IMPORT_POST = 'INSERT OR REPLACE INTO posts ({}) VALUES ({})'.format(
+    ', '.join(POST_FIELDS), ', '.join('?' * len(POST_FIELDS)))
+# --renumber merges into a live database: existing users, posts and reports
+# are kept as they are, and an imported user whose username is taken is
+# mapped onto the existing account
+SQL_MERGE_USER = SQL_IMPORT_USER.replace('OR REPLACE', 'OR IGNORE')
+SQL_MERGE_POST = SQL_IMPORT_POST.replace('OR REPLACE', 'OR IGNORE')
+SQL_IMPORT_FTS = 'INSERT OR REPLACE INTO posts_fts (rowid, content) VALUES (?, ?)'
+SQL_IMPORT_FOLLOW = 'INSERT OR IGNORE INTO follows (follower_id, followee_id, created_at) VALUES (?, ?, ?)'
+SQL_IMPORT_REPORT = 'INSERT OR REPLACE INTO reports ({}) VALUES ({})'.format(
+    ', '.join(REPORT_FIELDS), ', '.join('?' * len(REPORT_FIELDS)))
+SQL_MERGE_REPORT = SQL_IMPORT_REPORT.replace('OR REPLACE', 'OR IGNORE')
+SQL_SAVE_USER_ID = 'INSERT OR REPLACE INTO import_user_ids (imported_id, user_id) VALUES (?, ?)'
+SQL_SAVE_CHECKPOINT = '''
+    INSERT INTO import_checkpoints (source, line, offset, updated) VALUES (?, ?, ?, ?)
+    ON CONFLICT (source) DO UPDATE SET line = excluded.line, offset = excluded.offset, updated = excluded.updated
+'''
+
+# ---------- Files ---------- #
+def open_ndjson(path, mode, compress=None):
+    """Binary file object for ``path``; ``-`` is stdin/stdout and ``.gz`` is gzip"""
+    if path == '-':
+        return sys.stdin.buffer if mode == 'rb' else sys.stdout.buffer
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, mode, compresslevel=6)
+    return open(path, mode)
+
+def read_ndjson(fileobj, start_line=0, start_offset=0):
+    """Yield ``(line_no, end_offset, record)`` one line at a time.
+
+    Resumes after ``start_line``: seekable files jump to ``start_offset``
+    and pipes skip lines.
+    """
+    line_no, offset = 0, 0
+    if start_line and fileobj.seekable():
+        fileobj.seek(start_offset)
+        line_no, offset = start_line, start_offset
+    for raw in fileobj:
+        line_no += 1
+        offset += len(raw)
+        if line_no <= start_line or not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f'Line {line_no}: {e}') from None
+        yield line_no, offset, record
+
+def write_ndjson(records, fileobj, progress=None):
+    """Write ``records`` one per line; returns how many"""
+    count = 0
+    for record in records:
+        fileobj.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode() + b'\n')
+        count += 1
+        if progress is not None:
+            progress.update(count)
+    return count
+
+class Progress:
+    """Prints a running count and rate to stderr every ``interval`` seconds"""
+
+    def __init__(self, label, interval=2.0, out=sys.stderr):
+        self.label = label
+        self.interval = interval
+        self.out = out
+        self.count = 0
+        self._start = self._last = time.monotonic()
+
+    def update(self, count):
+        self.count = count
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._print(now)
+
+    def done(self):
+        self._print(time.monotonic())
+
+    def _print(self, now):
+        rate = self.count / max(now - self._start, 1e-9)
+        print(f'{self.label}: {self.count:,} records ({rate:,.0f}/s)', file=self.out, flush=True)
+
+# ---------- Export ---------- #
+def _record(kind, obj, fields):
+    record = {'type': kind}
+    for name in fields:
+        record[name] = getattr(obj, name, None)
+    return record
+
+def export_records(store, page_size=1000):
+    """Yield every record in ``store`` (either backend), holding one page of posts at a time"""
+    yield {'type': 'header', 'format': FORMAT, 'version': VERSION, 'exported_at': datetime.now().isoformat()}
+    for user in store.iter_users():
+        yield _record('user', user, USER_FIELDS)
+    for follower_id, followee_id in store.iter_follows():
+        yield {'type': 'follow', 'follower_id': follower_id, 'followee_id': followee_id}
+    after = 0
+    while True:
+        posts = store.posts_after(after, page_size)
+        for post in posts:
+            yield _record('post', post, POST_FIELDS)
+        if len(posts) < page_size:
+            break
+        after = posts[-1].seq
+    for report in store.iter_reports():
+        yield _record('report', report, REPORT_FIELDS)
+
+# ---------- Import ---------- #
+def _post_row(post):
+    return tuple(post.get(name, POST_DEFAULTS.get(name)) for name in POST_FIELDS)
+
+class SQLiteImporter:
+    """Loads an NDJSON stream into a SQLite file in chunked transactions.
+
+    Every ``chunk`` records go in with one ``executemany`` per table, in
+    a single transaction that also saves the source's checkpoint (line
+    and byte offset).  An interrupted import picks up after the last
+    committed chunk, and nothing is applied twice.
+
+    By default posts keep their exported ``seq``, which suits a restore
+    into an empty database or the one they came from.  ``renumber``
+    merges a file into a live database instead: rows whose key already
+    exists are skipped, an imported user whose username is taken becomes
+    the existing account (the mapping is saved with the chunk, so a
+    resumed import still applies it), and posts that are inserted get
+    fresh seqs after the existing ones.
+    """
+
+    def __init__(self, path=None, chunk=CHUNK, renumber=False):
+        self.path = path or DATABASE_PATH
+        self.chunk = chunk
+        self.renumber = renumber
+        init_db(self.path)
+        with self.conn as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS import_checkpoints (
+                    source TEXT PRIMARY KEY,
+                    line INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    updated TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS import_user_ids (
+                    imported_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL
+                )
+            ''')
+        self.fts = self._has_table('posts_fts')
+        self.tags = self._has_table('post_tags')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def _has_table(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def checkpoint(self, source):
+        """``(line, offset)`` of the last committed chunk from ``source``"""
+        row = self.conn.execute('SELECT line, offset FROM import_checkpoints WHERE source = ?', (source,)).fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+    def clear_checkpoint(self, source):
+        with self.conn as conn:
+            conn.execute('DELETE FROM import_checkpoints WHERE source = ?', (source,))
+
+    def import_file(self, path, restart=False, progress=None):
+        """Import ``path``, resuming from its checkpoint unless ``restart``; returns counts per type"""
+        source = path if path == '-' else os.path.abspath(path)
+        if restart:
+            self.clear_checkpoint(source)
+        line, offset = self.checkpoint(source)
+        with open_ndjson(path, 'rb') as fileobj:
+            counts = self.load(read_ndjson(fileobj, line, offset), source, progress)
+        self.clear_checkpoint(source)
+        return counts
+
+    def load(self, items, source=None, progress=None):
+        """Apply ``(line_no, end_offset, record)`` items; ``source`` names the checkpoint"""
+        counts = dict.fromkeys(('user', 'follow', 'post', 'report'), 0)
+        pending = {kind: [] for kind in counts}
+        position = None
+        size = 0
+        self._next_seq = self.conn.execute(SQL_LAST_POST_SEQ).fetchone()[0] + 1
+        self._user_ids = dict(self.conn.execute('SELECT imported_id, user_id FROM import_user_ids')) \
+            if self.renumber else {}
+        for line_no, end_offset, record in items:
+            kind = record.get('type')
+            if kind == 'header':
+                self._check_header(line_no, record)
+                continue
+            if kind not in pending:
+                raise ValueError(f'Line {line_no}: unknown record type {kind!r}')
+            pending[kind].append(record)
+            counts[kind] += 1
+            position = (line_no, end_offset)
+            size += 1
+            if size >= self.chunk:
+                self._flush(pending, source, position)
+                size = 0
+                if progress is not None:
+                    progress.update(sum(counts.values()))
+        self._flush(pending, source, position)
+        if progress is not None:
+            progress.update(sum(counts.values()))
+            progress.done()
+        self._invalidate()
+        return counts
+
+    @staticmethod
+    def _check_header(line_no, record):
+        if record.get('format') != FORMAT or int(record.get('version', 0)) > VERSION:
+            raise ValueError(f'Line {line_no}: not an {FORMAT} v{VERSION} file')
+
+    def _flush(self, pending, source, position):
+        users, follows, posts, reports = (pending[kind] for kind in ('user', 'follow', 'post', 'report'))
+        now = datetime.now().isoformat()
+        if not self.renumber:
+            for post in posts:
+                if post.get('seq') is None:
+                    post['seq'] = self._next_seq
+                    self._next_seq += 1
+        with self.conn as conn:
+            if self.renumber:
+                self._merge_users(conn, users)
+                self._map_user_ids(follows, ('follower_id', 'followee_id'))
+                self._map_user_ids(posts, ('user_id',))
+                self._map_user_ids(reports, ('reporter_id',))
+            else:
+                conn.executemany(SQL_IMPORT_USER, [tuple(user.get(name) for name in USER_FIELDS) for user in users])
+            conn.executemany(SQL_IMPORT_FOLLOW, [(f['follower_id'], f['followee_id'], f.get('created_at') or now)
+                                                 for f in follows])
+            if self.renumber:
+                # Only posts actually inserted get search and hashtag rows
+                posts = self._merge_posts(conn, posts)
+            else:
+                conn.executemany(SQL_IMPORT_POST, [_post_row(post) for post in posts])
+            if self.fts and posts:
+                conn.executemany(SQL_IMPORT_FTS, [(post['seq'], post['content']) for post in posts])
+            if self.tags and posts:
+                conn.executemany(SQL_UNTAG_POST, [(post['seq'],) for post in posts])
+                conn.executemany(SQL_TAG_POST, [(tag, post['seq']) for post in posts if post.get('is_approved', True)
+                                                for tag in extract_hashtags(post['content'])])
+            conn.executemany(SQL_MERGE_REPORT if self.renumber else SQL_IMPORT_REPORT,
+                             [tuple(report.get(name) for name in REPORT_FIELDS) for report in reports])
+            if posts:
+                conn.execute(SQL_ADVANCE_POST_SEQ, (max(post['seq'] for post in posts),))
+            if source is not None and position is not None:
+                conn.execute(SQL_SAVE_CHECKPOINT, (source, position[0], position[1], now))
+        if not self.renumber and posts:
+            self._next_seq = max(self._next_seq, max(post['seq'] for post in posts) + 1)
+        for rows in pending.values():
+            rows.clear()
+
+    def _merge_users(self, conn, users):
+        """Insert new users; map those whose username is taken onto the existing account"""
+        for user in users:
+            if conn.execute(SQL_MERGE_USER, tuple(user.get(name) for name in USER_FIELDS)).rowcount:
+                continue
+            row = conn.execute('SELECT id FROM users WHERE username = ?', (user['username'],)).fetchone()
+            if row is not None and row[0] != user['id']:
+                self._user_ids[user['id']] = row[0]
+                conn.execute(SQL_SAVE_USER_ID, (user['id'], row[0]))
+
+    def _map_user_ids(self, records, fields):
+        if self._user_ids:
+            for record in records:
+                for name in fields:
+                    record[name] = self._user_ids.get(record[name], record[name])
+
+    def _merge_posts(self, conn, posts):
+        """Insert posts whose id is new, at fresh seqs; returns the ones inserted"""
+        inserted = []
+        for post in posts:
+            post['seq'] = self._next_seq
+            if conn.execute(SQL_MERGE_POST, _post_row(post)).rowcount:
+                inserted.append(post)
+                self._next_seq += 1
+        return inserted
+
+    def _invalidate(self):
+        """Make running workers drop caches and derived state built before the import"""
+        if self._has_table('state_versions'):
+            with self.conn as conn:
+                conn.executemany('UPDATE state_versions SET version = version + 1 WHERE namespace = ?',
+                                 [(namespace,) for namespace in (POSTS, USERS, REPORTS, STATS, FOLLOWS)])
+        if self._has_table('events'):
+            # Relayed to every worker (origin 0 is no worker's pid)
+            with self.conn as conn:
+                conn.execute('INSERT INTO events (origin, channel, event, data) VALUES (0, ?, ?, ?)',
+                             (INTERNAL, 'imported', '{}'))
+
+def copy_store(store, path=None, chunk=CHUNK):
+    """Copy everything in ``store`` into the SQLite file at ``path``"""
+    items = ((0, 0, record) for record in export_records(store))
+    return SQLiteImporter(path, chunk=chunk).load(items)
+
+# ---------- CLI ---------- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bulk', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--database', default=DATABASE_PATH, help='SQLite file (default: DATABASE_PATH)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='write the database as NDJSON')
+    export.add_argument('output', help='file to write, .gz to compress, - for stdout')
+    export.add_argument('--page-size', type=int, default=1000, help='posts read per query')
+    load = commands.add_parser('import', help='load NDJSON into the database')
+    load.add_argument('input', help='file to read, .gz if compressed, - for stdin')
+    load.add_argument('--chunk', type=int, default=CHUNK, help='records per transaction')
+    load.add_argument('--renumber', action='store_true', help='assign fresh post seqs and skip existing post ids')
+    load.add_argument('--restart', action='store_true', help='ignore a saved checkpoint')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        progress = Progress('export')
+        records = export_records(SQLiteStore(args.database), args.page_size)
+        if args.output == '-':
+            write_ndjson(records, sys.stdout.buffer, progress)
+            sys.stdout.buffer.flush()
+        else:
+            # Write beside the target and rename, so a failed export never
+            # leaves a truncated file under the final name
+            partial = args.output + '.partial'
+            with open_ndjson(partial, 'wb', compress=args.output.endswith('.gz')) as fileobj:
+                write_ndjson(records, fileobj, progress)
+            os.replace(partial, args.output)
+        progress.done()
+    else:
+        importer = SQLiteImporter(args.database, chunk=args.chunk, renumber=args.renumber)
+        try:
+            counts = importer.import_file(args.input, restart=args.restart, progress=Progress('import'))
+        except ValueError as e:
+            sys.exit(f'import stopped: {e}; fix the file and rerun to resume after the last committed chunk')
+        print(', '.join(f'{n:,} {kind}s' for kind, n in counts.items()), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+COMPRESSIBLE = frozenset((
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'application/x-ndjson', 'image/svg+xml',
+))
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate(accept_encodings, offered=None):
+    """Best of ``offered`` for a request's parsed Accept-Encoding, or None for identity.
+
+    Highest client quality wins; ties go to the earlier (smaller) encoding.
+    """
+    best, best_quality = None, 0
+    for encoding in offered if offered is not None else available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding, level):
+    """``level`` is the gzip level (1-9) or brotli quality (0-11)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output a pure function of the input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+class Compressor:
+    """Compresses buffered text responses for clients that accept it.
+
+    Bodies under ``min_size`` bytes are sent as is: a small body gains
+    little from compression and loses the time spent on it.  Responses
+    carrying an ETag (ResponseCache entries, cached pages) are compressed
+    once per encoding and kept in an LRU keyed on the tag, so hot reads
+    pay for compression only when their content changes.  Streamed and
+    already-encoded responses pass through untouched.  ``init_app``
+    takes ``min_size`` from the app's ``COMPRESS_MIN_SIZE`` if set.
+    """
+
+    def __init__(self, app=None, min_size=1024, gzip_level=6, brotli_quality=5, cache_size=1024):
+        self.min_size = min_size
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None or response.content_length is None or response.content_length < self.min_size:
+            return response
+
+        data = response.get_data()
+        etag, _ = response.get_etag()
+        body = self._cached(etag, encoding) if etag else None
+        if body is None:
+            body = compress(data, encoding, self.levels[encoding])
+            if etag:
+                self._store(etag, encoding, body)
+        if len(body) >= len(data):
+            return response
+
+        with self._lock:
+            self.bytes_in += len(data)
+            self.bytes_out += len(body)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # Same content, different bytes: the tag only holds weakly now
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cached(self, etag, encoding):
+        with self._lock:
+            body = self._cache.get((etag, encoding))
+            if body is not None:
+                self._cache.move_to_end((etag, encoding))
+            return body
+
+    def _store(self, etag, encoding, body):
+        with self._lock:
+            self._cache[(etag, encoding)] = body
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
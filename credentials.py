@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Cost parameters; changing any of them rehashes passwords on next login
+PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'scrypt')
+SCRYPT_N = int(os.environ.get('SCRYPT_N', 2 ** 14))
+SCRYPT_R = int(os.environ.get('SCRYPT_R', 8))
+SCRYPT_P = int(os.environ.get('SCRYPT_P', 1))
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 310000))
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 2))
+HASH_MAX_PENDING = int(os.environ.get('HASH_MAX_PENDING', 64))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool's queue is full"""
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+def _unb64(text):
+    return base64.b64decode(text.encode('ascii'))
+
+class PasswordHasher:
+    """scrypt / PBKDF2 password hashing run on a bounded thread pool.
+
+    Encoded hashes carry their own parameters::
+
+        scrypt$<n>$<r>$<p>$<salt>$<hash>
+        pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+    so ``verify`` works across parameter changes and reports when a hash
+    should be upgraded.  Plain-text values from before hashing existed
+    still verify and always need a rehash.
+
+    At most ``max_workers`` KDFs run at once and ``max_pending`` more may
+    wait; beyond that ``HasherBusy`` is raised instead of tying up request
+    threads.  Successful verifications are remembered under an HMAC with
+    a per-process key, so repeated logins skip the KDF.
+    """
+
+    def __init__(self, scheme=PASSWORD_SCHEME, scrypt_n=SCRYPT_N, scrypt_r=SCRYPT_R, scrypt_p=SCRYPT_P,
+                 pbkdf2_iterations=PBKDF2_ITERATIONS, max_workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING,
+                 cache_size=10000):
+        if scheme not in ('scrypt', 'pbkdf2_sha256'):
+            raise ValueError(f'Unknown password scheme {scheme!r}')
+        self.scheme = scheme
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._cache_key = secrets.token_bytes(32)
+        self._cache_lock = threading.Lock()
+        self._verified = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # ---------- Synchronous primitives ---------- #
+    def hash_sync(self, password):
+        salt = secrets.token_bytes(SALT_BYTES)
+        if self.scheme == 'scrypt':
+            n, r, p = self.scrypt_params
+            key = self._scrypt(password, salt, n, r, p)
+            return f'scrypt${n}${r}${p}${_b64(salt)}${_b64(key)}'
+        key = self._pbkdf2(password, salt, self.pbkdf2_iterations)
+        return f'pbkdf2_sha256${self.pbkdf2_iterations}${_b64(salt)}${_b64(key)}'
+
+    def verify_sync(self, password, encoded):
+        """Return ``(ok, needs_rehash)`` for ``password`` against ``encoded``"""
+        parts = encoded.split('$')
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            key = self._scrypt(password, _unb64(parts[4]), n, r, p)
+            expected = _unb64(parts[5])
+        elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            key = self._pbkdf2(password, _unb64(parts[2]), int(parts[1]))
+            expected = _unb64(parts[3])
+        else:
+            # Legacy plain-text password
+            key, expected = password.encode('utf-8'), encoded.encode('utf-8')
+        ok = hmac.compare_digest(key, expected)
+        return ok, ok and self.needs_rehash(encoded)
+
+    def needs_rehash(self, encoded):
+        parts = encoded.split('$')
+        if parts[0] != self.scheme:
+            return True
+        if self.scheme == 'scrypt':
+            return tuple(int(x) for x in parts[1:4]) != self.scrypt_params
+        return int(parts[1]) != self.pbkdf2_iterations
+
+    def _scrypt(self, password, salt, n, r, p):
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p, dklen=KEY_BYTES)
+
+    def _pbkdf2(self, password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=KEY_BYTES)
+
+    # ---------- Pooled API used by the routes ---------- #
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._submit(self.hash_sync, password)
+
+    def verify(self, password, encoded):
+        """Pooled ``verify_sync`` with a cache of recent successes"""
+        token = hmac.new(self._cache_key, f'{encoded}\0{password}'.encode('utf-8'), hashlib.sha256).digest()
+        with self._cache_lock:
+            if token in self._verified:
+                self.cache_hits += 1
+                self._verified.move_to_end(token)
+                return True, self.needs_rehash(encoded)
+            self.cache_misses += 1
+
+        ok, needs_rehash = self._submit(self.verify_sync, password, encoded)
+        if ok:
+            with self._cache_lock:
+                self._verified[token] = True
+                if len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return ok, needs_rehash
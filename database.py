@@ -1,15 +1,74 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime
 
-def get_db_connection():
-    conn = sqlite3.connect('aura_social.db')
-    conn.row_factory = sqlite3.Row
+from models import Conversation, Message, Post, Report, User
+from reactions import REACTIONS
+from search import tokenize
+from topics import extract_hashtags
+from logs import get_logger
+
+log = get_logger('database')
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'aura_social.db')
+
+# Applied to every pooled connection
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA busy_timeout=5000',
+)
+
+_local = threading.local()
+
+def get_db_connection(path=None):
+    """Return this thread's pooled connection for ``path``, opening it once"""
+    path = path or DATABASE_PATH
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[path] = conn
     return conn
 
-def init_db():
-    conn = get_db_connection()
-    
+def close_db_connection(path=None):
+    conn = getattr(_local, 'conns', {}).pop(path or DATABASE_PATH, None)
+    if conn is not None:
+        conn.close()
+
+# Columns added after the first release; init_db back-fills them on old files
+USER_COLUMNS = {
+    'is_admin': 'INTEGER DEFAULT 0',
+    'is_active': 'INTEGER DEFAULT 1',
+    'last_login': 'TEXT',
+}
+POST_COLUMNS = {
+    'seq': 'INTEGER',
+    'is_approved': 'INTEGER DEFAULT 1',
+    'reports': 'INTEGER DEFAULT 0',
+    'hidden_by': "TEXT NOT NULL DEFAULT ''",
+}
+
+def _add_missing_columns(conn, table, columns):
+    existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
+def init_db(path=None):
+    conn = get_db_connection(path)
+    # Workers booting together on a fresh file would race the ALTERs below
+    conn.execute('BEGIN IMMEDIATE')
+
     # Users table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -23,7 +82,7 @@ def init_db():
             created_at TEXT
         )
     ''')
-    
+
     # Posts table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS posts (
@@ -41,35 +100,564 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully!")
-
-def migrate_from_memory():
-    """Migrate data from in-memory storage to database"""
-    from main import users_db, posts_db
-    
-    conn = get_db_connection()
-    
-    # Migrate users
-    for username, user in users_db.items():
-        conn.execute('''
-            INSERT OR REPLACE INTO users (id, username, email, password, display_name, bio, avatar, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user.id, user.username, user.email, user.password, user.display_name, user.bio, user.avatar, user.created_at))
-    
-    # Migrate posts
-    for post in posts_db:
-        conn.execute('''
-            INSERT OR REPLACE INTO posts (id, user_id, content, timestamp, likes, username, display_name, avatar)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (post.id, post.user_id, post.content, post.timestamp, post.likes, post.username, post.display_name, post.avatar))
-    
+
+    # Follow graph edges
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS follows (
+            follower_id TEXT NOT NULL,
+            followee_id TEXT NOT NULL,
+            created_at TEXT,
+            PRIMARY KEY (follower_id, followee_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Moderation reports
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS reports (
+            id TEXT PRIMARY KEY,
+            post_id TEXT NOT NULL,
+            reporter_id TEXT NOT NULL,
+            reason TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            created_at TEXT
+        )
+    ''')
+
+    # Direct messages: seq is the global append order and the history
+    # cursor; one inbox row per participant is kept current on every send
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT UNIQUE NOT NULL,
+            conversation_id TEXT NOT NULL,
+            sender_id TEXT NOT NULL,
+            recipient_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            user_id TEXT NOT NULL,
+            peer_id TEXT NOT NULL,
+            last_seq INTEGER NOT NULL,
+            unread INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, peer_id)
+        ) WITHOUT ROWID
+    ''')
+
+    _add_missing_columns(conn, 'users', USER_COLUMNS)
+    _add_missing_columns(conn, 'posts', POST_COLUMNS)
+
+    # The last post seq handed out.  Kept apart from MAX(seq) so the seq of
+    # a deleted post (its FTS rowid, tag rows and clients' cursors) is
+    # never given to a new one.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO sequences (name, value) SELECT 'posts', COALESCE(MAX(seq), 0) FROM posts")
+
+    # Indexes
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts (user_id, seq)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts (timestamp)')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_seq ON posts (seq)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_timeline ON posts (is_approved, seq)')
+    # One pending report per reporter and post; also serves the per-post lookups
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reports_pending ON reports (post_id, reporter_id) "
+                 "WHERE status = 'pending'")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_reports_status ON reports (status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, seq)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_activity ON conversations (user_id, last_seq)')
+
     conn.commit()
-    conn.close()
-    print("✅ Data migrated to database successfully!")
+    log.info('Database initialized at %s', path or DATABASE_PATH)
+
+def migrate_from_memory(store, path=None):
+    """Copy users, follows, posts and reports from ``store`` into the database"""
+    # Imported here because bulk builds on this module
+    from bulk import copy_store
+    counts = copy_store(store, path)
+    log.info('Data migrated to database: %s', counts)
+    return counts
+
+# ========== STORAGE BACKEND ========== #
+# Statement text is kept constant so sqlite3's per-connection statement
+# cache reuses the prepared statement on every call.
+SQL_INSERT_USER = '''
+    INSERT INTO users (id, username, email, password, display_name, bio, avatar, created_at,
+                       is_admin, is_active, last_login)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_USER_BY_ID = 'SELECT * FROM users WHERE id = ?'
+SQL_USER_BY_USERNAME = 'SELECT * FROM users WHERE username = ?'
+SQL_ALL_USERS = 'SELECT * FROM users ORDER BY created_at'
+SQL_COUNT_USERS = 'SELECT COUNT(*) FROM users'
+SQL_NEXT_POST_SEQ = "UPDATE sequences SET value = value + 1 WHERE name = 'posts'"
+SQL_LAST_POST_SEQ = "SELECT value FROM sequences WHERE name = 'posts'"
+# Bulk loads that bring their own seqs move the counter past them
+SQL_ADVANCE_POST_SEQ = "UPDATE sequences SET value = MAX(value, ?) WHERE name = 'posts'"
+SQL_INSERT_POST = '''
+    INSERT INTO posts (id, seq, user_id, content, timestamp, likes, loves, laughs, wows, is_approved, reports)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_POST_BY_ID = 'SELECT * FROM posts WHERE id = ?'
+SQL_DELETE_POST = 'DELETE FROM posts WHERE id = ?'
+SQL_SET_APPROVED = 'UPDATE posts SET is_approved = ?, hidden_by = ? WHERE id = ?'
+SQL_APPLY_REACTIONS = 'UPDATE posts SET {} WHERE id = ?'.format(
+    ', '.join(f'{kind} = {kind} + ?' for kind in REACTIONS))
+SQL_ALL_POSTS = 'SELECT * FROM posts ORDER BY seq'
+SQL_POSTS_AFTER = 'SELECT * FROM posts WHERE seq > ? ORDER BY seq LIMIT ?'
+SQL_USER_POSTS = 'SELECT * FROM posts WHERE user_id = ? ORDER BY seq'
+SQL_COUNT_POSTS = 'SELECT COUNT(*) FROM posts'
+SQL_COUNT_USER_POSTS = 'SELECT COUNT(*) FROM posts WHERE user_id = ?'
+SQL_TIMELINE_PAGE = 'SELECT * FROM posts WHERE is_approved = 1 AND seq < ? ORDER BY seq DESC LIMIT ?'
+SQL_AUTHOR_PAGE = 'SELECT * FROM posts WHERE user_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?'
+SQL_ALL_PAGE = 'SELECT * FROM posts WHERE seq < ? ORDER BY seq DESC LIMIT ?'
+SQL_POST_SIGNALS = ('SELECT seq, id, user_id, timestamp, {} FROM posts WHERE is_approved = 1 '
+                    'ORDER BY seq DESC LIMIT ?').format(', '.join(REACTIONS))
+
+SQL_INSERT_REPORT = '''
+    INSERT OR IGNORE INTO reports (id, post_id, reporter_id, reason, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_BUMP_REPORTS = 'UPDATE posts SET reports = reports + 1 WHERE id = ?'
+SQL_REPORTS = 'SELECT * FROM reports ORDER BY rowid'
+SQL_REPORTS_BY_STATUS = 'SELECT * FROM reports WHERE status = ? ORDER BY rowid'
+SQL_RECENT_REPORTS = 'SELECT * FROM reports ORDER BY rowid DESC LIMIT ?'
+SQL_POST_REPORTS = "SELECT * FROM reports WHERE post_id = ? AND status = 'pending' ORDER BY rowid"
+SQL_COUNT_REPORTS = 'SELECT COUNT(*) FROM reports WHERE status = ?'
+SQL_RESOLVE_REPORTS = "UPDATE reports SET status = ? WHERE post_id = ? AND status = 'pending'"
+SQL_CLEAR_REPORTS = 'UPDATE posts SET reports = 0 WHERE id = ?'
+
+SQL_ADD_FOLLOW = 'INSERT OR IGNORE INTO follows (follower_id, followee_id, created_at) VALUES (?, ?, ?)'
+SQL_REMOVE_FOLLOW = 'DELETE FROM follows WHERE follower_id = ? AND followee_id = ?'
+SQL_ALL_FOLLOWS = 'SELECT follower_id, followee_id FROM follows'
+
+SQL_INSERT_MESSAGE = '''
+    INSERT INTO messages (id, conversation_id, sender_id, recipient_id, content, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+# Replying implies the sender has read the conversation
+SQL_TOUCH_SENDER = '''
+    INSERT INTO conversations (user_id, peer_id, last_seq, unread) VALUES (?, ?, ?, 0)
+    ON CONFLICT (user_id, peer_id) DO UPDATE SET last_seq = excluded.last_seq, unread = 0
+'''
+SQL_TOUCH_RECIPIENT = '''
+    INSERT INTO conversations (user_id, peer_id, last_seq, unread) VALUES (?, ?, ?, 1)
+    ON CONFLICT (user_id, peer_id) DO UPDATE SET last_seq = excluded.last_seq, unread = unread + 1
+'''
+SQL_MARK_READ = 'UPDATE conversations SET unread = 0 WHERE user_id = ? AND peer_id = ? AND unread > 0'
+SQL_UNREAD = 'SELECT unread FROM conversations WHERE user_id = ? AND peer_id = ?'
+SQL_UNREAD_TOTAL = 'SELECT COALESCE(SUM(unread), 0) FROM conversations WHERE user_id = ?'
+SQL_CONVERSATION = '''
+    SELECT c.peer_id, c.last_seq, c.unread, m.* FROM conversations c JOIN messages m ON m.seq = c.last_seq
+    WHERE c.user_id = ? AND c.peer_id = ?
+'''
+SQL_MESSAGES_PAGE = 'SELECT * FROM messages WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?'
+SQL_INBOX_PAGE = '''
+    SELECT c.peer_id, c.last_seq, c.unread, m.* FROM conversations c JOIN messages m ON m.seq = c.last_seq
+    WHERE c.user_id = ? AND c.last_seq < ? ORDER BY c.last_seq DESC LIMIT ?
+'''
+
+USER_UPDATABLE = ('email', 'password', 'display_name', 'bio', 'avatar', 'is_admin', 'is_active', 'last_login')
+
+# Larger than any seq, so the first page needs no separate statement
+_NO_CURSOR = 2 ** 62
+
+def _cursor(before):
+    # before=0 is a real cursor (nothing is older), not a missing one
+    return _NO_CURSOR if before is None else before
+
+class SQLiteStore:
+    """SQLite-backed implementation of the store interface in store.py.
+
+    Rows come back as ``user_cls``/``post_cls`` instances so routes can
+    treat both backends the same way; all writes go through methods.
+    """
+
+    def __init__(self, path=None, user_cls=User, post_cls=Post):
+        self.path = path or DATABASE_PATH
+        self.user_cls = user_cls
+        self.post_cls = post_cls
+        init_db(self.path)
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def _build(self, cls, row):
+        obj = cls.__new__(cls)
+        # Legacy columns (e.g. the old per-post author copies) have no slot
+        fields = getattr(cls, '__slots__', row.keys())
+        for key in row.keys():
+            if key in fields:
+                setattr(obj, key, row[key])
+        return obj
+
+    def _user(self, row):
+        if row is None:
+            return None
+        user = self._build(self.user_cls, row)
+        user.is_admin = bool(user.is_admin)
+        user.is_active = bool(user.is_active)
+        return user
+
+    def _report(self, row):
+        return self._build(Report, row)
+
+    def _post(self, row):
+        if row is None:
+            return None
+        post = self._build(self.post_cls, row)
+        post.is_approved = bool(post.is_approved)
+        return post
+
+    # ---------- Users ---------- #
+    def add_user(self, user):
+        with self.conn as conn:
+            conn.execute(SQL_INSERT_USER, (user.id, user.username, user.email, user.password, user.display_name,
+                                           user.bio, user.avatar, user.created_at, user.is_admin, user.is_active,
+                                           user.last_login))
+        return user
+
+    def get_user(self, user_id):
+        return self._user(self.conn.execute(SQL_USER_BY_ID, (user_id,)).fetchone())
+
+    def get_user_by_username(self, username):
+        return self._user(self.conn.execute(SQL_USER_BY_USERNAME, (username,)).fetchone())
+
+    def has_username(self, username):
+        return self.conn.execute(SQL_USER_BY_USERNAME, (username,)).fetchone() is not None
+
+    def update_user(self, user, **fields):
+        for name in fields:
+            if name not in USER_UPDATABLE:
+                raise ValueError(f'Cannot update user field {name!r}')
+        assignments = ', '.join(f'{name} = ?' for name in sorted(fields))
+        with self.conn as conn:
+            conn.execute(f'UPDATE users SET {assignments} WHERE id = ?',
+                         [fields[name] for name in sorted(fields)] + [user.id])
+        for name, value in fields.items():
+            setattr(user, name, value)
+        return user
+
+    def iter_users(self):
+        return [self._user(row) for row in self.conn.execute(SQL_ALL_USERS)]
+
+    def count_users(self):
+        return self.conn.execute(SQL_COUNT_USERS).fetchone()[0]
+
+    # ---------- Follows ---------- #
+    def add_follow(self, follower_id, followee_id):
+        with self.conn as conn:
+            conn.execute(SQL_ADD_FOLLOW, (follower_id, followee_id, datetime.now().isoformat()))
+
+    def remove_follow(self, follower_id, followee_id):
+        with self.conn as conn:
+            conn.execute(SQL_REMOVE_FOLLOW, (follower_id, followee_id))
+
+    def iter_follows(self):
+        return [(row[0], row[1]) for row in self.conn.execute(SQL_ALL_FOLLOWS)]
+
+    # ---------- Posts ---------- #
+    def add_post(self, post):
+        with self.conn as conn:
+            # The UPDATE takes the write lock, so workers never share a seq
+            conn.execute(SQL_NEXT_POST_SEQ)
+            seq = conn.execute(SQL_LAST_POST_SEQ).fetchone()[0]
+            conn.execute(SQL_INSERT_POST, (post.id, seq, post.user_id, post.content, post.timestamp, post.likes,
+                                           post.loves, post.laughs, post.wows, post.is_approved, post.reports))
+        post.seq = seq
+        return post
+
+    def get_post(self, post_id):
+        return self._post(self.conn.execute(SQL_POST_BY_ID, (post_id,)).fetchone())
+
+    def set_approved(self, post, is_approved, hidden_by=''):
+        hidden_by = '' if is_approved else hidden_by
+        with self.conn as conn:
+            conn.execute(SQL_SET_APPROVED, (is_approved, hidden_by, post.id))
+        post.is_approved = is_approved
+        post.hidden_by = hidden_by
+        return post
+
+    def _posts_by_ids(self, post_ids):
+        posts = []
+        post_ids = list(post_ids)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            marks = ', '.join('?' * len(chunk))
+            posts += [self._post(row) for row in self.conn.execute(f'SELECT * FROM posts WHERE id IN ({marks})', chunk)]
+        return posts
+
+    def set_approved_many(self, post_ids, is_approved, hidden_by=''):
+        """Set ``is_approved`` (and ``hidden_by`` when hiding) on a batch in one transaction.
+
+        Returns the posts that changed.
+        """
+        hidden_by = '' if is_approved else hidden_by
+        changed = [post for post in self._posts_by_ids(post_ids) if post.is_approved != is_approved]
+        with self.conn as conn:
+            conn.executemany(SQL_SET_APPROVED, [(is_approved, hidden_by, post.id) for post in changed])
+        for post in changed:
+            post.is_approved = is_approved
+            post.hidden_by = hidden_by
+        return changed
+
+    def apply_reactions(self, deltas):
+        """Add a batch of ``{post_id: {reaction: n}}`` deltas in one transaction"""
+        rows = [tuple(counts.get(kind, 0) for kind in REACTIONS) + (post_id,)
+                for post_id, counts in deltas.items()]
+        with self.conn as conn:
+            conn.executemany(SQL_APPLY_REACTIONS, rows)
+
+    def reaction_counts(self, post_ids, kinds):
+        counts = {}
+        columns = ', '.join(kinds)
+        post_ids = list(post_ids)
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            marks = ', '.join('?' * len(chunk))
+            for row in self.conn.execute(f'SELECT id, {columns} FROM posts WHERE id IN ({marks})', chunk):
+                counts[row['id']] = {kind: row[kind] for kind in kinds}
+        return counts
+
+    def delete_post(self, post_id):
+        post = self.get_post(post_id)
+        if post:
+            with self.conn as conn:
+                conn.execute(SQL_DELETE_POST, (post_id,))
+        return post
+
+    def delete_posts(self, post_ids):
+        """Delete a batch of posts in one transaction; returns the ones that existed"""
+        posts = self._posts_by_ids(post_ids)
+        with self.conn as conn:
+            conn.executemany(SQL_DELETE_POST, [(post.id,) for post in posts])
+        return posts
+
+    def iter_posts(self):
+        return [self._post(row) for row in self.conn.execute(SQL_ALL_POSTS)]
+
+    def posts_after(self, after_seq=0, limit=1000):
+        """Up to ``limit`` posts with ``seq > after_seq``, oldest first (for streaming exports)"""
+        return [self._post(row) for row in self.conn.execute(SQL_POSTS_AFTER, (after_seq, limit))]
+
+    def post_signals(self, limit):
+        """``(seq, id, user_id, timestamp, *REACTIONS)`` of the newest ``limit`` approved posts, newest first"""
+        return [tuple(row) for row in self.conn.execute(SQL_POST_SIGNALS, (limit,))]
+
+    def posts_for_user(self, user_id):
+        return [self._post(row) for row in self.conn.execute(SQL_USER_POSTS, (user_id,))]
+
+    def count_posts(self):
+        return self.conn.execute(SQL_COUNT_POSTS).fetchone()[0]
+
+    def count_posts_for_user(self, user_id):
+        return self.conn.execute(SQL_COUNT_USER_POSTS, (user_id,)).fetchone()[0]
+
+    # ---------- Reports ---------- #
+    def add_report(self, report):
+        """Store ``report`` unless its reporter already has one pending on the post"""
+        with self.conn as conn:
+            inserted = conn.execute(SQL_INSERT_REPORT, (report.id, report.post_id, report.reporter_id, report.reason,
+                                                        report.status, report.created_at)).rowcount
+            if inserted:
+                conn.execute(SQL_BUMP_REPORTS, (report.post_id,))
+        return bool(inserted)
+
+    def iter_reports(self, status=None):
+        if status is None:
+            return [self._report(row) for row in self.conn.execute(SQL_REPORTS)]
+        return [self._report(row) for row in self.conn.execute(SQL_REPORTS_BY_STATUS, (status,))]
+
+    def recent_reports(self, limit=100):
+        """The last ``limit`` reports filed, oldest first"""
+        return [self._report(row) for row in self.conn.execute(SQL_RECENT_REPORTS, (limit,))][::-1]
+
+    def reports_for_post(self, post_id):
+        """Pending reports on ``post_id``"""
+        return [self._report(row) for row in self.conn.execute(SQL_POST_REPORTS, (post_id,))]
+
+    def count_reports(self, status):
+        return self.conn.execute(SQL_COUNT_REPORTS, (status,)).fetchone()[0]
+
+    def resolve_reports(self, post_ids, status):
+        """Close the pending reports on a batch of posts; returns how many"""
+        with self.conn as conn:
+            resolved = conn.executemany(SQL_RESOLVE_REPORTS, [(status, post_id) for post_id in post_ids]).rowcount
+            conn.executemany(SQL_CLEAR_REPORTS, [(post_id,) for post_id in post_ids])
+        return max(resolved, 0)
+
+    # ---------- Direct messages ---------- #
+    def _message(self, row):
+        return self._build(Message, row)
+
+    def _conversation(self, user_id, row):
+        if row is None:
+            return None
+        conversation = Conversation(user_id, row['peer_id'])
+        conversation.last_seq = row['last_seq']
+        conversation.unread = row['unread']
+        conversation.last_message = self._message(row)
+        return conversation
+
+    def add_message(self, message):
+        """Append to the conversation log and move it to the top of both inboxes"""
+        with self.conn as conn:
+            message.seq = conn.execute(SQL_INSERT_MESSAGE, (message.id, message.conversation_id, message.sender_id,
+                                                            message.recipient_id, message.content,
+                                                            message.created_at)).lastrowid
+            conn.execute(SQL_TOUCH_SENDER, (message.sender_id, message.recipient_id, message.seq))
+            conn.execute(SQL_TOUCH_RECIPIENT, (message.recipient_id, message.sender_id, message.seq))
+        return message
+
+    def mark_read(self, user_id, peer_id):
+        """Zero the unread count of one conversation; returns how many were unread"""
+        with self.conn as conn:
+            row = conn.execute(SQL_UNREAD, (user_id, peer_id)).fetchone()
+            if not row or not row[0]:
+                return 0
+            conn.execute(SQL_MARK_READ, (user_id, peer_id))
+        return row[0]
+
+    def unread_count(self, user_id):
+        return self.conn.execute(SQL_UNREAD_TOTAL, (user_id,)).fetchone()[0]
+
+    def get_conversation(self, user_id, peer_id):
+        return self._conversation(user_id, self.conn.execute(SQL_CONVERSATION, (user_id, peer_id)).fetchone())
+
+    def conversation_page(self, conversation_id, before=None, limit=20):
+        """Messages in one conversation, newest first, strictly older than ``before``"""
+        return self._page(SQL_MESSAGES_PAGE, (conversation_id, _cursor(before)), limit, self._message)
+
+    def inbox_page(self, user_id, before=None, limit=20):
+        """``user_id``'s conversations by last activity, newest first"""
+        rows = self.conn.execute(SQL_INBOX_PAGE, (user_id, _cursor(before), limit + 1)).fetchall()
+        page = [self._conversation(user_id, row) for row in rows[:limit]]
+        next_cursor = page[-1].last_seq if len(rows) > limit else None
+        return page, next_cursor
+
+    # ---------- Cursor pages (newest first) ---------- #
+    def _page(self, sql, params, limit, build=None):
+        rows = self.conn.execute(sql, params + (limit + 1,)).fetchall()
+        page = [(build or self._post)(row) for row in rows[:limit]]
+        next_cursor = page[-1].seq if len(rows) > limit else None
+        return page, next_cursor
+
+    def timeline_page(self, before=None, limit=20):
+        return self._page(SQL_TIMELINE_PAGE, (_cursor(before),), limit)
+
+    def author_page(self, user_id, before=None, limit=20):
+        return self._page(SQL_AUTHOR_PAGE, (user_id, _cursor(before)), limit)
+
+    def all_posts_page(self, before=None, limit=20):
+        return self._page(SQL_ALL_PAGE, (_cursor(before),), limit)
+
+class FTSIndex:
+    """SQLite FTS5 counterpart of search.InvertedIndex.
+
+    The FTS rowid is the post's ``seq`` so add/remove are keyed lookups,
+    and results are ranked with FTS5's built-in bm25 ``rank``.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DATABASE_PATH
+        with self.conn as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'").fetchone()
+            if not exists:
+                conn.execute("CREATE VIRTUAL TABLE posts_fts USING fts5(content, tokenize='unicode61')")
+                conn.execute('INSERT INTO posts_fts (rowid, content) SELECT seq, content FROM posts')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def add(self, post):
+        with self.conn as conn:
+            conn.execute('INSERT OR REPLACE INTO posts_fts (rowid, content) VALUES (?, ?)', (post.seq, post.content))
+
+    def remove(self, post):
+        with self.conn as conn:
+            conn.execute('DELETE FROM posts_fts WHERE rowid = ?', (post.seq,))
+
+    def search(self, query, offset=0, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return [], False
+        match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        rows = self.conn.execute('''
+            SELECT posts.id FROM posts_fts JOIN posts ON posts.seq = posts_fts.rowid
+            WHERE posts_fts MATCH ? ORDER BY rank, posts_fts.rowid DESC LIMIT ? OFFSET ?
+        ''', (match, limit + 1, offset)).fetchall()
+        return [row['id'] for row in rows[:limit]], len(rows) > limit
+
+SQL_TAG_POST = 'INSERT OR IGNORE INTO post_tags (tag, seq) VALUES (?, ?)'
+SQL_UNTAG_POST = 'DELETE FROM post_tags WHERE seq = ?'
+SQL_TAG_PAGE = '''
+    SELECT posts.id, posts.seq FROM post_tags JOIN posts ON posts.seq = post_tags.seq
+    WHERE post_tags.tag = ? AND post_tags.seq < ? ORDER BY post_tags.seq DESC LIMIT ?
+'''
+SQL_TAG_COUNT = 'SELECT COUNT(*) FROM post_tags WHERE tag = ?'
+
+class SQLiteHashtagIndex:
+    """SQLite counterpart of topics.HashtagIndex.
+
+    One ``(tag, seq)`` row per tag of an approved post; the primary key
+    serves the per-tag pages and the seq index serves deletes.  Existing
+    posts are tagged when the table is first created.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DATABASE_PATH
+        with self.conn as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_tags'").fetchone()
+            if not exists:
+                conn.execute('''
+                    CREATE TABLE post_tags (
+                        tag TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        PRIMARY KEY (tag, seq)
+                    ) WITHOUT ROWID
+                ''')
+                conn.execute('CREATE INDEX idx_post_tags_seq ON post_tags (seq)')
+                rows = conn.execute('SELECT seq, content FROM posts WHERE is_approved')
+                conn.executemany(SQL_TAG_POST, ((tag, row['seq']) for row in rows
+                                                for tag in extract_hashtags(row['content'])))
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def add(self, post, tags=None):
+        tags = extract_hashtags(post.content) if tags is None else tags
+        with self.conn as conn:
+            conn.execute(SQL_UNTAG_POST, (post.seq,))
+            conn.executemany(SQL_TAG_POST, [(tag, post.seq) for tag in tags])
+
+    def remove(self, post):
+        with self.conn as conn:
+            conn.execute(SQL_UNTAG_POST, (post.seq,))
+
+    def page(self, tag, before=None, limit=20):
+        rows = self.conn.execute(SQL_TAG_PAGE, (tag, _cursor(before), limit + 1)).fetchall()
+        page = rows[:limit]
+        next_cursor = page[-1]['seq'] if len(rows) > limit else None
+        return [row['id'] for row in page], next_cursor
+
+    def count(self, tag):
+        return self.conn.execute(SQL_TAG_COUNT, (tag,)).fetchone()[0]
 
 if __name__ == '__main__':
+    # Data moves in and out with ``python -m bulk``
     init_db()
-    migrate_from_memory()
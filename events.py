@@ -0,0 +1,112 @@
+import json
+import queue
+import threading
+
+PUBLIC = 'public'
+ADMIN = 'admin'
+# State deltas for the other workers; never sent to clients
+INTERNAL = 'internal'
+
+def user_channel(user_id):
+    """Channel for events meant for one user, such as direct messages"""
+    return f'user:{user_id}'
+
+class EventBroker:
+    """Fan-out of small JSON deltas to Server-Sent Events subscribers.
+
+    Each event is serialized once in ``publish`` and the same bytes are
+    queued for every subscriber.  Subscribers on the ``admin`` or a
+    per-user channel also receive public events.  A subscriber whose queue fills up is
+    dropped; its browser reconnects and reloads a fresh page.
+
+    Each open stream holds a server thread, so ``max_subscribers`` (0 for
+    no limit) caps them per worker: ``subscribe`` returns None at the cap
+    and the client is told to retry later.
+
+    With a ``log`` (shared_state.SQLiteEventLog) published events are also
+    appended for the other worker processes, and events they publish are
+    relayed to this worker's subscribers and ``on_remote`` listeners.
+    ``share`` sends a delta to the other workers' listeners only, so they
+    can update their own caches instead of rebuilding them.
+    """
+
+    def __init__(self, queue_size=256, heartbeat=15.0, log=None, max_subscribers=0):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.log = log
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._remote_listeners = []
+
+    def subscribe(self, channel=PUBLIC):
+        """A queue of SSE messages for ``channel``, or None if the worker is at ``max_subscribers``"""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers[q] = channel
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def on_remote(self, callback):
+        """Call ``callback(event, data)`` for events published by other workers"""
+        self._remote_listeners.append(callback)
+
+    def start_relay(self):
+        if self.log is not None:
+            self.log.start(self._relay)
+
+    def _relay(self, event, data, channel):
+        if channel != INTERNAL:
+            self._deliver(event, data, channel)
+        for callback in self._remote_listeners:
+            callback(event, data)
+
+    def publish(self, event, data, channel=PUBLIC):
+        self._deliver(event, data, channel)
+        if self.log is not None:
+            self.log.append(event, data, channel)
+
+    def share(self, event, data):
+        """Pass ``event`` to the ``on_remote`` listeners of other workers, not to clients"""
+        if self.log is not None:
+            self.log.append(event, data, INTERNAL)
+
+    def _deliver(self, event, data, channel):
+        message = f'event: {event}\ndata: {json.dumps(data)}\n\n'
+        with self._lock:
+            targets = [q for q, ch in self._subscribers.items() if channel == PUBLIC or ch == channel]
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(q)
+                # Wake the stream so it ends instead of waiting on a heartbeat
+                try:
+                    q.get_nowait()
+                    q.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self, q):
+        """Generator of SSE text for the subscriber ``q``, suitable for a Response"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    message = q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(q)
@@ -0,0 +1,223 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+class FollowGraph:
+    """Set-based follower/following adjacency, persisted through the store.
+
+    Edges are loaded from ``store.iter_follows()`` on first use; after
+    that follow/unfollow update the sets and write through.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.followers = {}
+        self.following = {}
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                for follower_id, followee_id in self.store.iter_follows():
+                    self._link(follower_id, followee_id)
+                self._loaded = True
+
+    def _link(self, follower_id, followee_id):
+        self.following.setdefault(follower_id, set()).add(followee_id)
+        self.followers.setdefault(followee_id, set()).add(follower_id)
+
+    def reset(self):
+        """Forget the loaded edges; they are re-read on next use"""
+        with self._lock:
+            self.followers = {}
+            self.following = {}
+            self._loaded = False
+
+    def follow(self, follower_id, followee_id):
+        """Return True if this created a new edge"""
+        self._ensure_loaded()
+        with self._lock:
+            if followee_id in self.following.get(follower_id, ()):
+                return False
+            self.store.add_follow(follower_id, followee_id)
+            self._link(follower_id, followee_id)
+        return True
+
+    def unfollow(self, follower_id, followee_id):
+        """Return True if an edge was removed"""
+        self._ensure_loaded()
+        with self._lock:
+            if followee_id not in self.following.get(follower_id, ()):
+                return False
+            self.store.remove_follow(follower_id, followee_id)
+            self.following[follower_id].discard(followee_id)
+            self.followers[followee_id].discard(follower_id)
+        return True
+
+    def apply(self, follower_id, followee_id, following):
+        """Record an edge change another worker has already written to the store"""
+        with self._lock:
+            if not self._loaded:
+                return
+            if following:
+                self._link(follower_id, followee_id)
+            else:
+                self.following.get(follower_id, set()).discard(followee_id)
+                self.followers.get(followee_id, set()).discard(follower_id)
+
+    def followers_of(self, user_id):
+        self._ensure_loaded()
+        return self.followers.get(user_id, set())
+
+    def following_of(self, user_id):
+        self._ensure_loaded()
+        return self.following.get(user_id, set())
+
+    def is_following(self, follower_id, followee_id):
+        return followee_id in self.following_of(follower_id)
+
+class HomeTimelines:
+    """Personalized home feeds built by fan-out-on-write.
+
+    Each reader has a bounded, seq-sorted buffer of ``(seq, post_id)``
+    entries.  A new post is appended to the buffer of every follower that
+    has one, unless the author has more than ``fanout_limit`` followers;
+    those authors are merged in at read time instead (fan-out-on-read).
+    Buffers are built on a reader's first request, so memory tracks
+    active readers only.
+
+    A buffer holds every pushed post from its oldest entry on, or the
+    reader's whole history once it is ``complete``.  A page reaching
+    below that reads the authors' own histories and prepends what it
+    read, so paging further back is served from the buffer too.
+    """
+
+    def __init__(self, store, graph, size=800, fanout_limit=5000):
+        self.store = store
+        self.graph = graph
+        self.size = size
+        self.fanout_limit = fanout_limit
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._complete = set()
+
+    def _is_celebrity(self, user_id):
+        return len(self.graph.followers_of(user_id)) > self.fanout_limit
+
+    def _sources(self, user_id):
+        """Authors whose posts belong on ``user_id``'s home feed"""
+        return self.graph.following_of(user_id) | {user_id}
+
+    def _recent_entries(self, author_ids, before, limit):
+        pages = []
+        for author_id in author_ids:
+            posts, _ = self.store.author_page(author_id, before, limit)
+            pages.append([(post.seq, post.id) for post in posts])
+        merged = heapq.merge(*pages, reverse=True)
+        return [entry for _, entry in zip(range(limit), merged)]
+
+    def _buffer(self, user_id):
+        with self._lock:
+            buffer = self._buffers.get(user_id)
+        if buffer is None:
+            pushed = [a for a in self._sources(user_id) if not self._is_celebrity(a)]
+            entries = self._recent_entries(pushed, None, self.size)
+            with self._lock:
+                buffer = self._buffers.get(user_id)
+                if buffer is None:
+                    buffer = self._buffers[user_id] = entries[::-1]
+                    if len(entries) < self.size:
+                        self._complete.add(user_id)
+        return buffer
+
+    def _refill(self, user_id, before, entries, complete):
+        """Prepend ``entries`` (newest first, all older than ``before``) to the buffer they continue"""
+        with self._lock:
+            buffer = self._buffers.get(user_id)
+            if buffer is None:
+                return
+            # Only a range that reaches the buffer's oldest entry extends
+            # it, and very deep pages are not kept
+            if buffer and before is not None and before < buffer[0][0] or len(buffer) >= 2 * self.size:
+                return
+            floor = buffer[0] if buffer else None
+            buffer[:0] = [entry for entry in reversed(entries) if floor is None or entry < floor]
+            if complete:
+                self._complete.add(user_id)
+
+    # ---------- Write hooks ---------- #
+    def on_post_created(self, post):
+        if self._is_celebrity(post.user_id):
+            return
+        entry = (post.seq, post.id)
+        with self._lock:
+            for reader_id in self.graph.followers_of(post.user_id) | {post.user_id}:
+                buffer = self._buffers.get(reader_id)
+                if buffer is not None:
+                    # Posts relayed from other workers can arrive out of order
+                    if not buffer or buffer[-1] < entry:
+                        buffer.append(entry)
+                    elif entry not in buffer[bisect_left(buffer, entry):][:1]:
+                        insort(buffer, entry)
+                    if len(buffer) > 2 * self.size:
+                        del buffer[:-self.size]
+                        self._complete.discard(reader_id)
+
+    def on_follow_changed(self, user_id):
+        # Rebuilt from the new followee set on the next read
+        with self._lock:
+            self._buffers.pop(user_id, None)
+            self._complete.discard(user_id)
+
+    def reset(self):
+        with self._lock:
+            self._buffers.clear()
+            self._complete.clear()
+
+    # ---------- Reads ---------- #
+    def _entries(self, user_id, before, limit):
+        """Up to ``limit`` distinct entries older than ``before``, newest first, and whether there may be more"""
+        buffer = self._buffer(user_id)
+        with self._lock:
+            end = bisect_left(buffer, (before,)) if before is not None else len(buffer)
+            complete = user_id in self._complete
+            entries = buffer[max(0, end - limit):end][::-1]
+        more = not complete or end > limit
+        if end < limit and not complete:
+            # Past the end of the buffer: read the pushed authors' histories
+            pushed = [a for a in self._sources(user_id) if not self._is_celebrity(a)]
+            entries = self._recent_entries(pushed, before, limit)
+            more = len(entries) == limit
+            self._refill(user_id, before, entries, complete=not more)
+
+        celebrities = [a for a in self._sources(user_id) if self._is_celebrity(a)]
+        if celebrities:
+            pulled = self._recent_entries(celebrities, before, limit)
+            more = more or len(pulled) == limit
+            # A followee who became a celebrity can still be in the buffer
+            merged = []
+            for entry in heapq.merge(entries, pulled, reverse=True):
+                if not merged or merged[-1] != entry:
+                    merged.append(entry)
+            more = more or len(merged) > limit
+            entries = merged[:limit]
+        return entries, more
+
+    def page(self, user_id, before=None, limit=20):
+        """Newest-first home feed page of up to ``limit`` visible posts and the cursor for the next one"""
+        posts = []
+        cursor = before
+        more = True
+        while more and len(posts) < limit:
+            entries, more = self._entries(user_id, cursor, limit - len(posts))
+            for seq, post_id in entries:
+                cursor = seq
+                post = self.store.get_post(post_id)
+                if post is not None and post.is_approved:
+                    posts.append(post)
+            if not entries:
+                more = False
+        return posts, cursor if more and posts else None
@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+
+# Workers share state through the SQLite store (see shared_state.py); the
+# in-memory store would give every worker its own copy of the data.
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threads keep long-lived /api/stream connections from pinning a whole worker
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+# Each open /api/stream holds one of those threads until the tab closes;
+# past this many per worker, streams get a 503 and the browser retries
+os.environ.setdefault('SSE_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# No preload: SQLite connections and background threads must be created
+# after the fork, in the worker that uses them.
+preload_app = False
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+
+if workers > 1 and os.environ['STORAGE_BACKEND'] != 'sqlite':
+    raise RuntimeError('STORAGE_BACKEND=memory only supports WEB_CONCURRENCY=1')
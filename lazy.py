@@ -0,0 +1,35 @@
+import threading
+
+class Lazy:
+    """Stand-in for ``factory()`` that builds it on first use.
+
+    Attribute lookups are forwarded to the built object.  Callables are
+    also cached on the proxy once looked up (as metrics.InstrumentedStore
+    caches its wrappers), so after the first call a hot method costs one
+    dict hit, the same as on the object itself.  Plain attributes are
+    always read through, since they may change.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        return self._target is not None
+
+    def _get(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+                target = self._target
+        return target
+
+    def __getattr__(self, name):
+        attr = getattr(self._get(), name)
+        if callable(attr):
+            self.__dict__[name] = attr
+        return attr
@@ -0,0 +1,38 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# LOG_LEVEL=DEBUG brings back the per-request traces (admin checks,
+# login attempts); INFO keeps account events, WARNING only failures.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_root = logging.getLogger('aura')
+_listener = None
+
+def _configure():
+    """Route 'aura.*' records through a queue drained by a writer thread.
+
+    Request threads only enqueue; formatting and the stdout write happen
+    on the listener thread, so a slow terminal or log pipe never stalls a
+    request.
+    """
+    global _listener
+    records = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter(LOG_FORMAT))
+    _listener = QueueListener(records, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    _root.addHandler(QueueHandler(records))
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+def get_logger(name):
+    if _listener is None:
+        _configure()
+    return _root.getChild(name)
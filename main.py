@@ -1,56 +1,356 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, request, jsonify, session, redirect, stream_with_context, url_for
+from werkzeug.middleware.proxy_fix import ProxyFix
+import hmac
+import json
 import os
-import uuid
 from datetime import datetime
+from time import perf_counter
+
+from pagination import page_args, page_response
+from events import ADMIN, EventBroker, user_channel
+from follows import FollowGraph, HomeTimelines
+from models import Message, Post, Report, User, conversation_id
+from moderation import ACTIONS, Moderator, ReportQueue
+from ranking import SORTS, FeedRanker
+from reactions import REACTIONS, ReactionBuffer, normalize_reaction
+from response_cache import FOLLOWS, POSTS, RANKING, REPORTS, SESSIONS, STATS, USERS, LocalVersions, ResponseCache
+from search import InvertedIndex
+from stats import StatsAggregator
+from topics import HashtagIndex, TrendingTopics, extract_hashtags, extract_mentions, normalize_tag
+from authors import AuthorCache
+from credentials import HasherBusy, PasswordHasher
+from assets import PageCache, StaticAssets
+from compression import Compressor
+from database import DATABASE_PATH, FTSIndex, SQLiteHashtagIndex, SQLiteStore
+from sessions import MemorySessions, ServerSessionInterface, SQLiteSessions, UserContextCache
+from shared_state import SharedVersions, SQLiteEventLog
+from ratelimit import buckets_from_env, by_ip, by_user, limiter_from_env, parse_overrides
+from lazy import Lazy
+from logs import get_logger
+from metrics import InstrumentedStore, Registry
+from profiler import SamplingProfiler
+from snapshot import SnapshotStore
+from store import MemoryStore
 
 app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'aura_social_pro_admin_2024_secure')
-
-# Enhanced user storage with admin support
-users_db = {}
-posts_db = []
-reports_db = []
-
-class User:
-    def __init__(self, username, email, password, is_admin=False):
-        self.id = str(uuid.uuid4())
-        self.username = username
-        self.email = email
-        self.password = password
-        self.display_name = username
-        self.bio = "Welcome to my Aura! ✨"
-        self.avatar = "👤"
-        self.is_admin = is_admin
-        self.is_active = True
-        self.created_at = datetime.now().isoformat()
-        self.last_login = datetime.now().isoformat()
-
-class Post:
-    def __init__(self, user_id, content):
-        self.id = str(uuid.uuid4())
-        self.user_id = user_id
-        self.content = content
-        self.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        self.likes = 0
-        self.is_approved = True
-        self.reports = 0
-        self.username = ""
-        self.display_name = ""
-        self.avatar = "👤"
+log = get_logger('app')
+
+def config_from_env():
+    """Settings read from the environment; ``create_app(config)`` overrides any of them"""
+    env = os.environ.get
+    return {
+        'SECRET_KEY': env('SECRET_KEY', 'aura_social_pro_admin_2024_secure'),
+        # sqlite persists users and posts to DATABASE_PATH and is the backend
+        # for running several worker processes (see gunicorn.conf.py): cache
+        # versions, published events, sessions and rate limits go through
+        # the same file
+        'STORAGE_BACKEND': env('STORAGE_BACKEND', 'memory'),
+        'DATABASE_PATH': env('DATABASE_PATH', DATABASE_PATH),
+        # With the memory backend, keep a snapshot plus write log here so a
+        # restart picks up where the last process stopped; empty disables it
+        'SNAPSHOT_PATH': env('SNAPSHOT_PATH', ''),
+        'SNAPSHOT_INTERVAL': float(env('SNAPSHOT_INTERVAL', 300)),
+        # Number of reverse proxies in front of the app (Render has one), so
+        # per-IP limits see the client address rather than the proxy's
+        'TRUSTED_PROXIES': int(env('TRUSTED_PROXIES', 0)),
+        # The cookie carries an opaque id; session data lives server-side
+        # for SESSION_TTL seconds after its last save
+        'SESSION_TTL': int(env('SESSION_TTL', 7 * 86400)),
+        # gzip/brotli for text responses of at least this many bytes
+        'COMPRESS_MIN_SIZE': int(env('COMPRESS_MIN_SIZE', 1024)),
+        'RATE_LIMIT_ENABLED': env('RATE_LIMIT_ENABLED', 'true').lower() != 'false',
+        # Per-route overrides, e.g. "login=20/minute,create_post=5/minute"
+        'RATE_LIMITS': env('RATE_LIMITS', ''),
+        # Open /api/stream connections per worker, each holding a thread;
+        # 0 for no limit.  gunicorn.conf.py sets it from the thread count.
+        'SSE_MAX_SUBSCRIBERS': int(env('SSE_MAX_SUBSCRIBERS', 0)),
+        # When set, required as a bearer token on /metrics
+        'METRICS_TOKEN': env('METRICS_TOKEN', ''),
+        'PROFILE_REQUESTS': env('PROFILE_REQUESTS', 'false').lower() == 'true',
+        'PROFILE_INTERVAL': float(env('PROFILE_INTERVAL', 0.005)),
+        # Hashtag counts over the last TRENDING_WINDOW seconds, in one-minute slices
+        'TRENDING_WINDOW': int(env('TRENDING_WINDOW', 3600)),
+        # How often the ?sort=top|hot feeds are re-ranked, in seconds
+        'RANKING_REFRESH': float(env('RANKING_REFRESH', 60)),
+        # The admin/demo accounts and sample posts; off by default, since
+        # hashing their passwords is most of a cold start's work
+        'SEED_SAMPLE_DATA': env('SEED_SAMPLE_DATA', 'false').lower() == 'true',
+    }
+
+# ========== SUBSYSTEMS ========== #
+# Each is built from app.config on first use, so importing this module
+# and create_app() do no I/O; the first request that needs the store
+# opens it.
+def _sqlite():
+    return app.config['STORAGE_BACKEND'] == 'sqlite'
+
+def _database():
+    """Path of the SQLite file, its schema created (by building the store) first"""
+    return store.path
+
+def build_store():
+    if _sqlite():
+        backend = SQLiteStore(app.config['DATABASE_PATH'], user_cls=User, post_cls=Post)
+    elif app.config['SNAPSHOT_PATH']:
+        try:
+            backend = SnapshotStore(app.config['SNAPSHOT_PATH'], interval=app.config['SNAPSHOT_INTERVAL'])
+        except RuntimeError as e:
+            # Memory stores are per process; only one worker can own the file
+            log.warning('Not persisting this process: %s', e)
+            backend = MemoryStore()
+    else:
+        backend = MemoryStore()
+    return InstrumentedStore(backend, STORE_CALLS, STORE_SECONDS)
+
+def build_memory_index(index, approved_only=False):
+    """``index`` filled with the posts already in the store, e.g. restored from a snapshot"""
+    # Oldest first, the order the routes add posts in
+    after = 0
+    while True:
+        posts = store.posts_after(after, 1000)
+        if not posts:
+            return index
+        for post in posts:
+            if post.is_approved or not approved_only:
+                index.add(post)
+        after = posts[-1].seq
+
+def build_versions():
+    return SharedVersions(_database()) if _sqlite() else LocalVersions()
+
+store = Lazy(build_store)
+search_index = Lazy(lambda: FTSIndex(_database()) if _sqlite() else build_memory_index(InvertedIndex()))
+hashtags = Lazy(lambda: SQLiteHashtagIndex(_database()) if _sqlite() else build_memory_index(HashtagIndex(), approved_only=True))
+versions = Lazy(build_versions)
+limiter = limiter_from_env(backend=Lazy(lambda: buckets_from_env(_database() if _sqlite() else None)))
+
+# Fingerprinted static files, pages rendered once, and response compression
+assets = StaticAssets()
+pages = PageCache(app)
+compressor = Compressor()
+
+# ========== METRICS ========== #
+metrics = Registry()
+REQUEST_LATENCY = metrics.histogram('aura_request_duration_seconds', 'Request latency by route',
+                                    labels=('endpoint', 'method', 'status'))
+REQUESTS_IN_FLIGHT = metrics.gauge('aura_requests_in_flight', 'Requests being handled')
+STORE_CALLS = metrics.counter('aura_store_operations_total', 'Store method calls', labels=('op',))
+STORE_SECONDS = metrics.counter('aura_store_operation_seconds_total', 'Time spent in store methods', labels=('op',))
+profiler = SamplingProfiler()
+
+broker = EventBroker()
+hasher = PasswordHasher()
+response_cache = ResponseCache(versions)
+authors = AuthorCache(store)
+user_contexts = UserContextCache(store)
+stats = StatsAggregator(store)
+graph = FollowGraph(store)
+timelines = HomeTimelines(store, graph)
+trending = Lazy(lambda: TrendingTopics(store, window=app.config['TRENDING_WINDOW']))
+# A re-rank only changes this worker's rankings, so it drops only its own cached pages
+ranker = Lazy(lambda: FeedRanker(store, graph, refresh=app.config['RANKING_REFRESH'],
+                                 on_refresh=lambda: response_cache.touch(RANKING)))
+
+def publish_reactions(post_ids):
+    # Cached feed bodies are not invalidated for reactions: their counts
+    # may lag until the next POSTS change, and open pages get the exact
+    # ones from this event
+    counts = store.reaction_counts(post_ids, REACTIONS)
+    if counts:
+        broker.publish('reactions', counts)
+
+reaction_buffer = ReactionBuffer(store, on_flush=publish_reactions)
+
+def on_remote_event(event, data):
+    """Apply a write another worker shared (broker.share) to this worker's derived state.
+
+    Each worker keeps its own stats, follow graph, home timelines, report
+    queue and caches; they take the delta rather than being rebuilt.
+    """
+    if event == 'post_created':
+        post = store.get_post(data['id'])
+        if post is not None:
+            stats.on_post_created(post.user_id)
+            timelines.on_post_created(post)
+            trending.on_post_created(post)
+    elif event == 'moderated':
+        if data['resolved']:
+            stats.on_report_resolved(data['resolved'])
+        report_queue.discard(data['post_ids'])
+        for item in data['posts']:
+            if data['action'] == 'delete':
+                stats.on_post_deleted(item['user_id'])
+            if data['action'] == 'approve':
+                post = store.get_post(item['id'])
+                if post is not None:
+                    timelines.on_post_created(post)
+                    trending.on_post_created(post, item['tags'])
+            elif item['was_approved']:
+                # Deleted posts are gone from the store, hence the
+                # timestamp and tags in the delta
+                trending.on_post_removed(item['timestamp'], item['tags'])
+    elif event == 'report_added':
+        stats.on_report_filed()
+        report_queue.push(data['post_id'])
+    elif event == 'user_added':
+        user = store.get_user(data['id'])
+        if user is not None:
+            stats.on_register(user)
+    elif event == 'user_login':
+        user = store.get_user(data['id'])
+        if user is not None:
+            stats.on_login(user)
+    elif event == 'user_changed':
+        authors.invalidate(data['id'])
+        user_contexts.invalidate(data['id'])
+    elif event == 'follow_changed':
+        graph.apply(data['follower_id'], data['followee_id'], data['following'])
+        timelines.on_follow_changed(data['follower_id'])
+    elif event == 'imported':
+        # ``python -m bulk import`` wrote to the database directly
+        authors.clear()
+        user_contexts.clear()
+        report_queue.reset()
+        stats.reset()
+        graph.reset()
+        timelines.reset()
+        trending.reset()
+
+broker.on_remote(on_remote_event)
+
+@app.before_request
+def sync_shared_state():
+    if _sqlite():
+        versions.sync()
+    broker.start_relay()
+
+@app.before_request
+def load_user_context():
+    """Resolve the signed-in user once per request, ending sessions of suspended or deleted users"""
+    g.user = None
+    user_id = session.get('user_id')
+    if user_id is None:
+        return
+    user = user_contexts.get(user_id)
+    if user is None or not user.is_active:
+        session.clear()
+        return
+    g.user = user
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    profiler.enter(request.endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_LATENCY.observe(perf_counter() - started, request.endpoint or 'unmatched', request.method,
+                                response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    if g.pop('request_started', None) is not None:
+        REQUESTS_IN_FLIGHT.dec()
+    profiler.exit()
+
+@metrics.collector('aura_cache_hits_total', 'counter', 'Cache lookups that hit', labels=('cache',))
+def cache_hits():
+    return [(('response',), response_cache.hits), (('author',), authors.hits), (('password',), hasher.cache_hits),
+            (('user_context',), user_contexts.hits)]
+
+@metrics.collector('aura_cache_misses_total', 'counter', 'Cache lookups that missed', labels=('cache',))
+def cache_misses():
+    return [(('response',), response_cache.misses), (('author',), authors.misses),
+            (('password',), hasher.cache_misses), (('user_context',), user_contexts.misses)]
+
+@metrics.collector('aura_rate_limited_total', 'counter', 'Requests rejected with 429', labels=('limit',))
+def rate_limited():
+    return [((name,), count) for name, count in limiter.rejected().items()]
+
+@metrics.collector('aura_compression_bytes_total', 'counter', 'Response bytes before and after compression',
+                   labels=('stage',))
+def compression_bytes():
+    return [(('in',), compressor.bytes_in), (('out',), compressor.bytes_out)]
+
+@metrics.collector('aura_sse_subscribers', 'gauge', 'Open /api/stream connections')
+def sse_subscribers():
+    return [((), broker.subscriber_count())]
+
+def serialize_post(post):
+    """Feed representation of a post, shared by /api/posts and push events"""
+    return {
+        'id': post.id,
+        'content': post.content,
+        'timestamp': post.timestamp,
+        **reaction_buffer.counts(post),
+        **authors.get(post.user_id)
+    }
+
+def serialize_admin_post(post):
+    return {
+        'id': post.id,
+        'content': post.content,
+        'username': authors.get(post.user_id)['username'],
+        'timestamp': post.timestamp,
+        **reaction_buffer.counts(post),
+        'reports': post.reports,
+        'is_approved': post.is_approved
+    }
+
+def on_moderated(action, post_ids, posts, resolved):
+    """Side effects of Moderator.apply; also runs on the moderation pool"""
+    if resolved:
+        stats.on_report_resolved(resolved)
+    items = []
+    for post in posts:
+        tags = extract_hashtags(post.content)
+        # A deleted post that was hidden already left trending then
+        was_approved = action != 'approve' and (action == 'hide' or post.is_approved)
+        if action == 'delete':
+            stats.on_post_deleted(post.user_id)
+            search_index.remove(post)
+        if action == 'approve':
+            hashtags.add(post, tags)
+            trending.on_post_created(post, tags)
+        else:
+            hashtags.remove(post)
+            if was_approved:
+                trending.on_post_removed(post.timestamp, tags)
+        items.append({'id': post.id, 'user_id': post.user_id, 'timestamp': post.timestamp,
+                      'tags': tags, 'was_approved': was_approved})
+    response_cache.bump(POSTS, REPORTS, STATS)
+    broker.share('moderated', {'action': action, 'post_ids': post_ids, 'resolved': resolved, 'posts': items})
+    if action == 'approve':
+        for post in posts:
+            broker.publish('new_post', serialize_post(post))
+    elif posts:
+        broker.publish('posts_removed', {'ids': [post.id for post in posts]})
+
+report_queue = ReportQueue(store)
+moderator = Moderator(store, report_queue, on_applied=on_moderated)
+
+# Most posts or users one batch moderation request may touch
+MAX_BATCH = 1000
 
 # Initialize with admin user - FIXED CREDENTIALS
 def init_sample_data():
     # Create admin user - SIMPLE PASSWORD
-    if 'admin' not in users_db:
-        admin_user = User('admin', 'admin@aura.social', 'admin', is_admin=True)  # Changed to simple 'admin'
-        users_db['admin'] = admin_user
-        print("👑 ADMIN USER CREATED: username 'admin', password 'admin'")
+    if not store.has_username('admin'):
+        admin_user = User('admin', 'admin@aura.social', hasher.hash('admin'), is_admin=True)  # Changed to simple 'admin'
+        store.add_user(admin_user)
+        stats.on_register(admin_user)
+        log.info("Admin user created: username 'admin', password 'admin'")
     
     # Create demo user
-    if 'demo' not in users_db:
-        demo_user = User('demo', 'demo@aura.social', 'demo')
-        users_db['demo'] = demo_user
-        print("👤 DEMO USER: username 'demo', password 'demo'")
+    if not store.has_username('demo'):
+        demo_user = User('demo', 'demo@aura.social', hasher.hash('demo'))
+        store.add_user(demo_user)
+        stats.on_register(demo_user)
+        log.info("Demo user created: username 'demo', password 'demo'")
         
         # Create sample posts
         sample_posts = [
@@ -61,35 +361,80 @@ def init_sample_data():
         
         for content in sample_posts:
             post = Post(demo_user.id, content)
-            post.username = demo_user.username
-            post.display_name = demo_user.display_name
-            post.avatar = demo_user.avatar
-            posts_db.append(post)
+            store.add_post(post)
+            stats.on_post_created(post.user_id)
+            search_index.add(post)
+            hashtags.add(post)
+
+    log.info('Total users: %d, total posts: %d', store.count_users(), store.count_posts())
+
+def seed_sample_data():
+    """init_sample_data, run by one worker at a time when they share a database"""
+    if not _sqlite():
+        init_sample_data()
+        return
+    # Workers booting together would otherwise all see an empty users table
+    import fcntl
+    with open(_database() + '.seed.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        init_sample_data()
+
+_created = False
+
+def create_app(config=None):
+    """Configure the app from the environment, with ``config`` overriding any setting.
+
+    Storage, the search and hashtag indexes, the session, rate-limit and
+    event-log backends and the static asset cache are all built on first
+    use, so this returns without touching the disk.  Sample data is only
+    seeded with SEED_SAMPLE_DATA.  The routes share this module's
+    subsystems, so there is one app per process and this runs once.
+    """
+    global _created
+    if _created:
+        raise RuntimeError('create_app() has already run in this process')
+    _created = True
+
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    proxies = app.config['TRUSTED_PROXIES']
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
+    assets.init_app(app)
+    compressor.init_app(app)
+    session_backend = Lazy(lambda: SQLiteSessions(_database()) if _sqlite() else MemorySessions())
+    app.session_interface = ServerSessionInterface(session_backend, ttl=app.config['SESSION_TTL'])
+    broker.log = Lazy(lambda: SQLiteEventLog(_database())) if _sqlite() else None
+    limiter.enabled = app.config['RATE_LIMIT_ENABLED']
+    rate_limits = app.config['RATE_LIMITS']
+    limiter.overrides = parse_overrides(rate_limits) if isinstance(rate_limits, str) else rate_limits
+    broker.max_subscribers = app.config['SSE_MAX_SUBSCRIBERS']
+    profiler.interval = app.config['PROFILE_INTERVAL']
+    if app.config['PROFILE_REQUESTS']:
+        profiler.start()
+
+    if app.config['SEED_SAMPLE_DATA']:
+        seed_sample_data()
+    return app
 
-    print(f"✅ Total users: {len(users_db)}")
-    print(f"✅ Total posts: {len(posts_db)}")
+@app.cli.command('seed')
+def seed_command():
+    """Create the admin and demo accounts and sample posts: ``flask --app main seed``"""
+    if not _created:
+        create_app()
+    seed_sample_data()
 
 # Admin authentication middleware
 def require_admin(f):
     def decorated_function(*args, **kwargs):
-        print(f"🔐 Checking admin access for {session.get('username', 'No user')}")
-        
-        if 'username' not in session:
-            print("❌ No user in session - redirecting to login")
+        if g.user is None:
             return redirect('/login')
-        
-        username = session['username']
-        user = users_db.get(username)
-        
-        if not user:
-            print(f"❌ User {username} not found in database")
-            return jsonify({'success': False, 'error': 'User not found'}), 403
-        
-        if not user.is_admin:
-            print(f"❌ User {username} is not admin")
+
+        if not g.user.is_admin:
+            log.warning('Admin check: user %s is not an admin', g.user.username)
             return jsonify({'success': False, 'error': 'Admin access required'}), 403
-        
-        print(f"✅ Admin access granted for {username}")
+
         return f(*args, **kwargs)
     
     decorated_function.__name__ = f.__name__
@@ -98,58 +443,58 @@ def require_admin(f):
 # ========== ROUTES ========== #
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return pages.render('index.html')
 
 @app.route('/login')
 def login():
-    return render_template('login.html')
+    return pages.render('login.html')
 
 @app.route('/register')
 def register():
-    return render_template('register.html')
+    return pages.render('register.html')
 
 @app.route('/feed')
 def feed():
     if 'user_id' not in session:
         return redirect('/login')
-    return render_template('feed.html')
+    return pages.render('feed.html')
 
 @app.route('/profile')
 def profile():
     if 'user_id' not in session:
         return redirect('/login')
-    return render_template('profile.html')
+    return pages.render('profile.html')
 
 @app.route('/messages')
 def messages():
     if 'user_id' not in session:
         return redirect('/login')
-    return render_template('messages.html')
+    return pages.render('messages.html')
 
 # ADMIN PANEL ROUTES
 @app.route('/admin')
 @require_admin
 def admin_dashboard():
-    print("🎯 Rendering admin dashboard")
-    return render_template('admin_dashboard.html')
+    return pages.render('admin_dashboard.html')
 
 @app.route('/admin/users')
 @require_admin
 def admin_users():
-    return render_template('admin_users.html')
+    return pages.render('admin_users.html')
 
 @app.route('/admin/posts')
 @require_admin
 def admin_posts():
-    return render_template('admin_posts.html')
+    return pages.render('admin_posts.html')
 
 @app.route('/admin/reports')
 @require_admin
 def admin_reports():
-    return render_template('admin_reports.html')
+    return pages.render('admin_reports.html')
 
 # ========== API ROUTES ========== #
 @app.route('/api/register', methods=['POST'])
+@limiter.limit('register', '5/hour')
 def api_register():
     try:
         data = request.get_json()
@@ -160,56 +505,70 @@ def api_register():
         if not username or not email or not password:
             return jsonify({'success': False, 'error': 'All fields are required'})
 
-        if username in users_db:
+        if store.has_username(username):
             return jsonify({'success': False, 'error': 'Username already exists'})
 
-        user = User(username, email, password)
-        users_db[username] = user
+        user = User(username, email, hasher.hash(password))
+        store.add_user(user)
+        stats.on_register(user)
+        response_cache.bump(USERS, STATS)
+        broker.share('user_added', {'id': user.id})
 
+        session.regenerate()
         session['user_id'] = user.id
-        session['username'] = user.username
-        session['is_admin'] = user.is_admin
 
-        print(f"✅ New user registered: {username}")
+        broker.publish('user_registered', {'username': user.username}, channel=ADMIN)
+        log.info('New user registered: %s', username)
         return jsonify({'success': True, 'message': 'Registration successful'})
 
-    except Exception as e:
-        print(f"❌ Registration error: {e}")
+    except HasherBusy:
+        return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
+    except Exception:
+        log.exception('Registration failed')
         return jsonify({'success': False, 'error': 'Registration failed'})
 
 @app.route('/api/login', methods=['POST'])
+@limiter.limit('login', '10/minute')
 def api_login():
     try:
         data = request.get_json()
         username = data.get('username', '').strip()
         password = data.get('password', '')
 
-        print(f"🔐 Login attempt: {username}")
+        log.debug('Login attempt: %s', username)
 
         if not username or not password:
             return jsonify({'success': False, 'error': 'Username and password are required'})
 
-        user = users_db.get(username)
+        user = store.get_user_by_username(username)
         
         if not user:
-            print(f"❌ User {username} not found")
+            log.info('Login failed, unknown user: %s', username)
             return jsonify({'success': False, 'error': 'Invalid credentials'})
 
-        if user.password != password:
-            print(f"❌ Invalid password for {username}")
+        ok, needs_rehash = hasher.verify(password, user.password)
+        if not ok:
+            log.info('Login failed, wrong password: %s', username)
             return jsonify({'success': False, 'error': 'Invalid credentials'})
 
+        if needs_rehash:
+            store.update_user(user, password=hasher.hash(password))
+
         if not user.is_active:
             return jsonify({'success': False, 'error': 'Account suspended'})
 
-        # Set session data
+        # New session id on every login
+        session.regenerate()
         session['user_id'] = user.id
-        session['username'] = user.username
-        session['is_admin'] = user.is_admin
 
-        user.last_login = datetime.now().isoformat()
+        store.update_user(user, last_login=datetime.now().isoformat())
+        stats.on_login(user)
+        # last_login only shows in admin views keyed on STATS; bumping
+        # USERS here would drop every feed and profile on each login
+        response_cache.bump(STATS)
+        broker.share('user_login', {'id': user.id})
 
-        print(f"✅ Login successful: {username} (Admin: {user.is_admin})")
+        log.info('Login: %s (admin: %s)', username, user.is_admin)
         return jsonify({
             'success': True, 
             'message': 'Login successful', 
@@ -217,25 +576,25 @@ def api_login():
             'username': user.username
         })
 
-    except Exception as e:
-        print(f"❌ Login error: {e}")
+    except HasherBusy:
+        return jsonify({'success': False, 'error': 'Server busy, please try again'}), 503
+    except Exception:
+        log.exception('Login failed')
         return jsonify({'success': False, 'error': 'Login failed'})
 
 @app.route('/api/logout', methods=['POST'])
 def api_logout():
-    print(f"🚪 Logout: {session.get('username', 'Unknown')}")
+    log.debug('Logout: %s', g.user.username if g.user else 'Unknown')
     session.clear()
     return jsonify({'success': True})
 
 @app.route('/api/current_user')
+@response_cache.cached(USERS, per_viewer=True)
 def api_current_user():
-    username = session.get('username')
-    print(f"👤 Current user check: {username}")
-    
-    if not username:
+    if g.user is None:
         return jsonify({'error': 'Not logged in'})
 
-    user = users_db.get(username)
+    user = store.get_user(g.user.id)
     
     if not user:
         return jsonify({'error': 'User not found'})
@@ -247,28 +606,25 @@ def api_current_user():
         'bio': user.bio,
         'avatar': user.avatar,
         'is_admin': user.is_admin,
-        'is_active': user.is_active
+        'is_active': user.is_active,
+        'followers': len(graph.followers_of(user.id)),
+        'following': len(graph.following_of(user.id))
     })
 
 # ADMIN API ROUTES
 @app.route('/api/admin/stats')
 @require_admin
+@response_cache.cached(STATS, REPORTS)
 def api_admin_stats():
-    stats = {
-        'total_users': len(users_db),
-        'total_posts': len(posts_db),
-        'pending_reports': len([r for r in reports_db if r.status == 'pending']),
-        'active_today': len([u for u in users_db.values() if u.last_login.split('T')[0] == datetime.now().date().isoformat()]),
-        'new_users_today': len([u for u in users_db.values() if u.created_at.split('T')[0] == datetime.now().date().isoformat()])
-    }
-    return jsonify(stats)
+    return jsonify(stats.snapshot())
 
 @app.route('/api/admin/users')
 @require_admin
+@response_cache.cached(USERS, STATS)
 def api_admin_users():
     users_data = []
-    for user in users_db.values():
-        user_posts = len([p for p in posts_db if p.user_id == user.id])
+    for user in store.iter_users():
+        user_posts = stats.post_count(user.id)
         users_data.append({
             'id': user.id,
             'username': user.username,
@@ -283,71 +639,264 @@ def api_admin_users():
 
 @app.route('/api/admin/posts')
 @require_admin
+@response_cache.cached(POSTS, USERS, REPORTS)
 def api_admin_posts():
+    before, limit = page_args(request.args)
+    posts, next_cursor = store.all_posts_page(before, limit)
+    posts_data = [serialize_admin_post(post) for post in posts]
+    return jsonify(page_response(posts_data, next_cursor))
+
+@app.route('/api/admin/reports')
+@require_admin
+@response_cache.cached(REPORTS)
+def api_admin_reports():
+    """The most recent reports, oldest first"""
+    _, limit = page_args(request.args)
+    return jsonify([{
+        'id': report.id,
+        'post_id': report.post_id,
+        'reporter': authors.get(report.reporter_id)['username'],
+        'reason': report.reason,
+        'status': report.status,
+        'created_at': report.created_at
+    } for report in store.recent_reports(limit)])
+
+@app.route('/api/admin/report_queue')
+@require_admin
+@response_cache.cached(POSTS, REPORTS)
+def api_admin_report_queue():
+    """Posts with pending reports, most reported first"""
+    _, limit = page_args(request.args)
     posts_data = []
-    for post in posts_db:
-        user = next((u for u in users_db.values() if u.id == post.user_id), None)
-        posts_data.append({
-            'id': post.id,
-            'content': post.content,
-            'username': user.username if user else 'Unknown',
-            'timestamp': post.timestamp,
-            'likes': post.likes,
-            'reports': post.reports,
-            'is_approved': post.is_approved
-        })
-    return jsonify(posts_data)
+    for post_id, count in report_queue.top(limit):
+        post = store.get_post(post_id)
+        if post is None:
+            continue
+        item = serialize_admin_post(post)
+        item['reports'] = count
+        item['reasons'] = [report.reason for report in store.reports_for_post(post_id)[:5]]
+        posts_data.append(item)
+    return jsonify({'posts': posts_data, 'pending_posts': len(report_queue)})
+
+@app.route('/api/admin/moderate', methods=['POST'])
+@require_admin
+def api_admin_moderate():
+    """Approve, hide or delete a batch: ``{"action": "hide", "post_ids": [...]}``"""
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    post_ids = data.get('post_ids')
+    if action not in ACTIONS:
+        return jsonify({'success': False, 'error': 'Unknown action'}), 400
+    if not isinstance(post_ids, list) or not 0 < len(post_ids) <= MAX_BATCH:
+        return jsonify({'success': False, 'error': f'Send 1 to {MAX_BATCH} post ids'}), 400
+
+    posts, resolved = moderator.apply(action, [str(post_id) for post_id in post_ids])
+    return jsonify({'success': True, 'action': action, 'changed': len(posts), 'resolved': resolved})
+
+def _set_user_active(user, is_active):
+    # Callers bump USERS and SESSIONS once per request
+    store.update_user(user, is_active=is_active)
+    user_contexts.invalidate(user.id)
+    broker.share('user_changed', {'id': user.id})
+    broker.publish('user_updated', {'username': user.username, 'is_active': user.is_active}, channel=ADMIN)
+    if is_active:
+        moderator.restore_user_posts(user.id)
+    else:
+        # Signed-in clients are logged out on their next request
+        app.session_interface.revoke_user(user.id)
+        moderator.hide_user_posts(user.id)
+
+@app.route('/api/admin/moderate_users', methods=['POST'])
+@require_admin
+def api_admin_moderate_users():
+    """Suspend or reinstate a batch of users; their posts are hidden or restored in the background"""
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    usernames = data.get('usernames')
+    if action not in ('suspend', 'reinstate'):
+        return jsonify({'success': False, 'error': 'Unknown action'}), 400
+    if not isinstance(usernames, list) or not 0 < len(usernames) <= MAX_BATCH:
+        return jsonify({'success': False, 'error': f'Send 1 to {MAX_BATCH} usernames'}), 400
+
+    is_active = action == 'reinstate'
+    changed = 0
+    for username in usernames:
+        user = store.get_user_by_username(str(username))
+        if user is None or user.is_active == is_active or user.id == g.user.id:
+            continue
+        _set_user_active(user, is_active)
+        changed += 1
+    if changed:
+        response_cache.bump(USERS, SESSIONS)
+    return jsonify({'success': True, 'action': action, 'changed': changed})
 
 @app.route('/api/admin/toggle_user/<username>', methods=['POST'])
 @require_admin
 def api_admin_toggle_user(username):
-    user = users_db.get(username)
+    user = store.get_user_by_username(username)
     if user:
-        user.is_active = not user.is_active
+        _set_user_active(user, not user.is_active)
+        response_cache.bump(USERS, SESSIONS)
         return jsonify({'success': True, 'is_active': user.is_active})
     return jsonify({'success': False, 'error': 'User not found'})
 
 @app.route('/api/admin/toggle_post/<post_id>', methods=['POST'])
 @require_admin
 def api_admin_toggle_post(post_id):
-    post = next((p for p in posts_db if p.id == post_id), None)
+    post = store.get_post(post_id)
     if post:
-        post.is_approved = not post.is_approved
-        return jsonify({'success': True, 'is_approved': post.is_approved})
+        is_approved = not post.is_approved
+        moderator.apply('approve' if is_approved else 'hide', [post.id])
+        return jsonify({'success': True, 'is_approved': is_approved})
     return jsonify({'success': False, 'error': 'Post not found'})
 
 @app.route('/api/admin/delete_post/<post_id>', methods=['POST'])
 @require_admin
 def api_admin_delete_post(post_id):
-    global posts_db
-    posts_db = [p for p in posts_db if p.id != post_id]
+    moderator.apply('delete', [post_id])
     return jsonify({'success': True})
 
 # User API routes
 @app.route('/api/posts')
 def api_posts():
-    approved_posts = [p for p in posts_db if p.is_approved]
-    
-    for post in approved_posts:
-        user = next((u for u in users_db.values() if u.id == post.user_id), None)
-        if user:
-            post.username = user.username
-            post.display_name = user.display_name
-            post.avatar = user.avatar
+    """The feed, newest first, or ranked with ``?sort=top|hot``"""
+    sort = request.args.get('sort', 'new')
+    if sort == 'new':
+        return latest_posts()
+    if sort not in SORTS:
+        return jsonify({'error': f"sort must be one of new, {', '.join(SORTS)}"}), 400
+    # Checked before the cache, so a stale ranking is refreshed even while
+    # its pages are still being served from it
+    ranker.refresh_if_stale()
+    return ranked_posts(sort)
+
+@response_cache.cached(POSTS, USERS)
+def latest_posts():
+    before, limit = page_args(request.args)
+    approved_posts, next_cursor = store.timeline_page(before, limit)
+    posts_data = [serialize_post(post) for post in approved_posts]
+
+    return jsonify(page_response(posts_data, next_cursor))
+
+@response_cache.cached(POSTS, USERS, RANKING)
+def ranked_posts(sort):
+    # ``before`` is the rank to continue from, as returned in next_cursor
+    offset, limit = page_args(request.args)
+    post_ids, next_cursor = ranker.page(sort, offset, limit)
+    posts = (store.get_post(post_id) for post_id in post_ids)
+    # Posts hidden or deleted since the last re-rank are skipped
+    posts_data = [serialize_post(post) for post in posts if post is not None and post.is_approved]
+    return jsonify({**page_response(posts_data, next_cursor), 'sort': sort})
 
+@app.route('/api/user_posts')
+@response_cache.cached(POSTS, per_viewer=True)
+def api_user_posts():
+    if 'user_id' not in session:
+        return jsonify(page_response([], None))
+
+    before, limit = page_args(request.args)
+    user_posts, next_cursor = store.author_page(session['user_id'], before, limit)
     posts_data = [{
         'id': post.id,
         'content': post.content,
         'timestamp': post.timestamp,
-        'likes': post.likes,
-        'username': post.username,
-        'display_name': post.display_name,
-        'avatar': post.avatar
-    } for post in approved_posts]
+        **reaction_buffer.counts(post)
+    } for post in user_posts]
+
+    return jsonify(page_response(posts_data, next_cursor))
+
+@app.route('/api/home_feed')
+def api_home_feed():
+    """Posts from the accounts the viewer follows, plus their own"""
+    if 'user_id' not in session:
+        return jsonify(page_response([], None))
+
+    before, limit = page_args(request.args)
+    posts, next_cursor = timelines.page(session['user_id'], before, limit)
+    return jsonify(page_response([serialize_post(post) for post in posts], next_cursor))
+
+def _set_following(username, follow):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not logged in'})
+
+    target = store.get_user_by_username(username)
+    if not target:
+        return jsonify({'success': False, 'error': 'User not found'})
+    if target.id == session['user_id']:
+        return jsonify({'success': False, 'error': 'You cannot follow yourself'})
 
-    return jsonify(posts_data)
+    if follow:
+        changed = graph.follow(session['user_id'], target.id)
+    else:
+        changed = graph.unfollow(session['user_id'], target.id)
+    if changed:
+        timelines.on_follow_changed(session['user_id'])
+        response_cache.bump(USERS, FOLLOWS)
+        broker.share('follow_changed', {'follower_id': session['user_id'], 'followee_id': target.id,
+                                        'following': follow})
+
+    return jsonify({
+        'success': True,
+        'following': follow,
+        'followers': len(graph.followers_of(target.id))
+    })
+
+@app.route('/api/follow/<username>', methods=['POST'])
+def api_follow(username):
+    return _set_following(username, True)
+
+@app.route('/api/unfollow/<username>', methods=['POST'])
+def api_unfollow(username):
+    return _set_following(username, False)
+
+@app.route('/api/search')
+@limiter.limit('search', '60/minute', key=by_user)
+def api_search():
+    """Ranked full-text search; admins also see unapproved posts"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    query = request.args.get('q', '').strip()
+    # As with ranked feeds, ``before`` is the rank to continue from
+    offset, limit = page_args(request.args)
+    offset = max(0, offset or 0)
+    if not query:
+        return jsonify(page_response([], None))
+
+    is_admin = g.user is not None and g.user.is_admin
+    posts_data = []
+    # Read on past matches the viewer cannot see until the page is full;
+    # the cursor is the rank after the last match read
+    rank, has_more = offset, True
+    while has_more and len(posts_data) < limit:
+        post_ids, has_more = search_index.search(query, rank, limit)
+        if not post_ids:
+            break
+        for i, post_id in enumerate(post_ids, 1):
+            rank += 1
+            post = store.get_post(post_id)
+            if post is None or not (post.is_approved or is_admin):
+                continue
+            item = serialize_post(post)
+            if is_admin:
+                item['is_approved'] = post.is_approved
+                item['reports'] = post.reports
+            posts_data.append(item)
+            if len(posts_data) == limit:
+                has_more = has_more or i < len(post_ids)
+                break
+
+    return jsonify(page_response(posts_data, rank if has_more else None))
+
+def notify_mentions(post, post_data):
+    """Push a 'mention' event to each active user ``@named`` in the post"""
+    for username in extract_mentions(post.content):
+        user = store.get_user_by_username(username)
+        if user is not None and user.is_active and user.id != post.user_id:
+            broker.publish('mention', post_data, channel=user_channel(user.id))
 
 @app.route('/api/create_post', methods=['POST'])
+@limiter.limit('create_post', '10/minute', key=by_user)
 def api_create_post():
     if 'user_id' not in session:
         return jsonify({'success': False, 'error': 'Not logged in'})
@@ -359,64 +908,283 @@ def api_create_post():
         if not content:
             return jsonify({'success': False, 'error': 'Post content cannot be empty'})
 
-        user = users_db.get(session['username'])
-        if not user:
-            return jsonify({'success': False, 'error': 'User not found'})
-
-        post = Post(user.id, content)
-        post.username = user.username
-        post.display_name = user.display_name
-        post.avatar = user.avatar
+        post = Post(g.user.id, content)
+        tags = extract_hashtags(content)
 
-        posts_db.append(post)
+        store.add_post(post)
+        stats.on_post_created(post.user_id)
+        search_index.add(post)
+        hashtags.add(post, tags)
+        trending.on_post_created(post, tags)
+        timelines.on_post_created(post)
+        response_cache.bump(POSTS, STATS)
+        broker.share('post_created', {'id': post.id})
+        post_data = serialize_post(post)
+        broker.publish('new_post', post_data)
+        notify_mentions(post, post_data)
         return jsonify({'success': True, 'message': 'Post created successfully'})
 
-    except Exception as e:
+    except Exception:
+        log.exception('Failed to create post')
         return jsonify({'success': False, 'error': 'Failed to create post'})
 
+@app.route('/api/report_post/<post_id>', methods=['POST'])
+@limiter.limit('report', '20/hour', key=by_user)
+def api_report_post(post_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not logged in'})
+
+    data = request.get_json(silent=True) or {}
+    reason = str(data.get('reason', '')).strip()[:280] or 'No reason given'
+    post = store.get_post(post_id)
+    if not post:
+        return jsonify({'success': False, 'error': 'Post not found'})
+
+    report = Report(post.id, session['user_id'], reason)
+    if not moderator.report(report):
+        return jsonify({'success': False, 'error': 'You already reported this post'})
+
+    stats.on_report_filed()
+    response_cache.bump(REPORTS, STATS)
+    broker.share('report_added', {'post_id': post.id})
+    broker.publish('report_filed', {'id': report.id, 'post_id': post.id}, channel=ADMIN)
+    return jsonify({'success': True, 'message': 'Report submitted'})
+
 @app.route('/api/like_post/<post_id>', methods=['POST'])
+@limiter.limit('react', '120/minute', key=by_user)
 def api_like_post(post_id):
     if 'user_id' not in session:
         return jsonify({'success': False, 'error': 'Not logged in'})
 
     try:
-        post = next((p for p in posts_db if p.id == post_id), None)
+        post = store.get_post(post_id)
         if post:
-            post.likes += 1
-            return jsonify({'success': True, 'likes': post.likes})
+            likes = reaction_buffer.add(post, 'likes')
+            return jsonify({'success': True, 'likes': likes})
         else:
             return jsonify({'success': False, 'error': 'Post not found'})
-    except Exception as e:
+    except Exception:
+        log.exception('Failed to like post')
         return jsonify({'success': False, 'error': 'Failed to like post'})
 
+@app.route('/api/react_post/<post_id>', methods=['POST'])
+@limiter.limit('react', '120/minute', key=by_user)
+def api_react_post(post_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not logged in'})
+
+    try:
+        data = request.get_json(silent=True) or {}
+        kind = normalize_reaction(data.get('reaction', 'likes'))
+        if not kind:
+            return jsonify({'success': False, 'error': 'Unknown reaction'})
+
+        post = store.get_post(post_id)
+        if post:
+            count = reaction_buffer.add(post, kind)
+            return jsonify({'success': True, 'reaction': kind, 'count': count})
+        else:
+            return jsonify({'success': False, 'error': 'Post not found'})
+    except Exception:
+        log.exception('Failed to react to post')
+        return jsonify({'success': False, 'error': 'Failed to react to post'})
+
+# ========== HASHTAGS ========== #
+@app.route('/api/trending')
+def api_trending():
+    """Hashtags trending over the last TRENDING_WINDOW seconds"""
+    _, limit = page_args(request.args, default_limit=10)
+    return jsonify({
+        'hashtags': [{'tag': tag, 'posts': count} for tag, count in trending.top(limit)],
+        'window': trending.window
+    })
+
+@app.route('/api/hashtags/<tag>')
+@response_cache.cached(POSTS, USERS)
+def api_hashtag(tag):
+    """Approved posts tagged ``#tag``, newest first"""
+    tag = normalize_tag(tag)
+    if tag is None:
+        return jsonify({'error': 'Not a hashtag'}), 400
+
+    before, limit = page_args(request.args)
+    post_ids, next_cursor = hashtags.page(tag, before, limit)
+    posts = (store.get_post(post_id) for post_id in post_ids)
+    posts_data = [serialize_post(post) for post in posts if post is not None and post.is_approved]
+    return jsonify({**page_response(posts_data, next_cursor), 'tag': tag, 'total': hashtags.count(tag)})
+
+# ========== DIRECT MESSAGES ========== #
+MAX_MESSAGE_LENGTH = 2000
+
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'sender': authors.get(message.sender_id)['username'],
+        'content': message.content,
+        'created_at': message.created_at
+    }
+
+@app.route('/api/messages')
+def api_conversations():
+    """The viewer's conversations, most recently active first"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    before, limit = page_args(request.args)
+    conversations, next_cursor = store.inbox_page(session['user_id'], before, limit)
+    return jsonify({
+        'conversations': [{
+            **authors.get(conversation.peer_id),
+            'unread': conversation.unread,
+            'last_message': serialize_message(conversation.last_message)
+        } for conversation in conversations],
+        'next_cursor': next_cursor,
+        'unread': store.unread_count(session['user_id'])
+    })
+
+@app.route('/api/messages/<username>')
+def api_conversation(username):
+    """History with ``username``, newest first; fetching the first page marks it read"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    peer = store.get_user_by_username(username)
+    if not peer:
+        return jsonify({'error': 'User not found'}), 404
+
+    before, limit = page_args(request.args)
+    messages, next_cursor = store.conversation_page(conversation_id(session['user_id'], peer.id), before, limit)
+    if before is None:
+        store.mark_read(session['user_id'], peer.id)
+    return jsonify({
+        'peer': authors.get(peer.id),
+        'messages': [serialize_message(message) for message in messages],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/messages/<username>', methods=['POST'])
+@limiter.limit('message', '30/minute', key=by_user)
+def api_send_message(username):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'error': 'Not logged in'})
+
+    data = request.get_json(silent=True) or {}
+    content = str(data.get('content', '')).strip()
+    if not content:
+        return jsonify({'success': False, 'error': 'Message cannot be empty'})
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return jsonify({'success': False, 'error': f'Messages are limited to {MAX_MESSAGE_LENGTH} characters'})
+
+    peer = store.get_user_by_username(username)
+    if not peer or not peer.is_active:
+        return jsonify({'success': False, 'error': 'User not found'})
+    if peer.id == session['user_id']:
+        return jsonify({'success': False, 'error': 'You cannot message yourself'})
+
+    message = store.add_message(Message(session['user_id'], peer.id, content))
+    message_data = serialize_message(message)
+    broker.publish('message', message_data, channel=user_channel(peer.id))
+    return jsonify({'success': True, 'message': message_data})
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: new posts, reaction counts, moderation changes and direct messages"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    # A user's own channel also receives every public event
+    channel = user_channel(session['user_id'])
+    if request.args.get('channel') == ADMIN:
+        if not g.user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        channel = ADMIN
+
+    q = broker.subscribe(channel)
+    if q is None:
+        response = jsonify({'error': 'Too many live connections, retry later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    response = Response(broker.stream(q), mimetype='text/event-stream')
+    # Also unsubscribes a client that left before the stream started
+    response.call_on_close(lambda: broker.unsubscribe(q))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/update_avatar', methods=['POST'])
 def api_update_avatar():
-    if 'username' not in session:
+    if g.user is None:
         return jsonify({'success': False, 'error': 'Not logged in'})
 
     try:
         data = request.get_json()
         avatar = data.get('avatar', '👤')
         
-        username = session['username']
-        user = users_db.get(username)
+        user = store.get_user(g.user.id)
         
         if user:
-            user.avatar = avatar
+            store.update_user(user, avatar=avatar)
+            authors.invalidate(user.id)
+            response_cache.bump(USERS)
+            broker.share('user_changed', {'id': user.id})
             return jsonify({'success': True, 'message': 'Avatar updated successfully'})
         else:
             return jsonify({'success': False, 'error': 'User not found'})
             
-    except Exception as e:
+    except Exception:
+        log.exception('Failed to update avatar')
         return jsonify({'success': False, 'error': 'Failed to update avatar'})
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition for this worker"""
+    token = app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '').partition('Bearer ')[2]
+        if not hmac.compare_digest(supplied, token):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST'])
+@require_admin
+def api_admin_profiler():
+    """GET: folded stacks per route (``?format=json`` for status).  POST: ``{"enabled": bool, "reset": bool}``"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            profiler.reset()
+        if data.get('enabled') is True:
+            profiler.start()
+        elif data.get('enabled') is False:
+            profiler.stop()
+        return jsonify({'success': True, **profiler.summary()})
+    if request.args.get('format') == 'json':
+        return jsonify(profiler.summary())
+    return Response(profiler.folded(), mimetype='text/plain')
+
+@app.route('/api/admin/export')
+@require_admin
+def api_admin_export():
+    """Stream every user, follow, post and report as NDJSON (``python -m bulk import`` reads it)"""
+    from bulk import export_records
+    # Buffered reactions would otherwise be missing from the counts
+    reaction_buffer.flush()
+    lines = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+             for record in export_records(store))
+    response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename=aura-{datetime.now():%Y%m%d-%H%M%S}.ndjson'
+    return response
+
 @app.route('/favicon.ico')
 def favicon():
     return '', 204
 
 if __name__ == '__main__':
-    init_sample_data()
-    
+    # The development server keeps its demo accounts unless told otherwise
+    create_app({'SEED_SAMPLE_DATA': os.environ.get('SEED_SAMPLE_DATA', 'true').lower() == 'true'})
+
     debug_mode = os.environ.get('DEBUG', 'False').lower() == 'true'
     port = int(os.environ.get('PORT', 8000))
     
@@ -441,4 +1209,4 @@ if __name__ == '__main__':
 
 @app.route('/admin_test')
 def admin_test():
-    return render_template('admin_test.html')
+    return pages.render('admin_test.html')
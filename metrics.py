@@ -0,0 +1,161 @@
+import threading
+from bisect import bisect_left
+from functools import wraps
+from inspect import ismethod
+from time import perf_counter
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f'{self.name}{_labels(self.label_names, label_values)} {_number(value)}'
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                yield f'{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.label_names, label_values)} {total!r}'
+            yield f'{self.name}_count{_labels(self.label_names, label_values)} {cumulative}'
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Hot paths update counters and histograms directly.  Values that other
+    objects already track (cache hits, queue depths) are read at scrape
+    time by ``collector`` callbacks, so recording them costs nothing per
+    request.  Each gunicorn worker exposes its own series.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._add(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, name, kind, documentation, labels=()):
+        """Register ``fn() -> [(label values, value)]`` as a scrape-time metric"""
+        def decorator(fn):
+            self._collectors.append((name, kind, documentation, tuple(labels), fn))
+            return fn
+        return decorator
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        for name, kind, documentation, label_names, fn in self._collectors:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for label_values, value in fn():
+                lines.append(f'{name}{_labels(label_names, label_values)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+class InstrumentedStore:
+    """Store proxy that counts and times every public method call.
+
+    Wrappers are built on first access and cached on the instance, so
+    later calls skip ``__getattr__`` entirely.
+    """
+
+    def __init__(self, store, calls, seconds):
+        self._store = store
+        self._calls = calls
+        self._seconds = seconds
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if name.startswith('_') or not ismethod(attr):
+            return attr
+        calls, seconds = self._calls, self._seconds
+
+        @wraps(attr)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                calls.inc(name)
+                seconds.inc(name, amount=perf_counter() - start)
+
+        self.__dict__[name] = timed
+        return timed
@@ -0,0 +1,85 @@
+import sys
+import uuid
+from datetime import datetime
+
+# Compact record types shared by the stores.  ``__slots__`` drops the
+# per-instance __dict__, and post timestamps (minute resolution) are
+# interned so every post from the same minute shares one string.  Author
+# name/avatar are not copied onto posts; feeds join them from
+# authors.AuthorCache.
+
+class User:
+    __slots__ = ('id', 'username', 'email', 'password', 'display_name', 'bio', 'avatar',
+                 'is_admin', 'is_active', 'created_at', 'last_login')
+
+    def __init__(self, username, email, password_hash, is_admin=False):
+        self.id = str(uuid.uuid4())
+        self.username = username
+        self.email = email
+        self.password = password_hash
+        self.display_name = username
+        self.bio = "Welcome to my Aura! ✨"
+        self.avatar = "👤"
+        self.is_admin = is_admin
+        self.is_active = True
+        self.created_at = datetime.now().isoformat()
+        self.last_login = datetime.now().isoformat()
+
+class Post:
+    __slots__ = ('id', 'seq', 'user_id', 'content', 'timestamp', 'likes', 'loves', 'laughs', 'wows',
+                 'is_approved', 'reports', 'hidden_by')
+
+    def __init__(self, user_id, content):
+        self.id = str(uuid.uuid4())
+        self.seq = None
+        self.user_id = user_id
+        self.content = content
+        self.timestamp = sys.intern(datetime.now().strftime("%Y-%m-%d %H:%M"))
+        self.likes = 0
+        self.loves = 0
+        self.laughs = 0
+        self.wows = 0
+        self.is_approved = True
+        self.reports = 0
+        # Set on a hidden post when a cascade rather than a moderator hid it
+        # ('suspension'), so undoing the cascade unhides exactly those posts
+        self.hidden_by = ''
+
+class Report:
+    __slots__ = ('id', 'post_id', 'reporter_id', 'reason', 'status', 'created_at')
+
+    def __init__(self, post_id, reporter_id, reason):
+        self.id = str(uuid.uuid4())
+        self.post_id = post_id
+        self.reporter_id = reporter_id
+        self.reason = reason
+        self.status = 'pending'
+        self.created_at = datetime.now().isoformat()
+
+def conversation_id(user_a, user_b):
+    """Key of the direct-message log between two users, the same from either side"""
+    return ':'.join(sorted((user_a, user_b)))
+
+class Message:
+    __slots__ = ('id', 'seq', 'conversation_id', 'sender_id', 'recipient_id', 'content', 'created_at')
+
+    def __init__(self, sender_id, recipient_id, content):
+        self.id = str(uuid.uuid4())
+        self.seq = None
+        self.conversation_id = conversation_id(sender_id, recipient_id)
+        self.sender_id = sender_id
+        self.recipient_id = recipient_id
+        self.content = content
+        self.created_at = datetime.now().isoformat()
+
+class Conversation:
+    """One participant's inbox entry: the peer, the latest message and how many are unread"""
+    __slots__ = ('id', 'user_id', 'peer_id', 'last_seq', 'last_message', 'unread')
+
+    def __init__(self, user_id, peer_id):
+        self.id = conversation_id(user_id, peer_id)
+        self.user_id = user_id
+        self.peer_id = peer_id
+        self.last_seq = None
+        self.last_message = None
+        self.unread = 0
@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import get_logger
+
+log = get_logger('moderation')
+
+# Report statuses: approving a post marks its reports reviewed, hiding or
+# deleting it marks them resolved
+PENDING = 'pending'
+REVIEWED = 'reviewed'
+RESOLVED = 'resolved'
+
+ACTIONS = ('approve', 'hide', 'delete')
+# Post.hidden_by of posts hidden because their author was suspended
+SUSPENSION = 'suspension'
+MODERATION_WORKERS = int(os.environ.get('MODERATION_WORKERS', 2))
+# Cascades lock their user through one of this many locks
+USER_LOCK_STRIPES = 64
+
+class ReportQueue:
+    """Posts with pending reports, most-reported first.
+
+    A heap of ``(-count, order, post_id)``; a new report pushes a fresh
+    entry instead of re-sifting the old one, and entries that no longer
+    match the post's current count are skipped (and compacted away once
+    they outnumber live ones).  Ties go to the post reported first.
+    Seeded from the store's pending reports on first use.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._built = False
+        self._order = itertools.count()
+        self._heap = []
+        self._counts = {}
+        self._first = {}
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                for report in self.store.iter_reports(PENDING):
+                    self._push(report.post_id)
+                self._built = True
+
+    def _push(self, post_id):
+        count = self._counts.get(post_id, 0) + 1
+        self._counts[post_id] = count
+        order = self._first.setdefault(post_id, next(self._order))
+        heapq.heappush(self._heap, (-count, order, post_id))
+        if len(self._heap) > 2 * len(self._counts) + 64:
+            self._heap = [(-c, self._first[p], p) for p, c in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def _is_live(self, entry):
+        neg_count, order, post_id = entry
+        return self._counts.get(post_id) == -neg_count and self._first.get(post_id) == order
+
+    def push(self, post_id):
+        """Count a new pending report on ``post_id``"""
+        # Before the first read the seeding pass will see this report
+        with self._lock:
+            if self._built:
+                self._push(post_id)
+
+    def discard(self, post_ids):
+        with self._lock:
+            for post_id in post_ids:
+                self._counts.pop(post_id, None)
+                self._first.pop(post_id, None)
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._heap = []
+            self._counts.clear()
+            self._first.clear()
+
+    def top(self, limit=20):
+        """``[(post_id, pending_count)]`` for the ``limit`` most-reported posts"""
+        self._ensure_built()
+        with self._lock:
+            taken = []
+            while self._heap and len(taken) < limit:
+                entry = heapq.heappop(self._heap)
+                if self._is_live(entry):
+                    taken.append(entry)
+            for entry in taken:
+                heapq.heappush(self._heap, entry)
+        return [(post_id, -neg_count) for neg_count, _, post_id in taken]
+
+    def __len__(self):
+        self._ensure_built()
+        return len(self._counts)
+
+class Moderator:
+    """Batch moderation actions, with slow cascades on a worker pool.
+
+    ``apply`` resolves the pending reports of a batch of posts and then
+    approves, hides or deletes them with one store call.  ``on_applied``
+    (``action, post_ids, posts, resolved``) receives the batch, the posts
+    whose state actually changed and the number of reports resolved, and
+    runs the cache, search and push side effects.
+
+    Hiding every post of a suspended user is queued on a small thread
+    pool and done ``batch_size`` posts at a time, so the admin request
+    returns immediately.  Those posts are marked ``hidden_by=SUSPENSION``,
+    and reinstating the user unhides exactly them, leaving posts a
+    moderator hid alone.
+    """
+
+    def __init__(self, store, queue, max_workers=MODERATION_WORKERS, batch_size=500, on_applied=None):
+        self.store = store
+        self.queue = queue
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.on_applied = on_applied
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._user_locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+
+    def report(self, report):
+        """File ``report``; False if the reporter already has one pending on the post"""
+        if not self.store.add_report(report):
+            return False
+        self.queue.push(report.post_id)
+        return True
+
+    def apply(self, action, post_ids, hidden_by=''):
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown moderation action {action!r}')
+        post_ids = list(dict.fromkeys(post_ids))
+        resolved = self.store.resolve_reports(post_ids, REVIEWED if action == 'approve' else RESOLVED)
+        self.queue.discard(post_ids)
+        if action == 'delete':
+            posts = self.store.delete_posts(post_ids)
+        else:
+            posts = self.store.set_approved_many(post_ids, action == 'approve', hidden_by)
+        if self.on_applied is not None:
+            self.on_applied(action, post_ids, posts, resolved)
+        return posts, resolved
+
+    # ---------- Background cascades ---------- #
+    def _submit(self, fn, *args):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='moderation')
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future):
+        error = future.exception()
+        if error is not None:
+            log.error('Moderation task failed', exc_info=error)
+
+    def hide_user_posts(self, user_id):
+        """Queue hiding every approved post by the suspended ``user_id``; returns a Future"""
+        return self._submit(self._cascade, user_id, False)
+
+    def _user_lock(self, user_id):
+        # Striped, so the locks stay fixed however many users are moderated
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+
+    def _cascade(self, user_id, is_active):
+        # One cascade per user at a time, and only if the user is still in
+        # the state it was queued for: a quick suspend-then-reinstate must
+        # not end with the hide running last
+        with self._user_lock(user_id):
+            user = self.store.get_user(user_id)
+            if user is None or user.is_active != is_active:
+                return 0
+            if is_active:
+                post_ids = [post.id for post in self.store.posts_for_user(user_id)
+                            if not post.is_approved and post.hidden_by == SUSPENSION]
+            else:
+                post_ids = [post.id for post in self.store.posts_for_user(user_id) if post.is_approved]
+            for i in range(0, len(post_ids), self.batch_size):
+                if is_active:
+                    self.apply('approve', post_ids[i:i + self.batch_size])
+                else:
+                    self.apply('hide', post_ids[i:i + self.batch_size], hidden_by=SUSPENSION)
+            return len(post_ids)
+
+    def restore_user_posts(self, user_id):
+        """Queue unhiding the posts a suspension of the reinstated ``user_id`` hid; returns a Future"""
+        return self._submit(self._cascade, user_id, True)
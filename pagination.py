@@ -0,0 +1,14 @@
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def page_args(args, default_limit=DEFAULT_LIMIT):
+    """Read ``?before=<cursor>&limit=N`` from a request's query args"""
+    before = args.get('before', type=int)
+    limit = args.get('limit', default_limit, type=int)
+    limit = max(1, min(limit, MAX_LIMIT))
+    return before, limit
+
+
+def page_response(items, next_cursor):
+    return {'posts': items, 'next_cursor': next_cursor}
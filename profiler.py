@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for threads that are serving a request.
+
+    Request hooks call ``enter(endpoint)``/``exit()``; while running, a
+    daemon thread wakes every ``interval`` seconds, grabs the stacks of
+    those threads with ``sys._current_frames()`` and counts them per
+    endpoint.  ``folded()`` returns the counts in the collapsed-stack
+    format read by flamegraph.pl and speedscope.  Off by default; when
+    stopped ``enter``/``exit`` are a single attribute check.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.running = False
+        self._lock = threading.Lock()
+        self._active = {}
+        self._stacks = Counter()
+        self._samples = 0
+        self._thread = None
+
+    def enter(self, endpoint):
+        if self.running:
+            self._active[threading.get_ident()] = endpoint or 'unknown'
+
+    def exit(self):
+        if self._active:
+            self._active.pop(threading.get_ident(), None)
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.running = False
+        self._active.clear()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples = 0
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            sampled = []
+            for thread_id, endpoint in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    sampled.append(f'{endpoint};{self._collapse(frame)}')
+            del frames
+            with self._lock:
+                self._stacks.update(sampled)
+                self._samples += 1
+
+    def folded(self):
+        with self._lock:
+            return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.most_common())
+
+    def summary(self):
+        with self._lock:
+            return {'running': self.running, 'interval': self.interval, 'samples': self._samples,
+                    'stacks': len(self._stacks)}
@@ -0,0 +1,175 @@
+import heapq
+import math
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # in requirements.txt; plain Python scoring without it
+    np = None
+
+from logs import get_logger
+from reactions import REACTIONS
+from topics import parse_timestamp
+
+log = get_logger('ranking')
+
+SORTS = ('top', 'hot')
+# What one reaction of each kind is worth
+REACTION_WEIGHTS = {'likes': 1.0, 'loves': 2.0, 'laughs': 1.5, 'wows': 1.5}
+WEIGHTS = tuple(REACTION_WEIGHTS[kind] for kind in REACTIONS)
+# Engagement is scaled by 1 + AUTHOR_WEIGHT * ln(1 + followers)
+AUTHOR_WEIGHT = 0.1
+
+class FeedRanker:
+    """Ranked feeds (``top`` and ``hot``) over the newest approved posts.
+
+    Every ``refresh`` seconds one pass reads the newest
+    ``max_candidates`` approved posts as columns (store.post_signals) and
+    scores those from the last ``window`` seconds:
+
+    * engagement is the weighted sum of reactions (REACTION_WEIGHTS),
+      scaled up by the author's follower count (AUTHOR_WEIGHT);
+    * ``top`` ranks by engagement, newest first on ties;
+    * ``hot`` divides engagement + 1 by ``(age_hours + 2) ** gravity``, as
+      Hacker News does, so new posts with a few reactions rise quickly
+      and then sink.
+
+    With NumPy the scores are computed as arrays and the best ``size``
+    are picked with a partition and a lexsort on (score, row); without
+    it the same formulas run in Python with heapq.nlargest.  Both break
+    ties newest first.  Only the ranked post ids are kept, so a
+    read is a slice of a list, O(page) however many posts there are.
+
+    The first read ranks synchronously.  Later, a read of a stale ranking
+    starts a background refresh and is served the current one.
+    ``on_refresh`` is called after each refresh (e.g. to drop cached
+    responses).
+    """
+
+    def __init__(self, store, graph, size=1000, refresh=60.0, window=7 * 86400, max_candidates=200000,
+                 gravity=1.5, on_refresh=None):
+        self.store = store
+        self.graph = graph
+        self.size = size
+        self.refresh = refresh
+        self.window = window
+        self.max_candidates = max_candidates
+        self.gravity = gravity
+        self.on_refresh = on_refresh
+        self._lock = threading.Lock()
+        self._rankings = None
+        self._ranked_at = None
+        self._refreshing = False
+        self.last_duration = None
+
+    # ---------- Reads ---------- #
+    def page(self, sort, offset=0, limit=20):
+        """``(post_ids, next_cursor)``: ``limit`` ids from rank ``offset`` on.
+
+        The cursor is the offset of the next page.  A page can repeat or
+        skip a post if the ranking was refreshed between requests.
+        """
+        if sort not in SORTS:
+            raise ValueError(f'Unknown sort {sort!r}')
+        ranking = self.refresh_if_stale()[sort]
+        offset = max(0, offset or 0)
+        post_ids = ranking[offset:offset + limit]
+        next_cursor = offset + limit if offset + limit < len(ranking) else None
+        return post_ids, next_cursor
+
+    def refresh_if_stale(self):
+        """The current rankings, starting a background re-rank if they are stale"""
+        if self._rankings is None:
+            with self._lock:
+                if self._rankings is None:
+                    self._rankings = self._rank()
+                    self._ranked_at = time.monotonic()
+                    return self._rankings
+        if time.monotonic() - self._ranked_at >= self.refresh:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh, name='feed-ranker', daemon=True).start()
+        return self._rankings
+
+    def _refresh(self):
+        try:
+            rankings = self._rank()
+            with self._lock:
+                self._rankings = rankings
+                self._ranked_at = time.monotonic()
+            if self.on_refresh:
+                self.on_refresh()
+        except Exception:
+            log.exception('Feed ranking failed')
+        finally:
+            self._refreshing = False
+
+    def reset(self):
+        with self._lock:
+            self._rankings = None
+            self._ranked_at = None
+
+    # ---------- Scoring ---------- #
+    def _rank(self):
+        started = time.perf_counter()
+        rows = self.store.post_signals(self.max_candidates)
+        if not rows:
+            return {sort: [] for sort in SORTS}
+        _seqs, post_ids, user_ids, timestamps, *counts = zip(*rows)
+
+        # Timestamps have minute resolution and authors repeat, so both
+        # are looked up once per distinct value rather than per post
+        times = {stamp: parse_timestamp(stamp) for stamp in set(timestamps)}
+        boost = {user_id: 1.0 + AUTHOR_WEIGHT * math.log1p(len(self.graph.followers_of(user_id)))
+                 for user_id in set(user_ids)}
+        created = [times[stamp] for stamp in timestamps]
+        boosts = [boost[user_id] for user_id in user_ids]
+
+        rank = self._rank_numpy if np is not None else self._rank_python
+        # Rows come newest first, so a stable order keeps ties newest first
+        orders = rank(time.time(), created, boosts, counts)
+        rankings = {sort: [post_ids[i] for i in order] for sort, order in orders.items()}
+        self.last_duration = time.perf_counter() - started
+        return rankings
+
+    def _rank_numpy(self, now, created, boosts, counts):
+        ages = now - np.asarray(created, dtype=np.float64)
+        live = ages <= self.window
+        engagement = np.asarray(WEIGHTS) @ np.asarray(counts, dtype=np.float64)
+        engagement *= np.asarray(boosts, dtype=np.float64)
+        hours = np.maximum(ages, 0.0) / 3600.0
+        scores = {
+            'top': engagement,
+            'hot': (engagement + 1.0) / (hours + 2.0) ** self.gravity,
+        }
+        orders = {}
+        for sort, score in scores.items():
+            candidates = np.flatnonzero(live)
+            values = score[candidates]
+            if len(candidates) > self.size:
+                # Keep everything scoring at least the size-th best score,
+                # so ties at the boundary are settled by row below rather
+                # than by argpartition's arbitrary pick
+                kth = np.partition(values, len(values) - self.size)[len(values) - self.size]
+                keep = values >= kth
+                candidates, values = candidates[keep], values[keep]
+            # Score descending, then row ascending (newest first)
+            order = candidates[np.lexsort((candidates, -values))][:self.size]
+            orders[sort] = order.tolist()
+        return orders
+
+    def _rank_python(self, now, created, boosts, counts):
+        gravity = self.gravity
+        ages = [now - when for when in created]
+        live = [i for i, age in enumerate(ages) if age <= self.window]
+        engagement = [sum(w * c for w, c in zip(WEIGHTS, row)) * boost
+                      for row, boost in zip(zip(*counts), boosts)]
+        scores = {
+            'top': engagement,
+            'hot': [(e + 1.0) / (max(age, 0.0) / 3600.0 + 2.0) ** gravity for e, age in zip(engagement, ages)],
+        }
+        # nlargest is stable, so equal scores keep the newest-first row order
+        return {sort: heapq.nlargest(self.size, live, key=score.__getitem__) for sort, score in scores.items()}
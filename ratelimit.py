@@ -0,0 +1,193 @@
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from flask import Response, request, session
+
+from database import get_db_connection
+
+UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+TOO_MANY_REQUESTS = b'{"success": false, "error": "Too many requests, slow down"}'
+
+def parse_rate(rate):
+    """``'10/minute'`` -> ``(tokens per second, burst)``"""
+    count, _, unit = rate.partition('/')
+    count = int(count)
+    if unit not in UNITS or count <= 0:
+        raise ValueError(f'Bad rate {rate!r}, expected e.g. "10/minute"')
+    return count / UNITS[unit], count
+
+def parse_overrides(spec):
+    """``'login=20/minute,create_post=5/minute'`` -> dict"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        parse_rate(rate)
+        overrides[name.strip()] = rate.strip()
+    return overrides
+
+def by_ip():
+    return request.remote_addr or '-'
+
+def by_user():
+    """Logged-in user, else client address"""
+    user_id = session.get('user_id')
+    return f'u:{user_id}' if user_id else by_ip()
+
+class MemoryBuckets:
+    """Token buckets for one process, LRU-bounded to ``maxsize`` keys.
+
+    A key that is evicted has been idle longest, so its bucket would
+    almost always have refilled anyway; forgetting it only resets it to
+    full.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, rate, burst, cost=1):
+        """Spend ``cost`` tokens; return 0 or the seconds until that is possible"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = burst
+            else:
+                tokens = min(burst, state[0] + (now - state[1]) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+
+# Refill and spend in one statement, so concurrent workers cannot both
+# spend the last token; no row is written when the bucket is short.
+SQL_TAKE = '''
+    INSERT INTO rate_buckets (key, tokens, updated) VALUES (:key, :burst - :cost, :now)
+    ON CONFLICT (key) DO UPDATE SET tokens = MIN(:burst, tokens + (:now - updated) * :rate) - :cost, updated = :now
+    WHERE MIN(:burst, tokens + (:now - updated) * :rate) >= :cost
+'''
+SQL_BUCKET = 'SELECT tokens, updated FROM rate_buckets WHERE key = ?'
+SQL_PRUNE = 'DELETE FROM rate_buckets WHERE updated < ?'
+
+class SQLiteBuckets:
+    """Token buckets in the shared SQLite file, so all workers draw from the same bucket.
+
+    Rows idle for ``idle`` seconds are pruned every ``prune_every``
+    checks; a pruned bucket would have been full anyway.
+    """
+
+    def __init__(self, path, idle=3600, prune_every=1000):
+        self.path = path
+        self.idle = idle
+        self.prune_every = prune_every
+        self._checks = 0
+        with self.conn as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.time()
+        with self.conn as conn:
+            taken = conn.execute(SQL_TAKE, {'key': key, 'rate': rate, 'burst': burst, 'cost': cost, 'now': now}).rowcount
+            self._checks += 1
+            if self._checks % self.prune_every == 0:
+                conn.execute(SQL_PRUNE, (now - self.idle,))
+        if taken:
+            return 0
+        row = self.conn.execute(SQL_BUCKET, (key,)).fetchone()
+        tokens = min(burst, row[0] + (now - row[1]) * rate) if row else burst
+        # Refilled since the failed take: ask for a minimal wait
+        return max((cost - tokens) / rate, 0.001)
+
+class RateLimiter:
+    """Per-route token-bucket limits applied before the view runs.
+
+    ``limit(name, rate, key)`` decorates a view; ``name`` namespaces the
+    buckets and is what ``overrides`` (from ``RATE_LIMITS``) keys on.  The
+    rate is resolved on a route's first request, so overrides set after
+    import (by main.create_app) still apply.  A rejected request gets a
+    prebuilt 429 with ``Retry-After`` and never enters the view.
+    """
+
+    def __init__(self, backend=None, overrides=None, enabled=True):
+        self.backend = backend if backend is not None else MemoryBuckets()
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._rejected = Counter()
+        self.overrides = overrides
+
+    @property
+    def overrides(self):
+        return self._overrides
+
+    @overrides.setter
+    def overrides(self, overrides):
+        for rate in (overrides or {}).values():
+            parse_rate(rate)
+        self._overrides = dict(overrides or {})
+        self._rules = {}
+
+    def _rule(self, name, rate):
+        rule = self._rules.get((name, rate))
+        if rule is None:
+            rule = self._rules[(name, rate)] = parse_rate(self._overrides.get(name, rate))
+        return rule
+
+    def limit(self, name, rate, key=by_ip, cost=1):
+        parse_rate(rate)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.enabled:
+                    per_second, burst = self._rule(name, rate)
+                    retry_after = self.backend.take(f'{name}:{key()}', per_second, burst, cost)
+                    if retry_after:
+                        with self._lock:
+                            self._rejected[name] += 1
+                        return self._reject(retry_after)
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def rejected(self):
+        """``{name: requests rejected}`` so far"""
+        with self._lock:
+            return dict(self._rejected)
+
+    @staticmethod
+    def _reject(retry_after):
+        response = Response(TOO_MANY_REQUESTS, status=429, mimetype='application/json')
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+def buckets_from_env(store_path=None):
+    """RATE_LIMIT_BACKEND=memory|sqlite (default: sqlite when the store is)"""
+    backend_name = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite' if store_path else 'memory')
+    if backend_name == 'sqlite':
+        return SQLiteBuckets(store_path or os.environ.get('DATABASE_PATH', 'aura_social.db'))
+    return MemoryBuckets()
+
+def limiter_from_env(store_path=None, backend=None):
+    """A RateLimiter configured from the environment; ``backend`` overrides RATE_LIMIT_BACKEND"""
+    return RateLimiter(backend if backend is not None else buckets_from_env(store_path),
+                       overrides=parse_overrides(os.environ.get('RATE_LIMITS', '')),
+                       enabled=os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() != 'false')
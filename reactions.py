@@ -0,0 +1,95 @@
+import atexit
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger('reactions')
+
+# Counter columns on the posts table, in storage order
+REACTIONS = ('likes', 'loves', 'laughs', 'wows')
+
+def normalize_reaction(kind):
+    """Map 'like'/'likes' style names onto a REACTIONS column, or None"""
+    kind = (kind or '').strip().lower()
+    if not kind.endswith('s'):
+        kind += 's'
+    return kind if kind in REACTIONS else None
+
+class ReactionBuffer:
+    """Write-behind buffer for reaction counters.
+
+    Clicks are appended to an in-memory delta table under a lock and
+    handed to ``store.apply_reactions`` in one batch, either every
+    ``flush_interval`` seconds or once ``max_pending`` clicks have piled
+    up.  A hot post costs one UPDATE per flush, not one per click.
+    Reads overlay the pending deltas so counts are never stale.
+    ``on_flush`` is called with the ids of the posts each batch touched.
+    """
+
+    def __init__(self, store, flush_interval=1.0, max_pending=1000, on_flush=None):
+        self.store = store
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_clicks = 0
+        self._worker = None
+        atexit.register(self.flush)
+
+    def add(self, post, kind):
+        """Record one reaction and return the post's new count for it"""
+        if kind not in REACTIONS:
+            raise ValueError(f'Unknown reaction {kind!r}')
+        with self._lock:
+            deltas = self._pending.setdefault(post.id, {})
+            deltas[kind] = deltas.get(kind, 0) + 1
+            self._pending_clicks += 1
+            count = getattr(post, kind, 0) + deltas[kind]
+            flush_now = self._pending_clicks >= self.max_pending
+        self._ensure_worker()
+        if flush_now:
+            self.flush()
+        return count
+
+    def counts(self, post):
+        """Stored counts for ``post`` plus anything not yet flushed"""
+        with self._lock:
+            deltas = self._pending.get(post.id, {})
+            return {kind: getattr(post, kind, 0) + deltas.get(kind, 0) for kind in REACTIONS}
+
+    def flush(self):
+        # The lock is held while applying so readers never see a batch
+        # both in the store and in the pending table.
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            clicks, self._pending_clicks = self._pending_clicks, 0
+            try:
+                self.store.apply_reactions(batch)
+            except Exception:
+                # Keep the clicks for the next flush rather than drop them
+                self._pending, self._pending_clicks = batch, clicks
+                raise
+        if self.on_flush:
+            self.on_flush(list(batch))
+        return len(batch)
+
+    def _ensure_worker(self):
+        # Started lazily so a preforking server gets one per worker
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='reaction-flush', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Reaction flush failed')
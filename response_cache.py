@@ -0,0 +1,112 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request, session
+
+# Version namespaces bumped by writes
+POSTS = 'posts'
+USERS = 'users'
+REPORTS = 'reports'
+STATS = 'stats'
+FOLLOWS = 'follows'
+SESSIONS = 'sessions'
+# Bumped locally when ranking.FeedRanker re-ranks
+RANKING = 'ranking'
+
+class LocalVersions:
+    """In-process namespace version counters (single worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def bump(self, *namespaces):
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    touch = bump
+
+class ResponseCache:
+    """Serialized JSON bodies for hot read endpoints, keyed per viewer.
+
+    Each namespace has a version counter that writes bump.  A cached body
+    is reused while the versions it was built under are still current,
+    and is sent with a content-hash ``ETag`` so revalidating clients get
+    a bodiless 304.
+
+    ``versions`` holds the counters: LocalVersions for one process, or
+    shared_state.SharedVersions when several workers share a database.
+    """
+
+    def __init__(self, versions=None, maxsize=2048):
+        self.maxsize = maxsize
+        self.versions = versions if versions is not None else LocalVersions()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, *namespaces):
+        """Invalidate ``namespaces`` in every worker"""
+        self.versions.bump(*namespaces)
+
+    def touch(self, *namespaces):
+        """Invalidate ``namespaces`` in this worker only"""
+        self.versions.touch(*namespaces)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def cached(self, *namespaces, per_viewer=False):
+        """Cache a view's 200 responses until one of ``namespaces`` changes"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                # Read versions before building so a concurrent write can
+                # only make the stored entry stale, never wrong.
+                versions = tuple(self.versions.get(n) for n in namespaces)
+                viewer = session.get('user_id') if per_viewer else None
+                key = (request.endpoint, viewer, request.query_string, tuple(sorted(kwargs.items())))
+
+                entry = self._lookup(key, versions)
+                if entry is None:
+                    response = current_app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+                    entry = (versions, etag, body, response.mimetype)
+                    self._store(key, entry)
+
+                _, etag, body, mimetype = entry
+                response = Response(body, mimetype=mimetype)
+                response.set_etag(etag)
+                # Browsers keep the body but must revalidate each time
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response.make_conditional(request)
+            return decorated_function
+        return decorator
@@ -0,0 +1,77 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset('a an and are as at be but by for if in is it of on or so the to was with'.split())
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+class InvertedIndex:
+    """Incrementally maintained full-text index over post content.
+
+    ``postings`` maps a term to ``{post_id: term frequency}``; dicts keep
+    insertion order, so iterating a posting list backwards walks posts
+    newest first.  Queries AND their terms, starting from the rarest, and
+    score by tf-idf with recency as the tie-break.  At most
+    ``max_candidates`` of the newest matches are scored, which keeps very
+    common terms from turning a query into a scan.
+    """
+
+    def __init__(self, max_candidates=20000):
+        self.max_candidates = max_candidates
+        self._lock = threading.RLock()
+        self.postings = {}
+        self.doc_terms = {}
+
+    def add(self, post):
+        terms = Counter(tokenize(post.content))
+        with self._lock:
+            if post.id in self.doc_terms:
+                self._remove(post.id)
+            self.doc_terms[post.id] = tuple(terms)
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[post.id] = tf
+
+    def remove(self, post):
+        with self._lock:
+            self._remove(post.id)
+
+    def _remove(self, post_id):
+        for term in self.doc_terms.pop(post_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(post_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query, offset=0, limit=20):
+        """Return ``(post_ids, has_more)`` for one page of ranked matches"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], False
+
+        with self._lock:
+            lists = [self.postings.get(term) for term in terms]
+            if not all(lists):
+                return [], False
+            lists.sort(key=len)
+            total_docs = len(self.doc_terms)
+            idf = [math.log(1 + total_docs / len(posting)) for posting in lists]
+
+            scored = []
+            rarest, rest = lists[0], lists[1:]
+            for rank, post_id in enumerate(reversed(rarest)):
+                if rank >= self.max_candidates:
+                    break
+                if all(post_id in posting for posting in rest):
+                    score = sum(posting[post_id] * w for posting, w in zip(lists, idf))
+                    # Newer posts come first on equal score
+                    scored.append((score, -rank, post_id))
+
+        top = heapq.nlargest(offset + limit + 1, scored)
+        page = [post_id for _, _, post_id in top[offset:offset + limit]]
+        return page, len(top) > offset + limit
@@ -0,0 +1,243 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from database import get_db_connection
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data held server-side; the cookie only carries the opaque ``sid``"""
+
+    def __init__(self, data=None, sid=None, expires=0.0):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = sid is None
+        self.modified = False
+        self.rotate = False
+
+    def regenerate(self):
+        """Issue a fresh id when saved, so an id planted before login is worthless after it"""
+        self.rotate = True
+        self.modified = True
+
+class MemorySessions:
+    """Sessions for one process, LRU-bounded to ``maxsize``, indexed by user"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._by_user = {}
+
+    def load(self, sid):
+        """``(data, expires)``, or None if unknown or expired"""
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                self._drop(sid)
+                return None
+            self._sessions.move_to_end(sid)
+            return dict(entry[1]), entry[2]
+
+    def save(self, sid, user_id, data, expires):
+        with self._lock:
+            if sid in self._sessions:
+                self._drop(sid)
+            self._sessions[sid] = (user_id, data, expires)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(sid)
+            if len(self._sessions) > self.maxsize:
+                self._drop(next(iter(self._sessions)))
+
+    def delete(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def delete_user(self, user_id):
+        """End every session of ``user_id``; returns how many"""
+        with self._lock:
+            sids = self._by_user.pop(user_id, set())
+            for sid in sids:
+                self._sessions.pop(sid, None)
+        return len(sids)
+
+    def _drop(self, sid):
+        entry = self._sessions.pop(sid, None)
+        if entry is not None and entry[0] is not None:
+            sids = self._by_user.get(entry[0])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_user[entry[0]]
+
+SQL_LOAD_SESSION = 'SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?'
+SQL_SAVE_SESSION = 'INSERT OR REPLACE INTO sessions (sid, user_id, data, expires) VALUES (?, ?, ?, ?)'
+SQL_DELETE_SESSION = 'DELETE FROM sessions WHERE sid = ?'
+SQL_DELETE_USER_SESSIONS = 'DELETE FROM sessions WHERE user_id = ?'
+SQL_PRUNE_SESSIONS = 'DELETE FROM sessions WHERE expires <= ?'
+
+class SQLiteSessions:
+    """Sessions in the shared SQLite file, so any worker can serve any request.
+
+    Expired rows are skipped on load and pruned every ``prune_every`` saves.
+    """
+
+    def __init__(self, path, prune_every=1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._saves = 0
+        with self.conn as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    sid TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    data TEXT NOT NULL,
+                    expires REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def load(self, sid):
+        row = self.conn.execute(SQL_LOAD_SESSION, (sid, time.time())).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def save(self, sid, user_id, data, expires):
+        with self.conn as conn:
+            conn.execute(SQL_SAVE_SESSION, (sid, user_id, json.dumps(data), expires))
+            self._saves += 1
+            if self._saves % self.prune_every == 0:
+                conn.execute(SQL_PRUNE_SESSIONS, (time.time(),))
+
+    def delete(self, sid):
+        with self.conn as conn:
+            conn.execute(SQL_DELETE_SESSION, (sid,))
+
+    def delete_user(self, user_id):
+        with self.conn as conn:
+            return conn.execute(SQL_DELETE_USER_SESSIONS, (user_id,)).rowcount
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface over a MemorySessions/SQLiteSessions backend.
+
+    Sessions expire ``ttl`` seconds after their last save; a session in
+    use is re-saved once half of that has passed, so active users stay
+    signed in without a write per request.  Empty sessions are never
+    stored, and clearing one (logout) deletes it.
+    """
+
+    def __init__(self, backend, ttl=7 * 86400):
+        self.backend = backend
+        self.ttl = ttl
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            loaded = self.backend.load(sid)
+            if loaded is not None:
+                data, expires = loaded
+                return ServerSession(data, sid, expires)
+        session = ServerSession()
+        # An unknown, expired or revoked id is never reused; mark the
+        # session modified so its cookie gets cleared
+        session.modified = bool(sid)
+        return session
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified:
+                if session.sid is not None:
+                    self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        if not session.modified and session.expires - now > self.ttl / 2:
+            return
+        if session.rotate or session.sid is None:
+            if session.sid is not None:
+                self.backend.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.rotate = False
+        session.expires = now + self.ttl
+        self.backend.save(session.sid, session.get('user_id'), dict(session), session.expires)
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+    def revoke_user(self, user_id):
+        """End every session ``user_id`` has, on every worker sharing the backend"""
+        return self.backend.delete_user(user_id)
+
+class UserContext:
+    __slots__ = ('id', 'username', 'is_admin', 'is_active', 'expires')
+
+    def __init__(self, user, expires):
+        self.id = user.id
+        self.username = user.username
+        self.is_admin = bool(user.is_admin)
+        self.is_active = bool(user.is_active)
+        self.expires = expires
+
+class UserContextCache:
+    """What auth checks need about a user, without a store read per request.
+
+    Bounded LRU; an entry is trusted for ``ttl`` seconds, and suspensions
+    call ``invalidate`` so they apply on the next request.
+    """
+
+    def __init__(self, store, maxsize=10000, ttl=60.0):
+        self.store = store
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._contexts = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """The user's UserContext, or None if the user no longer exists"""
+        now = time.monotonic()
+        with self._lock:
+            context = self._contexts.get(user_id)
+            if context is not None and context.expires > now:
+                self.hits += 1
+                self._contexts.move_to_end(user_id)
+                return context
+            self.misses += 1
+
+        user = self.store.get_user(user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        context = UserContext(user, now + self.ttl)
+        with self._lock:
+            self._contexts[user_id] = context
+            self._contexts.move_to_end(user_id)
+            if len(self._contexts) > self.maxsize:
+                self._contexts.popitem(last=False)
+        return context
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._contexts.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
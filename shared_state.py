@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+from database import get_db_connection
+from logs import get_logger
+
+log = get_logger('shared_state')
+
+class SharedVersions:
+    """Namespace version counters in SQLite, shared by every worker.
+
+    ``bump`` increments a namespace for all processes at once.  ``sync``
+    (called before each request, rate-limited to ``sync_interval``) reads
+    the table, so cached entries built under an older version stop
+    matching.  ``touch`` only invalidates this worker, for writes other
+    workers do not need to hear about (a re-rank of this worker's feeds).
+    Same ``get``/``bump``/``touch`` interface as
+    response_cache.LocalVersions.
+    """
+
+    def __init__(self, path, sync_interval=0.1):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._local = {}
+        self._last_sync = 0.0
+        with self.conn as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS state_versions (
+                    namespace TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+            ''')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def get(self, namespace):
+        # Both parts only grow, so any change moves the sum
+        return self._seen.get(namespace, 0) + self._local.get(namespace, 0)
+
+    def touch(self, *namespaces):
+        with self._lock:
+            for namespace in namespaces:
+                self._local[namespace] = self._local.get(namespace, 0) + 1
+
+    def bump(self, *namespaces):
+        with self.conn as conn:
+            for namespace in namespaces:
+                conn.execute('''
+                    INSERT INTO state_versions (namespace, version) VALUES (?, 1)
+                    ON CONFLICT (namespace) DO UPDATE SET version = version + 1
+                ''', (namespace,))
+            rows = conn.execute('SELECT namespace, version FROM state_versions').fetchall()
+        self._apply(rows)
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        self._apply(self.conn.execute('SELECT namespace, version FROM state_versions').fetchall())
+
+    def _apply(self, rows):
+        with self._lock:
+            self._seen.update((namespace, version) for namespace, version in rows)
+
+class SQLiteEventLog:
+    """Append-only event table that relays EventBroker messages between workers.
+
+    Each worker appends what it publishes and tails rows written by other
+    processes from a background thread.  Rows older than the newest
+    ``keep`` are pruned as the tail advances.
+    """
+
+    def __init__(self, path, poll_interval=0.25, keep=10000):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.keep = keep
+        self._thread = None
+        self._lock = threading.Lock()
+        with self.conn as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    origin INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+            ''')
+
+    @property
+    def conn(self):
+        return get_db_connection(self.path)
+
+    def append(self, event, data, channel):
+        with self.conn as conn:
+            conn.execute('INSERT INTO events (origin, channel, event, data) VALUES (?, ?, ?, ?)',
+                         (os.getpid(), channel, event, json.dumps(data)))
+
+    def start(self, deliver):
+        """Tail the log in a daemon thread, calling ``deliver(event, data, channel)``"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(deliver,), name='event-log', daemon=True)
+                self._thread.start()
+
+    def _run(self, deliver):
+        pid = os.getpid()
+        last_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                rows = self.conn.execute(
+                    'SELECT id, origin, channel, event, data FROM events WHERE id > ? ORDER BY id LIMIT 500',
+                    (last_id,)).fetchall()
+                for row_id, origin, channel, event, data in rows:
+                    last_id = row_id
+                    if origin != pid:
+                        deliver(event, json.loads(data), channel)
+                if rows and last_id % 1000 < len(rows):
+                    with self.conn as conn:
+                        conn.execute('DELETE FROM events WHERE id <= ?', (last_id - self.keep,))
+            except Exception:
+                log.exception('Event log tail failed')
@@ -0,0 +1,634 @@
+"""Snapshots and a write-ahead log for the in-memory store.
+
+    python -m snapshot info aura_social.snap
+
+The snapshot file holds every user, follow, post, report, message and
+inbox entry in a compact binary layout: one struct per record for its
+fixed-width fields (UUIDs as 16 bytes, counters, flags), followed by its
+length-prefixed UTF-8 strings.  Between snapshots each write is appended
+to ``<path>.<generation>.log`` as a framed, CRC-checked record.  Log
+records carry absolute values (the new reaction counts, the whole user),
+so replaying one twice gives the same state.
+
+A restart memory-maps the snapshot, decodes it in one pass, and replays
+only the logs written after it.  A torn frame at the end of the last log
+is a write cut short by a crash and is truncated away.
+"""
+import argparse
+import atexit
+import fcntl
+import gc
+import glob
+import itertools
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from bisect import insort
+from functools import lru_cache
+from operator import attrgetter
+
+from logs import get_logger
+from models import Conversation, Message, Post, Report, User, conversation_id
+from reactions import REACTIONS
+from store import MemoryStore
+
+log = get_logger('snapshot')
+
+MAGIC = b'AURASNAP'
+# Version 2 added Post.hidden_by; version 1 files and logs are still read
+VERSION = 2
+# magic, version, log generation, next post seq, next message seq, then a
+# record count per section
+HEADER = struct.Struct('<8sHQQQ6Q')
+# Log frame: payload length, CRC-32 of opcode + payload, opcode
+FRAME = struct.Struct('<IIB')
+
+def _uuid_str(raw):
+    h = raw.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+def _uuid_bytes(value):
+    # uuid.UUID() validates and normalizes at several times the cost
+    raw = bytes.fromhex(value.replace('-', ''))
+    if len(raw) != 16:
+        raise ValueError(f'Not a UUID: {value!r}')
+    return raw
+
+# User ids repeat on every post and message, so they go through caches
+# (decoded strings are then shared too, which saves memory)
+_user_ref = lru_cache(maxsize=1 << 16)(_uuid_str)
+_user_ref_bytes = lru_cache(maxsize=1 << 16)(_uuid_bytes)
+
+class Codec:
+    """Record layout: fixed-width fields in one struct, then the strings.
+
+    ``fixed`` uses struct codes plus ``u`` (a UUID stored as 16 bytes) and
+    ``r`` (the same, for user ids, decoded through a cache).  Values are
+    packed and returned as the fixed fields followed by the strings.
+    """
+
+    def __init__(self, fixed, strings):
+        self.n_fixed = len(fixed)
+        self.uuids = [i for i, kind in enumerate(fixed) if kind == 'u']
+        self.refs = [i for i, kind in enumerate(fixed) if kind == 'r']
+        codes = ''.join('16s' if kind in 'ur' else kind for kind in fixed)
+        self.struct = struct.Struct('<' + codes + 'I' * strings)
+
+    def pack(self, values):
+        fixed = list(values[:self.n_fixed])
+        for i in self.uuids:
+            fixed[i] = _uuid_bytes(fixed[i])
+        for i in self.refs:
+            fixed[i] = _user_ref_bytes(fixed[i])
+        encoded = [s.encode('utf-8', 'surrogatepass') for s in values[self.n_fixed:]]
+        return self.struct.pack(*fixed, *map(len, encoded)) + b''.join(encoded)
+
+    def unpack_from(self, buf, offset=0):
+        """``(values, next_offset)`` for the record at ``offset``"""
+        head = self.struct.unpack_from(buf, offset)
+        offset += self.struct.size
+        values = list(head[:self.n_fixed])
+        for i in self.uuids:
+            values[i] = _uuid_str(values[i])
+        for i in self.refs:
+            values[i] = _user_ref(values[i])
+        for n in head[self.n_fixed:]:
+            values.append(str(buf[offset:offset + n], 'utf-8', 'surrogatepass'))
+            offset += n
+        return values, offset
+
+class Layout:
+    """How one model class is stored: its attributes in codec order.
+
+    ``pack(obj)`` encodes an instance and ``read(buf, offset)`` returns
+    ``(obj, next_offset)``, building it without ``__init__`` (which would
+    mint a fresh id and timestamp).
+    """
+
+    def __init__(self, cls, names, codec):
+        self.cls = cls
+        self.names = names
+        self.codec = codec
+        self.fields = attrgetter(*names)
+
+    def read(self, buf, offset):
+        values, offset = self.codec.unpack_from(buf, offset)
+        obj = self.cls.__new__(self.cls)
+        for name, value in zip(self.names, values):
+            setattr(obj, name, value)
+        return obj, offset
+
+    def pack(self, obj):
+        return self.codec.pack(self.fields(obj))
+
+USER = Layout(User, ('id', 'is_admin', 'is_active', 'username', 'email', 'password', 'display_name', 'bio',
+                     'avatar', 'created_at', 'last_login'), Codec('u??', 8))
+POST = Layout(Post, ('id', 'seq', 'user_id') + REACTIONS + ('is_approved', 'reports', 'content', 'timestamp',
+                                                           'hidden_by'),
+              Codec('uqr' + 'i' * len(REACTIONS) + '?i', 3))
+POST_V1 = Layout(Post, POST.names[:-1], Codec('uqr' + 'i' * len(REACTIONS) + '?i', 2))
+REPORT = Layout(Report, ('id', 'post_id', 'reporter_id', 'reason', 'status', 'created_at'), Codec('uur', 3))
+MESSAGE = Layout(Message, ('id', 'seq', 'sender_id', 'recipient_id', 'content', 'created_at'), Codec('uqrr', 2))
+FOLLOW = Codec('rr', 0)
+# user, peer, last message seq, unread
+CONVERSATION = Codec('rrqi', 0)
+
+# Log-only records
+POST_FLAG = Codec('u?', 0)
+# post id, is_approved, hidden_by
+POST_STATE = Codec('u?', 1)
+POST_COUNTS = Codec('u' + 'i' * len(REACTIONS), 0)
+POST_ID = Codec('u', 0)
+REPORT_ADDED = Codec('ui', 0)
+RESOLVED = Codec('u', 1)
+
+(OP_USER, OP_FOLLOW, OP_UNFOLLOW, OP_POST_V1, OP_APPROVE_V1, OP_REACTIONS, OP_DELETE, OP_REPORT, OP_RESOLVE,
+ OP_MESSAGE, OP_READ, OP_POST, OP_APPROVE) = range(1, 14)
+
+def _insert_seq(seqs, seq):
+    if not seqs or seqs[-1] < seq:
+        seqs.append(seq)
+    elif seq not in seqs:
+        insort(seqs, seq)
+
+def _fsync_dir(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _advance(counter, seq):
+    # A seq counter that continues past ``seq`` (and past where it was)
+    return itertools.count(max(next(counter), seq + 1))
+
+def _unpack_header(buf, path):
+    magic, version, generation, next_seq, next_message_seq, *counts = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or not 1 <= version <= VERSION:
+        raise ValueError(f'{path} is not a version 1 to {VERSION} store snapshot')
+    return version, generation, next_seq, next_message_seq, counts
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        version, generation, next_seq, next_message_seq, counts = _unpack_header(f.read(HEADER.size), path)
+    return {
+        'version': version, 'generation': generation, 'next_seq': next_seq, 'next_message_seq': next_message_seq,
+        **dict(zip(('users', 'follows', 'posts', 'reports', 'messages', 'conversations'), counts)),
+    }
+
+class SnapshotStore(MemoryStore):
+    """MemoryStore that survives restarts.
+
+    Every write is applied under the store lock and then appended to the
+    current log, so the log order is the order writes took effect.  Each
+    frame is handed to the OS immediately and the file is fsynced about
+    once a second, so a killed process loses nothing and a power cut
+    loses at most the last second.
+
+    ``snapshot()`` runs every ``interval`` seconds on a daemon thread
+    while the log is non-empty.  Under the lock it only switches to a new
+    log generation and takes shallow copies of the collections; the
+    records are encoded and written afterwards, while requests carry on.
+    A post changed after the copy may be written with the newer value,
+    which is harmless: the change is also in the new log and replays as
+    an absolute value.  The file is written aside and renamed into place,
+    and the older logs are deleted once it is durable.
+
+    Only one process may own ``path``; a second one raises RuntimeError.
+    """
+
+    def __init__(self, path, interval=300.0, fsync_interval=1.0):
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self.fsync_interval = fsync_interval
+        self._snapshot_lock = threading.Lock()
+        self._lockfile = open(path + '.lock', 'w')
+        try:
+            fcntl.flock(self._lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lockfile.close()
+            raise RuntimeError(f'{path} is in use by another process') from None
+        self._replaying = False
+        self._closed = False
+        self._dirty = False
+        self._logged = 0
+        self.generation = 0
+        started = time.perf_counter()
+        # The cyclic GC would otherwise walk the growing heap every few
+        # thousand records restored
+        gc.disable()
+        try:
+            if os.path.exists(path):
+                self._load()
+            replayed = self._replay_logs()
+        finally:
+            gc.enable()
+        self._log = open(self._log_path(self.generation), 'ab')
+        log.info('Restored %d users and %d posts from %s in %.2fs (%d log records replayed)',
+                 len(self.users_by_id), len(self.posts_by_id), path, time.perf_counter() - started, replayed)
+        self._worker = threading.Thread(target=self._run, name='snapshot', daemon=True)
+        self._worker.start()
+        atexit.register(self.sync)
+
+    def _log_path(self, generation):
+        return f'{self.path}.{generation:08d}.log'
+
+    def _log_generations(self):
+        prefix = self.path + '.'
+        found = []
+        for name in glob.glob(glob.escape(self.path) + '.*.log'):
+            middle = name[len(prefix):-len('.log')]
+            if middle.isdigit():
+                found.append(int(middle))
+        return sorted(found)
+
+    # ---------- Restore ---------- #
+    def _load(self):
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            version, generation, next_seq, next_message_seq, counts = _unpack_header(buf, self.path)
+            n_users, n_follows, n_posts, n_reports, n_messages, n_conversations = counts
+            offset = HEADER.size
+            self.generation = generation
+            self._seq = itertools.count(next_seq)
+            self._message_seq = itertools.count(next_message_seq)
+
+            read = USER.read
+            for _ in range(n_users):
+                user, offset = read(buf, offset)
+                self.users_by_id[user.id] = user
+                self.users_by_username[user.username] = user
+                self.posts_by_author[user.id] = []
+            for _ in range(n_follows):
+                values, offset = FOLLOW.unpack_from(buf, offset)
+                self.follows.add(tuple(values))
+
+            # Posts are stored in seq order, so every index is appended to
+            read, intern = (POST if version >= 2 else POST_V1).read, sys.intern
+            for _ in range(n_posts):
+                post, offset = read(buf, offset)
+                post.timestamp = intern(post.timestamp)
+                if version < 2:
+                    post.hidden_by = ''
+                self.posts_by_id[post.id] = post
+                self.posts_by_seq[post.seq] = post
+                self.posts_by_author.setdefault(post.user_id, []).append(post.seq)
+                self.all_seqs.append(post.seq)
+                if post.is_approved:
+                    self.timeline.append(post.seq)
+
+            read = REPORT.read
+            for _ in range(n_reports):
+                report, offset = read(buf, offset)
+                self.reports[report.id] = report
+                if report.status == 'pending':
+                    self.pending_reports.setdefault(report.post_id, {})[report.reporter_id] = report
+
+            read = MESSAGE.read
+            for _ in range(n_messages):
+                message, offset = read(buf, offset)
+                message.conversation_id = conversation_id(message.sender_id, message.recipient_id)
+                self.messages_by_seq[message.seq] = message
+                self.conversations.setdefault(message.conversation_id, []).append(message.seq)
+
+            for _ in range(n_conversations):
+                (user_id, peer_id, last_seq, unread), offset = CONVERSATION.unpack_from(buf, offset)
+                conversation = Conversation(user_id, peer_id)
+                conversation.last_seq = last_seq
+                conversation.last_message = self.messages_by_seq[last_seq]
+                conversation.unread = unread
+                self.inboxes.setdefault(user_id, {})[peer_id] = conversation
+                self.inbox_seqs.setdefault(user_id, []).append(last_seq)
+                self.unread_totals[user_id] = self.unread_totals.get(user_id, 0) + unread
+            for seqs in self.inbox_seqs.values():
+                seqs.sort()
+
+    def _replay_logs(self):
+        generations = self._log_generations()
+        for generation in generations:
+            if generation < self.generation:
+                # Left behind by a crash just after the snapshot was renamed
+                os.remove(self._log_path(generation))
+        replayed = 0
+        self._replaying = True
+        try:
+            for generation in (g for g in generations if g >= self.generation):
+                replayed += self._replay(self._log_path(generation))
+                self.generation = generation
+        finally:
+            self._replaying = False
+        self._logged = replayed
+        return replayed
+
+    def _replay(self, path):
+        count = 0
+        with open(path, 'r+b') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                offset = 0
+                while offset + FRAME.size <= size:
+                    length, crc, op = FRAME.unpack_from(buf, offset)
+                    start = offset + FRAME.size
+                    end = start + length
+                    if end > size or zlib.crc32(buf[start:end], op) != crc:
+                        break
+                    self._apply(op, buf, start)
+                    offset = end
+                    count += 1
+            if offset < size:
+                log.warning('Truncating %d bytes of incomplete log at the end of %s', size - offset, path)
+                f.truncate(offset)
+        return count
+
+    def _apply(self, op, buf, offset):
+        if op == OP_USER:
+            record, _ = USER.read(buf, offset)
+            user = self.users_by_id.get(record.id)
+            if user is None:
+                self.add_user(record)
+            else:
+                self.users_by_username.pop(user.username, None)
+                for name in USER.names:
+                    setattr(user, name, getattr(record, name))
+                self.users_by_username[user.username] = user
+        elif op in (OP_FOLLOW, OP_UNFOLLOW):
+            (follower_id, followee_id), _ = FOLLOW.unpack_from(buf, offset)
+            if op == OP_FOLLOW:
+                self.add_follow(follower_id, followee_id)
+            else:
+                self.remove_follow(follower_id, followee_id)
+        elif op in (OP_POST, OP_POST_V1):
+            if op == OP_POST:
+                post, _ = POST.read(buf, offset)
+            else:
+                post, _ = POST_V1.read(buf, offset)
+                post.hidden_by = ''
+            if post.id not in self.posts_by_id:
+                self._restore_post(post)
+        elif op in (OP_APPROVE, OP_APPROVE_V1):
+            if op == OP_APPROVE:
+                (post_id, is_approved, hidden_by), _ = POST_STATE.unpack_from(buf, offset)
+            else:
+                (post_id, is_approved), _ = POST_FLAG.unpack_from(buf, offset)
+                hidden_by = ''
+            post = self.posts_by_id.get(post_id)
+            if post is not None:
+                self.set_approved(post, is_approved, hidden_by)
+        elif op == OP_REACTIONS:
+            (post_id, *counts), _ = POST_COUNTS.unpack_from(buf, offset)
+            post = self.posts_by_id.get(post_id)
+            if post is not None:
+                for kind, count in zip(REACTIONS, counts):
+                    setattr(post, kind, count)
+        elif op == OP_DELETE:
+            (post_id,), _ = POST_ID.unpack_from(buf, offset)
+            self.delete_post(post_id)
+        elif op == OP_REPORT:
+            report, offset = REPORT.read(buf, offset)
+            (post_id, reports), _ = REPORT_ADDED.unpack_from(buf, offset)
+            if report.id not in self.reports:
+                self.add_report(report)
+            post = self.posts_by_id.get(post_id)
+            if post is not None:
+                post.reports = reports
+        elif op == OP_RESOLVE:
+            (post_id, status), _ = RESOLVED.unpack_from(buf, offset)
+            self.resolve_reports([post_id], status)
+        elif op == OP_MESSAGE:
+            message, _ = MESSAGE.read(buf, offset)
+            if message.seq not in self.messages_by_seq:
+                self._restore_message(message)
+        elif op == OP_READ:
+            (user_id, peer_id), _ = FOLLOW.unpack_from(buf, offset)
+            self.mark_read(user_id, peer_id)
+        else:
+            raise ValueError(f'Unknown log record type {op}')
+
+    def _restore_post(self, post):
+        post.timestamp = sys.intern(post.timestamp)
+        self.posts_by_id[post.id] = post
+        self.posts_by_seq[post.seq] = post
+        _insert_seq(self.posts_by_author.setdefault(post.user_id, []), post.seq)
+        _insert_seq(self.all_seqs, post.seq)
+        if post.is_approved:
+            _insert_seq(self.timeline, post.seq)
+        self._seq = _advance(self._seq, post.seq)
+
+    def _restore_message(self, message):
+        message.conversation_id = conversation_id(message.sender_id, message.recipient_id)
+        self.messages_by_seq[message.seq] = message
+        _insert_seq(self.conversations.setdefault(message.conversation_id, []), message.seq)
+        self._touch_conversation(message.sender_id, message.recipient_id, message, read=True)
+        self._touch_conversation(message.recipient_id, message.sender_id, message, read=False)
+        self._message_seq = _advance(self._message_seq, message.seq)
+
+    # ---------- Log ---------- #
+    def _append(self, op, payload):
+        # Called with self._lock held, after the write has been applied
+        if self._replaying:
+            return
+        self._log.write(FRAME.pack(len(payload), zlib.crc32(payload, op), op) + payload)
+        self._log.flush()
+        self._dirty = True
+        self._logged += 1
+
+    def sync(self):
+        """fsync the log if anything was appended since the last call"""
+        with self._lock:
+            if not self._dirty or self._closed:
+                return
+            self._dirty = False
+            # A duplicate descriptor stays valid if snapshot() switches logs meanwhile
+            fd = os.dup(self._log.fileno())
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        """Sync and close the log and give up ``path``; later writes raise ValueError"""
+        with self._snapshot_lock, self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            self._lockfile.close()
+
+    # ---------- Writes ---------- #
+    def add_user(self, user):
+        with self._lock:
+            super().add_user(user)
+            self._append(OP_USER, USER.pack(user))
+        return user
+
+    def update_user(self, user, **fields):
+        with self._lock:
+            super().update_user(user, **fields)
+            self._append(OP_USER, USER.pack(user))
+        return user
+
+    def add_follow(self, follower_id, followee_id):
+        with self._lock:
+            super().add_follow(follower_id, followee_id)
+            self._append(OP_FOLLOW, FOLLOW.pack((follower_id, followee_id)))
+
+    def remove_follow(self, follower_id, followee_id):
+        with self._lock:
+            super().remove_follow(follower_id, followee_id)
+            self._append(OP_UNFOLLOW, FOLLOW.pack((follower_id, followee_id)))
+
+    def add_post(self, post):
+        with self._lock:
+            super().add_post(post)
+            self._append(OP_POST, POST.pack(post))
+        return post
+
+    def set_approved(self, post, is_approved, hidden_by=''):
+        with self._lock:
+            super().set_approved(post, is_approved, hidden_by)
+            self._append(OP_APPROVE, POST_STATE.pack((post.id, is_approved, post.hidden_by)))
+        return post
+
+    def apply_reactions(self, deltas):
+        with self._lock:
+            super().apply_reactions(deltas)
+            for post_id in deltas:
+                post = self.posts_by_id.get(post_id)
+                if post is not None:
+                    counts = [getattr(post, kind, 0) for kind in REACTIONS]
+                    self._append(OP_REACTIONS, POST_COUNTS.pack([post_id] + counts))
+
+    def delete_post(self, post_id):
+        with self._lock:
+            post = super().delete_post(post_id)
+            if post:
+                self._append(OP_DELETE, POST_ID.pack((post_id,)))
+        return post
+
+    def add_report(self, report):
+        with self._lock:
+            added = super().add_report(report)
+            if added:
+                post = self.posts_by_id.get(report.post_id)
+                reports = post.reports if post is not None else 0
+                self._append(OP_REPORT, REPORT.pack(report) +
+                             REPORT_ADDED.pack((report.post_id, reports)))
+        return added
+
+    def resolve_reports(self, post_ids, status):
+        with self._lock:
+            resolved = super().resolve_reports(post_ids, status)
+            for post_id in post_ids:
+                self._append(OP_RESOLVE, RESOLVED.pack((post_id, status)))
+        return resolved
+
+    def add_message(self, message):
+        with self._lock:
+            super().add_message(message)
+            self._append(OP_MESSAGE, MESSAGE.pack(message))
+        return message
+
+    def mark_read(self, user_id, peer_id):
+        with self._lock:
+            cleared = super().mark_read(user_id, peer_id)
+            if cleared:
+                self._append(OP_READ, FOLLOW.pack((user_id, peer_id)))
+        return cleared
+
+    # ---------- Snapshots ---------- #
+    def snapshot(self):
+        """Write a snapshot and drop the logs it covers; returns its size in bytes"""
+        with self._snapshot_lock:
+            with self._lock:
+                if self._closed:
+                    return None
+                previous = os.dup(self._log.fileno())
+                self._log.close()
+                self.generation += 1
+                self._log = open(self._log_path(self.generation), 'ab')
+                self._dirty = False
+                self._logged = 0
+                generation = self.generation
+                next_seq, next_message_seq = next(self._seq), next(self._message_seq)
+                self._seq, self._message_seq = itertools.count(next_seq), itertools.count(next_message_seq)
+                users = list(self.users_by_id.values())
+                follows = list(self.follows)
+                posts = list(self.posts_by_seq.values())
+                reports = list(self.reports.values())
+                messages = list(self.messages_by_seq.values())
+                conversations = [(c.user_id, c.peer_id, c.last_seq, c.unread)
+                                 for inbox in self.inboxes.values() for c in inbox.values()]
+            # The snapshot replaces the old log only once it is on disk, so
+            # until then the old log has to be durable too
+            try:
+                os.fsync(previous)
+            finally:
+                os.close(previous)
+
+            # Seqs only grow, so both dicts are already in seq order
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, generation, next_seq, next_message_seq, len(users),
+                                    len(follows), len(posts), len(reports), len(messages), len(conversations)))
+                self._write(f, users, USER.pack)
+                self._write(f, follows, FOLLOW.pack)
+                self._write(f, posts, POST.pack)
+                self._write(f, reports, REPORT.pack)
+                self._write(f, messages, MESSAGE.pack)
+                self._write(f, conversations, CONVERSATION.pack)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path)
+            for old in self._log_generations():
+                if old < generation:
+                    os.remove(self._log_path(old))
+        return size
+
+    @staticmethod
+    def _write(f, records, pack, batch=4096):
+        for i in range(0, len(records), batch):
+            f.write(b''.join(map(pack, records[i:i + batch])))
+
+    def _run(self):
+        last = time.monotonic()
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            try:
+                self.sync()
+                if self._logged and time.monotonic() - last >= self.interval:
+                    started = time.perf_counter()
+                    size = self.snapshot()
+                    if size is None:
+                        return
+                    last = time.monotonic()
+                    log.info('Snapshot of %d posts written to %s (%d bytes) in %.2fs',
+                             len(self.posts_by_id), self.path, size, time.perf_counter() - started)
+            except Exception:
+                log.exception('Snapshot failed')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect a store snapshot')
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help='print the header and the logs waiting to be replayed')
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    header = read_header(args.path)
+    for name, value in header.items():
+        print(f'{name:<18} {value:,}')
+    print(f"{'bytes':<18} {os.path.getsize(args.path):,}")
+    for name in sorted(glob.glob(glob.escape(args.path) + '.*.log')):
+        print(f'log {name} ({os.path.getsize(name):,} bytes)')
+
+if __name__ == '__main__':
+    main()
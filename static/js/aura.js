@@ -0,0 +1,67 @@
+function showNotification(message, type = 'info') {
+    const notification = document.createElement('div');
+    notification.className = `fixed top-20 right-6 z-50 glass rounded-2xl p-4 text-white ${
+        type === 'success' ? 'border-green-500' : 
+        type === 'error' ? 'border-red-500' : 'border-purple-500'
+    } border-l-4 transform translate-x-full transition-transform duration-300`;
+    notification.innerHTML = `
+        <div class="flex items-center space-x-3">
+            <span class="text-xl">${type === 'success' ? '✅' : type === 'error' ? '❌' : '💡'}</span>
+            <span>${message}</span>
+        </div>
+    `;
+    document.body.appendChild(notification);
+
+    setTimeout(() => notification.style.transform = 'translateX(0)', 100);
+    setTimeout(() => { notification.style.transform = 'translateX(100%)'; setTimeout(() => notification.remove(), 300); }, 3000);
+}
+
+async function checkAuthStatus() {
+    try {
+        const response = await fetch('/api/current_user');
+        const userData = await response.json();
+
+        const navAuth = document.getElementById('navAuth');
+        if (!userData.error) {
+            navAuth.innerHTML = `
+                <a href="/feed" class="bg-gradient-to-r from-purple-500 to-pink-500 text-white px-6 py-2 rounded-full hover:from-purple-600 hover:to-pink-600 transition-all pulse-gentle">
+                    Create Post
+                </a>
+                <a href="/profile" class="w-10 h-10 bg-gradient-to-r from-blue-500 to-purple-500 rounded-full flex items-center justify-center text-white">
+                    👤
+                </a>
+            `;
+        }
+    } catch (error) {
+        console.error('Error checking auth status:', error);
+    }
+}
+
+// An EventSource that keeps trying: browsers give up for good on an error
+// response, such as the 503 a worker sends when its live streams are full
+function openEventStream(url) {
+    const listeners = [];
+    let source;
+    let delay = 5000;
+
+    function connect() {
+        source = new EventSource(url);
+        listeners.forEach(([event, handler]) => source.addEventListener(event, handler));
+        source.addEventListener('open', () => { delay = 5000; });
+        source.onerror = () => {
+            if (source.readyState !== EventSource.CLOSED) return;
+            setTimeout(connect, delay + Math.random() * 1000);
+            delay = Math.min(delay * 2, 60000);
+        };
+    }
+
+    connect();
+    return {
+        addEventListener(event, handler) {
+            listeners.push([event, handler]);
+            source.addEventListener(event, handler);
+        }
+    };
+}
+
+document.addEventListener('DOMContentLoaded', checkAuthStatus);
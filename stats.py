@@ -0,0 +1,132 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+def _day(iso_timestamp):
+    # 'YYYY-MM-DDTHH:MM:SS' -> 'YYYY-MM-DD' without parsing
+    return iso_timestamp[:10] if iso_timestamp else None
+
+class StatsAggregator:
+    """Admin dashboard counters maintained on write instead of per request.
+
+    The first snapshot does one pass over the store to seed the counters
+    (so a SQLite restart picks up existing data); after that routes call
+    the ``on_*`` hooks and every read is O(1).  Per-day buckets keep only
+    the last ``keep_days`` days.
+    """
+
+    def __init__(self, store, keep_days=30):
+        self.store = store
+        self.keep_days = keep_days
+        self._lock = threading.RLock()
+        self._built = False
+        self.total_users = 0
+        self.total_posts = 0
+        self.pending_reports = 0
+        self.post_counts = Counter()
+        self.active_by_day = {}
+        self.new_users_by_day = {}
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            self._built = True
+            for user in self.store.iter_users():
+                self._add_user(user)
+            for post in self.store.iter_posts():
+                self.total_posts += 1
+                self.post_counts[post.user_id] += 1
+            self.pending_reports = self.store.count_reports('pending')
+
+    def _in_window(self, buckets, day):
+        """Whether ``day`` is recent enough to keep a bucket for.
+
+        Seeding visits days in any order, so retention goes by date: on
+        each new day, buckets older than ``keep_days`` are dropped.
+        """
+        if not day:
+            return False
+        if day in buckets:
+            return True
+        cutoff = (date.today() - timedelta(days=self.keep_days - 1)).isoformat()
+        for old in [d for d in buckets if d < cutoff]:
+            del buckets[old]
+        return day >= cutoff
+
+    def _add_user(self, user):
+        self.total_users += 1
+        day = _day(user.created_at)
+        if self._in_window(self.new_users_by_day, day):
+            self.new_users_by_day[day] = self.new_users_by_day.get(day, 0) + 1
+        self._mark_active(user)
+
+    def _mark_active(self, user):
+        day = _day(user.last_login)
+        if self._in_window(self.active_by_day, day):
+            self.active_by_day.setdefault(day, set()).add(user.id)
+
+    def reset(self):
+        """Drop the store-derived counters; the next read re-seeds them"""
+        with self._lock:
+            self._built = False
+            self.total_users = 0
+            self.total_posts = 0
+            self.pending_reports = 0
+            self.post_counts.clear()
+            self.active_by_day.clear()
+            self.new_users_by_day.clear()
+
+    # ---------- Write hooks ---------- #
+    # Until the first snapshot the seeding pass will see these writes,
+    # so the hooks only count once the aggregator has been built.
+    def on_register(self, user):
+        with self._lock:
+            if self._built:
+                self._add_user(user)
+
+    def on_login(self, user):
+        with self._lock:
+            if self._built:
+                self._mark_active(user)
+
+    def on_post_created(self, user_id):
+        with self._lock:
+            if self._built:
+                self.total_posts += 1
+                self.post_counts[user_id] += 1
+
+    def on_post_deleted(self, user_id):
+        with self._lock:
+            if self._built:
+                self.total_posts -= 1
+                self.post_counts[user_id] -= 1
+
+    def on_report_filed(self):
+        with self._lock:
+            if self._built:
+                self.pending_reports += 1
+
+    def on_report_resolved(self, count=1):
+        with self._lock:
+            if self._built:
+                self.pending_reports -= count
+
+    # ---------- Reads ---------- #
+    def post_count(self, user_id):
+        self._ensure_built()
+        return self.post_counts[user_id]
+
+    def snapshot(self):
+        self._ensure_built()
+        today = date.today().isoformat()
+        with self._lock:
+            return {
+                'total_users': self.total_users,
+                'total_posts': self.total_posts,
+                'pending_reports': self.pending_reports,
+                'active_today': len(self.active_by_day.get(today, ())),
+                'new_users_today': self.new_users_by_day.get(today, 0)
+            }
@@ -0,0 +1,307 @@
+import itertools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from operator import attrgetter
+
+from models import Conversation
+from reactions import REACTIONS
+
+_signals = attrgetter('seq', 'id', 'user_id', 'timestamp', *REACTIONS)
+
+
+def _remove_sorted(seqs, seq):
+    i = bisect_left(seqs, seq)
+    if i < len(seqs) and seqs[i] == seq:
+        del seqs[i]
+
+
+class MemoryStore:
+    """In-memory repository for users and posts with primary indexes.
+
+    Every lookup the routes need is a dict hit instead of a scan over
+    the full user or post collections.  Posts also get a monotonically
+    increasing ``seq`` which doubles as the pagination cursor.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._seq = itertools.count(1)
+        self.users_by_id = {}
+        self.users_by_username = {}
+        self.posts_by_id = {}
+        self.posts_by_seq = {}
+        # Sorted seq lists (oldest first) backing the cursor APIs
+        self.posts_by_author = {}
+        self.timeline = []
+        self.all_seqs = []
+        self.follows = set()
+        # Reports in filing order, plus the pending ones per post and reporter
+        self.reports = {}
+        self.pending_reports = {}
+        # Direct messages: one append-only seq list per conversation, and
+        # per user an inbox {peer_id: Conversation} plus its last_seqs sorted
+        self._message_seq = itertools.count(1)
+        self.messages_by_seq = {}
+        self.conversations = {}
+        self.inboxes = {}
+        self.inbox_seqs = {}
+        self.unread_totals = {}
+
+    # ---------- Users ---------- #
+    def add_user(self, user):
+        with self._lock:
+            self.users_by_id[user.id] = user
+            self.users_by_username[user.username] = user
+            self.posts_by_author.setdefault(user.id, [])
+        return user
+
+    def get_user(self, user_id):
+        return self.users_by_id.get(user_id)
+
+    def get_user_by_username(self, username):
+        return self.users_by_username.get(username)
+
+    def has_username(self, username):
+        return username in self.users_by_username
+
+    def update_user(self, user, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(user, name, value)
+        return user
+
+    def iter_users(self):
+        return list(self.users_by_id.values())
+
+    def count_users(self):
+        return len(self.users_by_id)
+
+    # ---------- Follows ---------- #
+    def add_follow(self, follower_id, followee_id):
+        with self._lock:
+            self.follows.add((follower_id, followee_id))
+
+    def remove_follow(self, follower_id, followee_id):
+        with self._lock:
+            self.follows.discard((follower_id, followee_id))
+
+    def iter_follows(self):
+        return list(self.follows)
+
+    # ---------- Posts ---------- #
+    def add_post(self, post):
+        with self._lock:
+            post.seq = next(self._seq)
+            self.posts_by_id[post.id] = post
+            self.posts_by_seq[post.seq] = post
+            self.posts_by_author.setdefault(post.user_id, []).append(post.seq)
+            self.all_seqs.append(post.seq)
+            if getattr(post, 'is_approved', True):
+                self.timeline.append(post.seq)
+        return post
+
+    def get_post(self, post_id):
+        return self.posts_by_id.get(post_id)
+
+    def set_approved(self, post, is_approved, hidden_by=''):
+        with self._lock:
+            post.is_approved = is_approved
+            post.hidden_by = '' if is_approved else hidden_by
+            if is_approved:
+                _remove_sorted(self.timeline, post.seq)
+                insort(self.timeline, post.seq)
+            else:
+                _remove_sorted(self.timeline, post.seq)
+        return post
+
+    def set_approved_many(self, post_ids, is_approved, hidden_by=''):
+        """Set ``is_approved`` (and ``hidden_by`` when hiding) on a batch; returns the posts that changed"""
+        changed = []
+        with self._lock:
+            for post_id in post_ids:
+                post = self.posts_by_id.get(post_id)
+                if post is not None and post.is_approved != is_approved:
+                    changed.append(self.set_approved(post, is_approved, hidden_by))
+        return changed
+
+    def apply_reactions(self, deltas):
+        """Add a batch of ``{post_id: {reaction: n}}`` counter deltas"""
+        with self._lock:
+            for post_id, counts in deltas.items():
+                post = self.posts_by_id.get(post_id)
+                if post is None:
+                    continue
+                for kind, n in counts.items():
+                    setattr(post, kind, getattr(post, kind, 0) + n)
+
+    def reaction_counts(self, post_ids, kinds):
+        counts = {}
+        for post_id in post_ids:
+            post = self.posts_by_id.get(post_id)
+            if post is not None:
+                counts[post_id] = {kind: getattr(post, kind, 0) for kind in kinds}
+        return counts
+
+    def delete_post(self, post_id):
+        with self._lock:
+            post = self.posts_by_id.pop(post_id, None)
+            if post:
+                del self.posts_by_seq[post.seq]
+                _remove_sorted(self.posts_by_author.get(post.user_id, []), post.seq)
+                _remove_sorted(self.all_seqs, post.seq)
+                _remove_sorted(self.timeline, post.seq)
+        return post
+
+    def delete_posts(self, post_ids):
+        """Delete a batch of posts; returns the ones that existed"""
+        with self._lock:
+            deleted = [self.delete_post(post_id) for post_id in post_ids]
+        return [post for post in deleted if post]
+
+    def iter_posts(self):
+        return list(self.posts_by_id.values())
+
+    def posts_after(self, after_seq=0, limit=1000):
+        """Up to ``limit`` posts with ``seq > after_seq``, oldest first (for streaming exports)"""
+        with self._lock:
+            start = bisect_right(self.all_seqs, after_seq)
+            return [self.posts_by_seq[s] for s in self.all_seqs[start:start + limit]]
+
+    def post_signals(self, limit):
+        """``(seq, id, user_id, timestamp, *REACTIONS)`` of the newest ``limit`` approved posts, newest first"""
+        with self._lock:
+            seqs = self.timeline[-limit:]
+            return [_signals(self.posts_by_seq[s]) for s in reversed(seqs)]
+
+    def posts_for_user(self, user_id):
+        seqs = self.posts_by_author.get(user_id, [])
+        return [self.posts_by_seq[s] for s in list(seqs)]
+
+    def count_posts(self):
+        return len(self.posts_by_id)
+
+    def count_posts_for_user(self, user_id):
+        return len(self.posts_by_author.get(user_id, ()))
+
+    # ---------- Reports ---------- #
+    def add_report(self, report):
+        """Store ``report`` unless its reporter already has one pending on the post"""
+        with self._lock:
+            pending = self.pending_reports.setdefault(report.post_id, {})
+            if report.reporter_id in pending:
+                return False
+            pending[report.reporter_id] = report
+            self.reports[report.id] = report
+            post = self.posts_by_id.get(report.post_id)
+            if post is not None:
+                post.reports += 1
+        return True
+
+    def iter_reports(self, status=None):
+        return [r for r in list(self.reports.values()) if status is None or r.status == status]
+
+    def recent_reports(self, limit=100):
+        """The last ``limit`` reports filed, oldest first"""
+        with self._lock:
+            recent = list(itertools.islice(reversed(self.reports.values()), limit))
+        return recent[::-1]
+
+    def reports_for_post(self, post_id):
+        """Pending reports on ``post_id``"""
+        return list(self.pending_reports.get(post_id, {}).values())
+
+    def count_reports(self, status):
+        return sum(1 for r in list(self.reports.values()) if r.status == status)
+
+    def resolve_reports(self, post_ids, status):
+        """Close the pending reports on a batch of posts; returns how many"""
+        resolved = 0
+        with self._lock:
+            for post_id in post_ids:
+                for report in self.pending_reports.pop(post_id, {}).values():
+                    report.status = status
+                    resolved += 1
+                post = self.posts_by_id.get(post_id)
+                if post is not None:
+                    post.reports = 0
+        return resolved
+
+    # ---------- Direct messages ---------- #
+    def add_message(self, message):
+        """Append to the conversation log and move it to the top of both inboxes"""
+        with self._lock:
+            message.seq = next(self._message_seq)
+            self.messages_by_seq[message.seq] = message
+            self.conversations.setdefault(message.conversation_id, []).append(message.seq)
+            # Replying implies the sender has read the conversation
+            self._touch_conversation(message.sender_id, message.recipient_id, message, read=True)
+            self._touch_conversation(message.recipient_id, message.sender_id, message, read=False)
+        return message
+
+    def _touch_conversation(self, user_id, peer_id, message, read):
+        inbox = self.inboxes.setdefault(user_id, {})
+        seqs = self.inbox_seqs.setdefault(user_id, [])
+        conversation = inbox.get(peer_id)
+        if conversation is None:
+            conversation = inbox[peer_id] = Conversation(user_id, peer_id)
+        else:
+            _remove_sorted(seqs, conversation.last_seq)
+        # The newest message always has the highest seq: appending keeps order
+        seqs.append(message.seq)
+        conversation.last_seq = message.seq
+        conversation.last_message = message
+        if read:
+            self.unread_totals[user_id] = self.unread_totals.get(user_id, 0) - conversation.unread
+            conversation.unread = 0
+        else:
+            self.unread_totals[user_id] = self.unread_totals.get(user_id, 0) + 1
+            conversation.unread += 1
+
+    def mark_read(self, user_id, peer_id):
+        """Zero the unread count of one conversation; returns how many were unread"""
+        with self._lock:
+            conversation = self.inboxes.get(user_id, {}).get(peer_id)
+            if conversation is None or not conversation.unread:
+                return 0
+            cleared, conversation.unread = conversation.unread, 0
+            self.unread_totals[user_id] -= cleared
+        return cleared
+
+    def unread_count(self, user_id):
+        return self.unread_totals.get(user_id, 0)
+
+    def get_conversation(self, user_id, peer_id):
+        return self.inboxes.get(user_id, {}).get(peer_id)
+
+    def conversation_page(self, conversation_id, before=None, limit=20):
+        """Messages in one conversation, newest first, strictly older than ``before``"""
+        return self._page(self.conversations.get(conversation_id, []), before, limit, self.messages_by_seq.__getitem__)
+
+    def inbox_page(self, user_id, before=None, limit=20):
+        """``user_id``'s conversations by last activity, newest first"""
+        inbox = self.inboxes.get(user_id, {})
+
+        def conversation_at(seq):
+            message = self.messages_by_seq[seq]
+            return inbox[message.recipient_id if message.sender_id == user_id else message.sender_id]
+        return self._page(self.inbox_seqs.get(user_id, []), before, limit, conversation_at)
+
+    # ---------- Cursor pages (newest first) ---------- #
+    def _page(self, seqs, before, limit, get=None):
+        get = get or self.posts_by_seq.__getitem__
+        with self._lock:
+            end = bisect_left(seqs, before) if before is not None else len(seqs)
+            start = max(0, end - limit)
+            page = [get(s) for s in reversed(seqs[start:end])]
+            next_cursor = seqs[start] if start > 0 else None
+        return page, next_cursor
+
+    def timeline_page(self, before=None, limit=20):
+        """Approved posts, newest first, strictly older than ``before``"""
+        return self._page(self.timeline, before, limit)
+
+    def author_page(self, user_id, before=None, limit=20):
+        return self._page(self.posts_by_author.get(user_id, []), before, limit)
+
+    def all_posts_page(self, before=None, limit=20):
+        return self._page(self.all_seqs, before, limit)
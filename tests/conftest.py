@@ -0,0 +1,55 @@
+import pytest
+
+from database import SQLiteStore, close_db_connection
+from models import Post, User
+from store import MemoryStore
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'aura.db')
+    yield path
+    close_db_connection(path)
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, db_path):
+    """Each test runs against both store backends"""
+    if request.param == 'memory':
+        return MemoryStore()
+    return SQLiteStore(db_path)
+
+def make_user(store, name='alice', **fields):
+    user = User(name, f'{name}@example.com', 'x')
+    for field, value in fields.items():
+        setattr(user, field, value)
+    return store.add_user(user)
+
+def make_post(store, user, content='hello', **fields):
+    post = Post(user.id, content)
+    for field, value in fields.items():
+        setattr(post, field, value)
+    return store.add_post(post)
+
+@pytest.fixture(scope='session')
+def app():
+    """main's app on the memory backend; main allows one app per process"""
+    import main
+    return main.create_app({'TESTING': True, 'STORAGE_BACKEND': 'memory', 'SNAPSHOT_PATH': '',
+                            'RATE_LIMIT_ENABLED': False, 'SEED_SAMPLE_DATA': False})
+
+_users = iter(range(10 ** 6))
+
+@pytest.fixture
+def login(app):
+    """``login(is_admin=False)``: a test client signed in as a fresh user"""
+    import main
+
+    def login(is_admin=False):
+        name = f'user{next(_users)}'
+        user = User(name, f'{name}@example.com', main.hasher.hash('pw'), is_admin=is_admin)
+        main.store.add_user(user)
+        client = app.test_client()
+        response = client.post('/api/login', json={'username': name, 'password': 'pw'})
+        assert response.get_json()['success']
+        client.user = user
+        return client
+    return login
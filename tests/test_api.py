@@ -0,0 +1,147 @@
+import re
+
+def test_search_pages_with_before(login):
+    client = login()
+    for i in range(5):
+        client.post('/api/create_post', json={'content': f'zebracorn sighting {i}'})
+    first = client.get('/api/search?q=zebracorn&limit=3').get_json()
+    assert len(first['posts']) == 3
+    assert first['next_cursor'] == 3
+    rest = client.get(f"/api/search?q=zebracorn&limit=3&before={first['next_cursor']}").get_json()
+    assert len(rest['posts']) == 2
+    assert rest['next_cursor'] is None
+    seen = [post['id'] for post in first['posts'] + rest['posts']]
+    assert len(set(seen)) == 5
+
+def test_remote_deltas_update_local_state(app, login):
+    import main
+    from models import Post, User
+    main.stats.snapshot()
+    before = main.stats.snapshot()
+
+    user = main.store.add_user(User('remote_author', 'remote@example.com', 'x'))
+    main.on_remote_event('user_added', {'id': user.id})
+    post = main.store.add_post(Post(user.id, 'from another worker'))
+    main.on_remote_event('post_created', {'id': post.id})
+    after = main.stats.snapshot()
+    assert after['total_users'] == before['total_users'] + 1
+    assert after['total_posts'] == before['total_posts'] + 1
+
+    follower = login().user
+    main.on_remote_event('follow_changed', {'follower_id': follower.id, 'followee_id': user.id, 'following': True})
+    assert main.graph.is_following(follower.id, user.id)
+    main.on_remote_event('follow_changed', {'follower_id': follower.id, 'followee_id': user.id, 'following': False})
+    assert not main.graph.is_following(follower.id, user.id)
+
+    main.store.delete_post(post.id)
+    main.on_remote_event('moderated', {'action': 'delete', 'post_ids': [post.id], 'resolved': 0, 'posts': [
+        {'id': post.id, 'user_id': user.id, 'timestamp': post.timestamp, 'tags': [], 'was_approved': True}]})
+    assert main.stats.snapshot()['total_posts'] == before['total_posts']
+
+def _trending(tag):
+    import main
+    main.trending._get()._ranked_at = None  # skip the five-second ranking cache
+    return dict(main.trending.top(50)).get(tag, 0)
+
+def test_remote_removals_leave_trending(login):
+    import main
+    client = login()
+    _trending('warmup')
+    for content in ('#remotehidden one', '#remotehidden two', '#remotedeleted three'):
+        client.post('/api/create_post', json={'content': content})
+    posts = {post.content: post for post in main.store.posts_for_user(client.user.id)}
+    assert (_trending('remotehidden'), _trending('remotedeleted')) == (2, 1)
+
+    # Another worker hid one post and deleted the other; only its deltas arrive here
+    hidden, deleted = posts['#remotehidden two'], posts['#remotedeleted three']
+    main.store.set_approved(hidden, False)
+    main.store.delete_post(deleted.id)
+    for action, post, tag in (('hide', hidden, 'remotehidden'), ('delete', deleted, 'remotedeleted')):
+        main.on_remote_event('moderated', {'action': action, 'post_ids': [post.id], 'resolved': 0, 'posts': [
+            {'id': post.id, 'user_id': post.user_id, 'timestamp': post.timestamp, 'tags': [tag],
+             'was_approved': True}]})
+    assert (_trending('remotehidden'), _trending('remotedeleted')) == (1, 0)
+
+def test_hidden_posts_leave_hashtag_results(login):
+    admin, client = login(is_admin=True), login()
+    _trending('warmup')
+    for content in ('#hidetag one', '#hidetag two'):
+        client.post('/api/create_post', json={'content': content})
+    page = client.get('/api/hashtags/hidetag').get_json()
+    assert page['total'] == 2
+    hidden = page['posts'][0]['id']
+
+    admin.post('/api/admin/moderate', json={'action': 'hide', 'post_ids': [hidden]})
+    page = client.get('/api/hashtags/hidetag').get_json()
+    assert (page['total'], len(page['posts']), _trending('hidetag')) == (1, 1, 1)
+    admin.post('/api/admin/moderate', json={'action': 'approve', 'post_ids': [hidden]})
+    assert (client.get('/api/hashtags/hidetag').get_json()['total'], _trending('hidetag')) == (2, 2)
+
+def test_stream_returns_503_when_full(login):
+    import main
+    client = login()
+    main.broker.max_subscribers = 1
+    try:
+        held = main.broker.subscribe()
+        response = client.get('/api/stream')
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+        main.broker.unsubscribe(held)
+        response = client.get('/api/stream')
+        assert response.status_code == 200
+        response.close()
+        assert main.broker.subscriber_count() == 0
+    finally:
+        main.broker.max_subscribers = 0
+
+def test_legacy_app_renders_shared_templates():
+    import app as legacy
+    client = legacy.app.test_client()
+    page = client.get('/login')
+    assert page.status_code == 200
+    href = re.search(r'href="(/static/css/[^"]+)"', page.get_data(as_text=True)).group(1)
+    assert client.get(href).status_code == 200
+
+def test_login_invalidates_admin_views_only(login):
+    import main
+    from response_cache import STATS, USERS
+    admin = login(is_admin=True)
+    before = admin.get('/api/admin/users').get_json()
+    users, stats_version = main.response_cache.versions.get(USERS), main.response_cache.versions.get(STATS)
+    client = login()
+    assert main.response_cache.versions.get(USERS) == users
+    assert main.response_cache.versions.get(STATS) > stats_version
+    after = {user['username']: user for user in admin.get('/api/admin/users').get_json()}
+    assert len(after) == len(before) + 1
+    assert after[client.user.username]['last_login']
+
+def test_likes_leave_cached_feeds_alone(login):
+    import main
+    from response_cache import POSTS
+    client = login()
+    client.post('/api/create_post', json={'content': 'like me'})
+    post_id = client.get('/api/posts').get_json()['posts'][0]['id']
+    version = main.response_cache.versions.get(POSTS)
+    assert client.post(f'/api/like_post/{post_id}').get_json() == {'success': True, 'likes': 1}
+    main.reaction_buffer.flush()
+    assert main.response_cache.versions.get(POSTS) == version
+
+def test_search_pages_stay_full_around_hidden_posts(login):
+    import main
+    client = login()
+    for i in range(7):
+        client.post('/api/create_post', json={'content': f'quokkafest {i}'})
+    posts = {post.content: post for post in main.store.posts_for_user(client.user.id)}
+    for i in (6, 5, 2):
+        main.moderator.apply('hide', [posts[f'quokkafest {i}'].id])
+
+    seen, before = [], None
+    while True:
+        url = '/api/search?q=quokkafest&limit=2' + (f'&before={before}' if before is not None else '')
+        page = client.get(url).get_json()
+        assert len(page['posts']) == 2 or page['next_cursor'] is None
+        seen += [post['content'] for post in page['posts']]
+        before = page['next_cursor']
+        if before is None:
+            break
+    assert sorted(seen) == [f'quokkafest {i}' for i in (0, 1, 3, 4)]
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from lazy import Lazy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Target:
+    def __init__(self):
+        self.value = 1
+
+    def read(self):
+        return self.value
+
+def test_lazy_builds_once_on_first_use():
+    built = []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        built.append(1)
+        return Target()
+
+    proxy = Lazy(factory)
+    assert not proxy.built
+
+    def use():
+        barrier.wait()
+        proxy.read()
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert proxy.built and len(built) == 1
+
+def test_lazy_caches_methods_but_reads_attributes_through():
+    proxy = Lazy(Target)
+    assert proxy.read() == 1
+    assert 'read' in proxy.__dict__ and 'value' not in proxy.__dict__
+    proxy._get().value = 2
+    assert proxy.value == 2 and proxy.read() == 2
+
+def test_create_app_runs_once_per_process(app):
+    import main
+    assert app is main.app and app.config['TESTING']
+    with pytest.raises(RuntimeError):
+        main.create_app()
+
+def test_create_app_defers_storage_until_first_request(tmp_path):
+    database = tmp_path / 'aura.db'
+    script = (
+        'import os, main\n'
+        'app = main.create_app({"STORAGE_BACKEND": "sqlite", "DATABASE_PATH": os.environ["DB"],\n'
+        '                       "SEED_SAMPLE_DATA": False})\n'
+        'assert not os.path.exists(os.environ["DB"])\n'
+        'assert app.test_client().get("/api/posts").status_code == 200\n'
+        'assert os.path.exists(os.environ["DB"])\n'
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, 'DB': str(database)}, timeout=60)
+    assert result.returncode == 0, result.stderr
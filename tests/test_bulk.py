@@ -0,0 +1,45 @@
+from bulk import SQLiteImporter, export_records
+from conftest import make_post, make_user
+from database import SQLiteHashtagIndex, FTSIndex, SQLiteStore, get_db_connection
+from store import MemoryStore
+
+def _items(records):
+    return ((i, 0, record) for i, record in enumerate(records, 1))
+
+def test_round_trip_keeps_posts_in_order(db_path):
+    source = MemoryStore()
+    alice = make_user(source)
+    posts = [make_post(source, alice, f'post {i} #aura') for i in range(5)]
+
+    counts = SQLiteImporter(db_path, chunk=2).load(_items(export_records(source)))
+    assert counts == {'user': 1, 'follow': 0, 'post': 5, 'report': 0}
+    store = SQLiteStore(db_path)
+    assert [post.id for post in store.all_posts_page(limit=10)[0]] == [post.id for post in reversed(posts)]
+    assert len(FTSIndex(db_path).search('post', limit=10)[0]) == 5
+
+def test_renumber_merges_into_existing_accounts(db_path):
+    store = SQLiteStore(db_path)
+    search, hashtags = FTSIndex(db_path), SQLiteHashtagIndex(db_path)
+    existing = make_user(store, 'alice', password='existing-hash')
+    kept = make_post(store, existing, 'already here #kept')
+    search.add(kept)
+    hashtags.add(kept)
+
+    source = MemoryStore()
+    imported = make_user(source, 'alice', password='imported-hash')
+    make_user(source, 'bob')
+    source.add_post(kept)
+    new = make_post(source, imported, 'new post #merged')
+
+    SQLiteImporter(db_path, chunk=2, renumber=True).load(_items(export_records(source)))
+    alice = store.get_user_by_username('alice')
+    assert (alice.id, alice.password) == (existing.id, 'existing-hash')
+    assert store.get_post(new.id).user_id == existing.id
+    assert store.get_user_by_username('bob') is not None
+    assert store.get_post(new.id).seq == kept.seq + 1
+    # The skipped duplicate left no search or hashtag rows behind
+    conn = get_db_connection(db_path)
+    assert [tuple(row) for row in conn.execute('SELECT rowid FROM posts_fts ORDER BY rowid')] == \
+        [(kept.seq,), (kept.seq + 1,)]
+    assert [tuple(row) for row in conn.execute('SELECT tag, seq FROM post_tags ORDER BY seq')] == \
+        [('kept', kept.seq), ('merged', kept.seq + 1)]
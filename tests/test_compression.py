@@ -0,0 +1,104 @@
+import gzip
+
+import pytest
+from flask import Flask, Response, render_template_string
+from werkzeug.http import parse_accept_header
+
+from assets import IMMUTABLE, StaticAssets
+from compression import Compressor, negotiate
+
+BIG = 'aura ' * 1000
+
+def test_negotiate_prefers_quality_then_offer_order():
+    assert negotiate(parse_accept_header('gzip, br'), ('br', 'gzip')) == 'br'
+    assert negotiate(parse_accept_header('gzip;q=1, br;q=0.5'), ('br', 'gzip')) == 'gzip'
+    assert negotiate(parse_accept_header('identity'), ('br', 'gzip')) is None
+    assert negotiate(parse_accept_header('*'), ('gzip',)) == 'gzip'
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+    compressor = Compressor(app, min_size=100)
+
+    @app.route('/big')
+    def big():
+        return Response(BIG, mimetype='text/plain')
+
+    @app.route('/small')
+    def small():
+        return Response('aura', mimetype='text/plain')
+
+    @app.route('/tagged')
+    def tagged():
+        response = Response(BIG, mimetype='application/json')
+        response.set_etag('v1')
+        return response
+
+    @app.route('/png')
+    def png():
+        return Response(BIG, mimetype='image/png')
+
+    @app.route('/stream')
+    def stream():
+        return Response(iter([BIG]), mimetype='text/plain')
+
+    app.compressor = compressor
+    return app
+
+def test_compresses_large_text_for_clients_that_accept_it(compressed_app):
+    client = compressed_app.test_client()
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data).decode() == BIG
+    assert compressed_app.compressor.bytes_in == len(BIG)
+
+    for path, headers in [('/big', {}), ('/small', {'Accept-Encoding': 'gzip'}),
+                          ('/png', {'Accept-Encoding': 'gzip'}), ('/stream', {'Accept-Encoding': 'gzip'})]:
+        response = client.get(path, headers=headers)
+        assert 'Content-Encoding' not in response.headers, path
+
+def test_tagged_responses_are_compressed_once(compressed_app, monkeypatch):
+    import compression
+    calls = []
+    real = compression.compress
+    monkeypatch.setattr(compression, 'compress', lambda *args: calls.append(args) or real(*args))
+    client = compressed_app.test_client()
+    for _ in range(3):
+        response = client.get('/tagged', headers={'Accept-Encoding': 'gzip'})
+        assert gzip.decompress(response.data).decode() == BIG
+        assert response.headers['ETag'] == 'W/"v1"'
+    assert len(calls) == 1
+
+@pytest.fixture
+def static_app(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: red; }\n' * 100)
+    (tmp_path / 'favicon.ico').write_bytes(b'\x00' * 10)
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path='/static')
+    app.assets = StaticAssets(app)
+
+    @app.route('/page')
+    def page():
+        return render_template_string("{{ asset_url('css/site.css') }}")
+    return app
+
+def test_fingerprinted_assets_are_precompressed_and_immutable(static_app):
+    client = static_app.test_client()
+    url = client.get('/page').get_data(as_text=True)
+    assert url.startswith('/static/css/site.') and url.endswith('.css') and url != '/static/css/site.css'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).decode().startswith('body { color: red; }')
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers and plain.data.startswith(b'body')
+    assert client.get(url, headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+def test_unfingerprinted_files_come_from_disk(static_app):
+    response = static_app.test_client().get('/static/favicon.ico')
+    assert response.status_code == 200 and response.data == b'\x00' * 10
+    assert response.headers['Cache-Control'] != IMMUTABLE
+    response.close()
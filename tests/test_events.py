@@ -0,0 +1,49 @@
+import json
+
+from events import ADMIN, INTERNAL, PUBLIC, EventBroker, user_channel
+
+def test_public_events_reach_every_channel():
+    broker = EventBroker()
+    admin, user = broker.subscribe(ADMIN), broker.subscribe(user_channel('u1'))
+    broker.publish('new_post', {'id': 'p1'})
+    broker.publish('report_filed', {'id': 'r1'}, channel=ADMIN)
+    assert admin.qsize() == 2
+    assert user.qsize() == 1
+    assert user.get_nowait() == f"event: new_post\ndata: {json.dumps({'id': 'p1'})}\n\n"
+
+class FakeLog:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, event, data, channel):
+        self.rows.append((event, data, channel))
+
+def test_shared_deltas_skip_clients():
+    log = FakeLog()
+    broker = EventBroker(log=log)
+    q = broker.subscribe(PUBLIC)
+    broker.share('post_created', {'id': 'p1'})
+    assert log.rows == [('post_created', {'id': 'p1'}, INTERNAL)]
+    assert q.empty()
+
+    received = []
+    broker.on_remote(lambda event, data: received.append((event, data)))
+    broker._relay('post_created', {'id': 'p2'}, INTERNAL)
+    broker._relay('new_post', {'id': 'p3'}, PUBLIC)
+    assert received == [('post_created', {'id': 'p2'}), ('new_post', {'id': 'p3'})]
+    # Only the client event reaches subscribers
+    assert q.qsize() == 1
+
+def test_full_queue_drops_subscriber():
+    broker = EventBroker(queue_size=1)
+    q = broker.subscribe()
+    broker.publish('a', {})
+    broker.publish('b', {})
+    assert broker.subscriber_count() == 0
+
+def test_subscribers_are_capped():
+    broker = EventBroker(max_subscribers=2)
+    first, second = broker.subscribe(), broker.subscribe()
+    assert broker.subscribe() is None
+    broker.unsubscribe(first)
+    assert broker.subscribe() is not None
@@ -0,0 +1,69 @@
+from conftest import make_post, make_user
+from follows import FollowGraph, HomeTimelines
+
+def _pages(timelines, user_id, limit):
+    """Every post id of a home feed, read ``limit`` at a time"""
+    ids, before = [], None
+    while True:
+        posts, before = timelines.page(user_id, before, limit)
+        assert len(posts) == limit or before is None
+        ids += [post.id for post in posts]
+        if before is None:
+            return ids
+
+def test_graph_writes_through_and_reloads(store):
+    alice, bob = make_user(store), make_user(store, 'bob')
+    graph = FollowGraph(store)
+    assert graph.follow(alice.id, bob.id) and not graph.follow(alice.id, bob.id)
+    assert FollowGraph(store).is_following(alice.id, bob.id)
+    assert graph.unfollow(alice.id, bob.id) and not graph.unfollow(alice.id, bob.id)
+    assert FollowGraph(store).following_of(alice.id) == set()
+
+def test_fan_out_page_merges_a_celebrity_followee(store):
+    reader, friend, star, fan = (make_user(store, name) for name in ('reader', 'friend', 'star', 'fan'))
+    graph = FollowGraph(store)
+    graph.follow(reader.id, friend.id)
+    graph.follow(reader.id, star.id)
+    graph.follow(fan.id, star.id)
+    timelines = HomeTimelines(store, graph, size=4, fanout_limit=1)
+    expected = []
+    for i in range(10):
+        author = star if i % 3 == 0 else friend
+        expected.append(make_post(store, author, f'post {i}').id)
+    timelines.page(reader.id)  # builds the buffer from the friend's posts only
+    for i in range(10, 14):
+        post = make_post(store, star if i % 2 else friend, f'post {i}')
+        timelines.on_post_created(post)
+        expected.append(post.id)
+    stranger = make_user(store, 'stranger')
+    make_post(store, stranger, 'not followed')
+
+    newest_first = expected[::-1]
+    for limit in (1, 3, 5, 20):
+        assert _pages(timelines, reader.id, limit) == newest_first
+
+def test_followee_turned_celebrity_is_not_repeated(store):
+    reader, author = make_user(store, 'reader'), make_user(store, 'author')
+    graph = FollowGraph(store)
+    graph.follow(reader.id, author.id)
+    timelines = HomeTimelines(store, graph, fanout_limit=1)
+    posts = [make_post(store, author, str(i)) for i in range(5)]
+    timelines.page(reader.id)
+    graph.follow(make_user(store, 'fan').id, author.id)  # now over fanout_limit
+    assert _pages(timelines, reader.id, 2) == [post.id for post in reversed(posts)]
+
+def test_hidden_posts_do_not_shorten_pages(store):
+    reader = make_user(store, 'reader')
+    timelines = HomeTimelines(store, FollowGraph(store), size=3)
+    posts = [make_post(store, reader, str(i)) for i in range(9)]
+    for post in posts[2:7]:
+        store.set_approved(post, False)
+    assert _pages(timelines, reader.id, 2) == [posts[i].id for i in (8, 7, 1, 0)]
+
+def test_pages_past_the_buffer_refill_it(store):
+    reader = make_user(store, 'reader')
+    timelines = HomeTimelines(store, FollowGraph(store), size=6)
+    posts = [make_post(store, reader, str(i)) for i in range(10)]
+    assert _pages(timelines, reader.id, 3) == [post.id for post in reversed(posts)]
+    assert [post_id for _, post_id in timelines._buffers[reader.id]] == [post.id for post in posts]
+    assert reader.id in timelines._complete
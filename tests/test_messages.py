@@ -0,0 +1,67 @@
+import json
+
+from conftest import make_user
+from events import user_channel
+from models import Message, conversation_id
+
+def test_inbox_orders_by_last_activity_and_tracks_unread(store):
+    alice, bob, carol = make_user(store, 'alice'), make_user(store, 'bob'), make_user(store, 'carol')
+    store.add_message(Message(bob.id, alice.id, 'hi'))
+    store.add_message(Message(bob.id, alice.id, 'you there?'))
+    store.add_message(Message(carol.id, alice.id, 'hey'))
+    assert store.unread_count(alice.id) == 3
+
+    inbox, _ = store.inbox_page(alice.id)
+    assert [(c.peer_id, c.unread, c.last_message.content) for c in inbox] == [
+        (carol.id, 1, 'hey'), (bob.id, 2, 'you there?')]
+
+    # Replying reads the conversation and moves it to the top
+    store.add_message(Message(alice.id, bob.id, 'yes'))
+    inbox, _ = store.inbox_page(alice.id)
+    assert [(c.peer_id, c.unread) for c in inbox] == [(bob.id, 0), (carol.id, 1)]
+    assert store.unread_count(alice.id) == 1
+    assert store.unread_count(bob.id) == 1
+
+    assert store.mark_read(alice.id, carol.id) == 1
+    assert store.mark_read(alice.id, carol.id) == 0
+    assert store.unread_count(alice.id) == 0
+
+def test_conversation_pages_newest_first(store):
+    alice, bob = make_user(store, 'alice'), make_user(store, 'bob')
+    for i in range(5):
+        store.add_message(Message(alice.id, bob.id, f'm{i}'))
+    page, cursor = store.conversation_page(conversation_id(bob.id, alice.id), limit=3)
+    assert [m.content for m in page] == ['m4', 'm3', 'm2']
+    page, cursor = store.conversation_page(conversation_id(alice.id, bob.id), cursor, limit=3)
+    assert [m.content for m in page] == ['m1', 'm0'] and cursor is None
+
+def test_send_and_read_over_the_api(login):
+    import main
+    alice, bob = login(), login()
+    q = main.broker.subscribe(user_channel(bob.user.id))
+    try:
+        response = alice.post(f'/api/messages/{bob.user.username}', json={'content': ' hi bob '})
+        assert response.get_json()['message']['content'] == 'hi bob'
+        event, data = q.get_nowait().split('\n')[:2]
+        assert event == 'event: message'
+        assert json.loads(data.removeprefix('data: '))['sender'] == alice.user.username
+    finally:
+        main.broker.unsubscribe(q)
+
+    inbox = bob.get('/api/messages').get_json()
+    assert inbox['unread'] == 1
+    assert inbox['conversations'][0]['username'] == alice.user.username
+
+    history = bob.get(f'/api/messages/{alice.user.username}').get_json()
+    assert [m['content'] for m in history['messages']] == ['hi bob']
+    assert bob.get('/api/messages').get_json()['unread'] == 0
+
+def test_sending_is_validated(app, login):
+    alice, bob = login(), login()
+    send = lambda to, content: alice.post(f'/api/messages/{to}', json={'content': content}).get_json()
+    assert not send(bob.user.username, '   ')['success']
+    assert not send(bob.user.username, 'x' * 10000)['success']
+    assert not send(alice.user.username, 'hi me')['success']
+    assert not send('nobody-by-this-name', 'hi')['success']
+    assert bob.get('/api/messages').get_json()['unread'] == 0
+    assert app.test_client().get('/api/messages').status_code == 401
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from metrics import InstrumentedStore, Registry
+from profiler import SamplingProfiler
+from store import MemoryStore
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    hits = registry.counter('hits_total', 'Hits', labels=('route',))
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.collector('queue_depth', 'gauge', 'Depth', labels=('queue',))(lambda: [(('a"b',), 3)])
+    hits.inc('/feed')
+    hits.inc('/feed', amount=2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    lines = registry.render().splitlines()
+    assert '# TYPE hits_total counter' in lines
+    assert 'hits_total{route="/feed"} 3' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'latency_seconds_count 3' in lines
+    assert 'queue_depth{queue="a\\"b"} 3' in lines
+
+def test_instrumented_store_counts_public_calls():
+    registry = Registry()
+    calls = registry.counter('calls', 'Calls', labels=('op',))
+    seconds = registry.counter('seconds', 'Seconds', labels=('op',))
+    store = InstrumentedStore(MemoryStore(), calls, seconds)
+    store.get_post(1)
+    store.get_post(2)
+    assert 'calls{op="get_post"} 2' in registry.render().splitlines()
+    assert 'get_post' in store.__dict__
+
+def test_metrics_endpoint(app, login, monkeypatch):
+    client = login()
+    client.get('/api/posts')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'aura_request_duration_seconds_count{' in body
+    assert 'aura_store_operations_total{op=' in body
+
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 's3cret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+def busy_endpoint(stop):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+def test_profiler_samples_only_threads_in_a_request():
+    profiler = SamplingProfiler(interval=0.001)
+    stop = threading.Event()
+
+    def serve():
+        profiler.enter('feed')
+        busy_endpoint(stop)
+        profiler.exit()
+
+    profiler.start()
+    worker = threading.Thread(target=serve)
+    worker.start()
+    idle = threading.Thread(target=busy_endpoint, args=(stop,))
+    idle.start()
+    deadline = time.monotonic() + 5
+    while 'busy_endpoint' not in profiler.folded() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    worker.join()
+    idle.join()
+    profiler.stop()
+
+    stacks = profiler.folded().splitlines()
+    assert stacks and all(line.startswith('feed;') for line in stacks)
+    assert any('busy_endpoint' in line for line in stacks)
+    assert profiler.summary()['samples'] > 0
+    profiler.reset()
+    assert profiler.folded() == ''
+
+def test_profiler_endpoint_is_admin_only(login):
+    assert login().get('/api/admin/profiler').status_code == 403
+    admin = login(is_admin=True)
+    assert admin.post('/api/admin/profiler', json={'enabled': False, 'reset': True}).get_json()['samples'] == 0
+    assert admin.get('/api/admin/profiler?format=json').get_json()['running'] is False
@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import make_post, make_user
+from models import Report
+from moderation import PENDING, SUSPENSION, Moderator, ReportQueue
+from snapshot import SnapshotStore
+
+@pytest.fixture
+def moderator(store):
+    moderator = Moderator(store, ReportQueue(store), batch_size=2)
+    yield moderator
+    if moderator._pool is not None:
+        moderator._pool.shutdown()
+
+def test_reinstating_unhides_only_suspension_hidden_posts(store, moderator):
+    user = make_user(store)
+    posts = [make_post(store, user, f'post {i}') for i in range(5)]
+    moderator.apply('hide', [posts[0].id])
+
+    store.update_user(user, is_active=False)
+    assert moderator.hide_user_posts(user.id).result() == 4
+    assert [p.is_approved for p in store.posts_for_user(user.id)] == [False] * 5
+    assert {p.id for p in store.posts_for_user(user.id) if p.hidden_by == SUSPENSION} == {p.id for p in posts[1:]}
+
+    store.update_user(user, is_active=True)
+    assert moderator.restore_user_posts(user.id).result() == 4
+    hidden = [p.id for p in store.posts_for_user(user.id) if not p.is_approved]
+    assert hidden == [posts[0].id]
+    assert all(p.hidden_by == '' for p in store.posts_for_user(user.id))
+
+def test_stale_cascade_is_skipped(store, moderator):
+    # Suspended and reinstated before the hide ran: nothing is hidden
+    user = make_user(store)
+    make_post(store, user)
+    assert moderator.hide_user_posts(user.id).result() == 0
+    assert all(p.is_approved for p in store.posts_for_user(user.id))
+
+def test_apply_resolves_reports_and_drops_queue_entries(store, moderator):
+    author, reporter, other = make_user(store), make_user(store, 'bob'), make_user(store, 'carol')
+    first, second = make_post(store, author, 'one'), make_post(store, author, 'two')
+    assert moderator.report(Report(first.id, reporter.id, 'spam'))
+    assert moderator.report(Report(second.id, reporter.id, 'spam'))
+    assert moderator.report(Report(second.id, other.id, 'spam'))
+    assert not moderator.report(Report(second.id, other.id, 'again'))
+    assert moderator.queue.top() == [(second.id, 2), (first.id, 1)]
+
+    _, resolved = moderator.apply('delete', [second.id])
+    assert resolved == 2
+    assert moderator.queue.top() == [(first.id, 1)]
+    assert store.get_post(second.id) is None
+    assert store.count_reports(PENDING) == 1
+
+def test_hidden_by_survives_snapshot_and_log_replay(tmp_path):
+    path = str(tmp_path / 'aura.snap')
+    store = SnapshotStore(path)
+    user = make_user(store)
+    logged, snapshotted = make_post(store, user, 'one'), make_post(store, user, 'two')
+    store.set_approved(snapshotted, False, hidden_by=SUSPENSION)
+    store.snapshot()
+    store.set_approved(logged, False, hidden_by=SUSPENSION)
+    store.close()
+
+    reopened = SnapshotStore(path)
+    try:
+        assert [(p.is_approved, p.hidden_by) for p in reopened.posts_for_user(user.id)] == \
+            [(False, SUSPENSION), (False, SUSPENSION)]
+    finally:
+        reopened.close()
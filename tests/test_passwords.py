@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from credentials import HasherBusy, PasswordHasher
+
+def hasher(**fields):
+    params = {'scrypt_n': 2 ** 4, 'pbkdf2_iterations': 10, 'max_workers': 1, 'max_pending': 0}
+    params.update(fields)
+    return PasswordHasher(**params)
+
+@pytest.mark.parametrize('scheme', ['scrypt', 'pbkdf2_sha256'])
+def test_hash_round_trip(scheme):
+    passwords = hasher(scheme=scheme)
+    encoded = passwords.hash('hunter2')
+    assert encoded.startswith(scheme + '$')
+    assert passwords.verify('hunter2', encoded) == (True, False)
+    assert passwords.verify('hunter3', encoded) == (False, False)
+
+def test_changed_parameters_and_plain_text_need_a_rehash():
+    encoded = hasher(scrypt_n=2 ** 4).hash('pw')
+    assert hasher(scrypt_n=2 ** 5).verify_sync('pw', encoded) == (True, True)
+    assert hasher(scheme='pbkdf2_sha256').verify_sync('pw', encoded) == (True, True)
+    assert hasher().verify_sync('pw', 'pw') == (True, True)
+    assert hasher().verify_sync('pw', 'other') == (False, False)
+
+def test_verify_cache_skips_the_kdf_for_repeated_successes():
+    passwords = hasher(cache_size=1)
+    first, second = passwords.hash('one'), passwords.hash('two')
+    calls = []
+    verify_sync = passwords.verify_sync
+    passwords.verify_sync = lambda *args: calls.append(args) or verify_sync(*args)
+
+    passwords.verify('one', first)
+    passwords.verify('one', first)
+    assert len(calls) == 1 and passwords.cache_hits == 1
+
+    # Failures are never cached
+    passwords.verify('wrong', first)
+    passwords.verify('wrong', first)
+    assert len(calls) == 3
+
+    # The oldest success is evicted past cache_size
+    passwords.verify('two', second)
+    passwords.verify('one', first)
+    assert len(calls) == 5
+
+def test_full_pool_raises_busy():
+    passwords = hasher()
+    started, release = threading.Event(), threading.Event()
+
+    def slow(password):
+        started.set()
+        release.wait(5)
+        return password
+
+    worker = threading.Thread(target=passwords._submit, args=(slow, 'pw'))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HasherBusy):
+            passwords.hash('pw')
+    finally:
+        release.set()
+        worker.join()
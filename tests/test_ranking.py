@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from conftest import make_post, make_user
+from follows import FollowGraph
+from ranking import FeedRanker
+from store import MemoryStore
+
+def _ranker(store, size=1000):
+    return FeedRanker(store, FollowGraph(store), size=size)
+
+def test_top_ranks_by_engagement_newest_first_on_ties():
+    store = MemoryStore()
+    alice = make_user(store)
+    quiet, liked, loved, also_liked = (make_post(store, alice, str(i)) for i in range(4))
+    liked.likes = also_liked.likes = 2
+    loved.loves = 2
+    ranker = _ranker(store)
+    post_ids, next_cursor = ranker.page('top', 0, 3)
+    assert post_ids == [loved.id, also_liked.id, liked.id]
+    assert ranker.page('top', next_cursor, 3) == ([quiet.id], None)
+
+def test_posts_outside_the_window_are_not_ranked():
+    store = MemoryStore()
+    alice = make_user(store)
+    make_post(store, alice, 'old', timestamp='2000-01-01 00:00')
+    new = make_post(store, alice, 'new')
+    assert _ranker(store).page('hot') == ([new.id], None)
+
+def _rows(n):
+    # Scores in a few distinct values, so plenty of ties straddle any top-K boundary
+    created = [time.time() - 60 * (i // 5) for i in range(n)]
+    counts = tuple([i % 3 for i in range(n)] for _ in range(4))
+    return created, [1.0] * n, counts
+
+@pytest.mark.parametrize('size', [1, 7, 10, 25, 100])
+def test_numpy_and_python_rankings_agree(size):
+    pytest.importorskip('numpy')
+    ranker = _ranker(MemoryStore(), size=size)
+    created, boosts, counts = _rows(60)
+    now = time.time()
+    assert ranker._rank_numpy(now, created, boosts, counts) == ranker._rank_python(now, created, boosts, counts)
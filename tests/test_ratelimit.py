@@ -0,0 +1,72 @@
+import pytest
+from flask import Flask
+
+import ratelimit
+from ratelimit import MemoryBuckets, RateLimiter, SQLiteBuckets, parse_overrides, parse_rate
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, 'monotonic', clock)
+    monkeypatch.setattr(ratelimit.time, 'time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def buckets(request, db_path):
+    return MemoryBuckets() if request.param == 'memory' else SQLiteBuckets(db_path)
+
+def test_parse_rate_and_overrides():
+    assert parse_rate('10/minute') == (10 / 60, 10)
+    assert parse_overrides(' login=20/minute, ,search=1/second') == {'login': '20/minute', 'search': '1/second'}
+    with pytest.raises(ValueError):
+        parse_rate('10/fortnight')
+
+def test_bucket_overflows_then_refills(clock, buckets):
+    rate, burst = parse_rate('3/minute')
+    assert [buckets.take('k', rate, burst) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('k', rate, burst) == pytest.approx(20)
+    assert buckets.take('other', rate, burst) == 0
+    clock.now += 20
+    assert buckets.take('k', rate, burst) == 0
+    assert buckets.take('k', rate, burst) > 0
+    # A long idle period refills only up to the burst
+    clock.now += 3600
+    assert [buckets.take('k', rate, burst) == 0 for _ in range(4)] == [True, True, True, False]
+
+def test_memory_buckets_forget_the_idlest_key(clock):
+    buckets = MemoryBuckets(maxsize=2)
+    for key in ('a', 'b', 'c'):
+        buckets.take(key, 1.0, 1)
+    assert 'a' not in buckets._buckets and buckets.take('a', 1.0, 1) == 0
+
+def _app(limiter):
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    @limiter.limit('ping', '2/minute')
+    def ping():
+        return 'pong'
+    return app
+
+def test_overrides_set_after_decoration_apply(clock):
+    limiter = RateLimiter()
+    client = _app(limiter).test_client()
+    limiter.overrides = {'ping': '1/minute'}
+    assert client.get('/ping').status_code == 200
+    rejected = client.get('/ping')
+    assert rejected.status_code == 429
+    assert rejected.headers['Retry-After'] == '60'
+    assert limiter.rejected() == {'ping': 1}
+
+def test_disabled_limiter_lets_everything_through(clock):
+    limiter = RateLimiter(enabled=False)
+    client = _app(limiter).test_client()
+    assert {client.get('/ping').status_code for _ in range(5)} == {200}
+    assert limiter.rejected() == {}
@@ -0,0 +1,83 @@
+import pytest
+from flask import Flask, jsonify
+
+from response_cache import POSTS, USERS, ResponseCache
+from shared_state import SharedVersions
+
+def _app(cache):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.calls = 0
+
+    @app.route('/posts')
+    @cache.cached(POSTS)
+    def posts():
+        app.calls += 1
+        return jsonify(calls=app.calls)
+
+    @app.route('/me')
+    @cache.cached(USERS, per_viewer=True)
+    def me():
+        app.calls += 1
+        return jsonify(calls=app.calls)
+
+    @app.route('/missing')
+    @cache.cached(POSTS)
+    def missing():
+        app.calls += 1
+        return jsonify(error='nope'), 404
+    return app
+
+@pytest.fixture
+def cache():
+    return ResponseCache()
+
+def test_reused_until_its_namespace_is_bumped(cache):
+    app = _app(cache)
+    client = app.test_client()
+    assert client.get('/posts').get_json() == client.get('/posts').get_json() == {'calls': 1}
+    cache.bump(USERS)
+    assert client.get('/posts').get_json() == {'calls': 1}
+    cache.bump(POSTS)
+    assert client.get('/posts').get_json() == {'calls': 2}
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_etag_revalidation_returns_304(cache):
+    client = _app(cache).test_client()
+    first = client.get('/posts')
+    again = client.get('/posts', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert not again.get_data()
+    cache.bump(POSTS)
+    fresh = client.get('/posts', headers={'If-None-Match': first.headers['ETag']})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != first.headers['ETag']
+
+def test_per_viewer_entries_and_errors_are_not_shared(cache):
+    app = _app(cache)
+    alice, bob = app.test_client(), app.test_client()
+    for client, name in ((alice, 'alice'), (bob, 'bob')):
+        with client.session_transaction() as session:
+            session['user_id'] = name
+        client.get('/me')
+    assert alice.get('/me').get_json() == {'calls': 1}
+    assert bob.get('/me').get_json() == {'calls': 2}
+    alice.get('/missing')
+    alice.get('/missing')
+    assert app.calls == 4
+
+def test_shared_versions_invalidate_other_workers(db_path):
+    # Two workers on one database: a bump in one reaches the other on sync
+    one, two = SharedVersions(db_path, sync_interval=0), SharedVersions(db_path, sync_interval=0)
+    one.bump(POSTS)
+    two.sync()
+    before = two.get(POSTS)
+    one.bump(POSTS)
+    assert two.get(POSTS) == before
+    two.sync()
+    assert two.get(POSTS) == before + 1
+
+    # touch only invalidates the worker that calls it
+    users = one.get(USERS)
+    two.touch(USERS)
+    one.sync()
+    assert two.get(USERS) == users + 1 and one.get(USERS) == users
@@ -0,0 +1,114 @@
+import pytest
+from flask import Flask, session
+
+import sessions
+from sessions import MemorySessions, ServerSessionInterface, SQLiteSessions
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, 'time', clock)
+    return clock
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, db_path):
+    return MemorySessions() if request.param == 'memory' else SQLiteSessions(db_path)
+
+def session_app(backend, ttl=100):
+    app = Flask(__name__)
+    app.session_interface = ServerSessionInterface(backend, ttl=ttl)
+
+    @app.route('/login/<user_id>')
+    def login(user_id):
+        session.regenerate()
+        session['user_id'] = user_id
+        return ''
+
+    @app.route('/whoami')
+    def whoami():
+        return session.get('user_id', '')
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return ''
+    return app
+
+def sid(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+def test_backend_save_load_and_revoke(backend, clock):
+    backend.save('a', 'u1', {'user_id': 'u1'}, clock.now + 10)
+    backend.save('b', 'u1', {'user_id': 'u1'}, clock.now + 10)
+    backend.save('c', 'u2', {'user_id': 'u2'}, clock.now + 10)
+    assert backend.load('a') == ({'user_id': 'u1'}, clock.now + 10)
+    assert backend.delete_user('u1') == 2
+    assert backend.load('a') is None and backend.load('b') is None
+    assert backend.load('c') is not None
+    clock.now += 10
+    assert backend.load('c') is None
+
+def test_memory_sessions_are_lru_bounded():
+    backend = MemorySessions(maxsize=2)
+    for name in 'abc':
+        backend.save(name, 'u1', {}, float('inf'))
+    assert backend.load('a') is None
+    assert backend.delete_user('u1') == 2
+
+def test_cookie_carries_only_an_id_that_rotates_on_login(backend, clock):
+    client = session_app(backend).test_client()
+    client.get('/login/u1')
+    first = sid(client)
+    assert 'u1' not in first and backend.load(first)[0] == {'user_id': 'u1'}
+    assert client.get('/whoami').get_data(as_text=True) == 'u1'
+
+    client.get('/login/u1')
+    assert sid(client) != first and backend.load(first) is None
+
+def test_sessions_expire_and_are_extended_while_in_use(backend, clock):
+    client = session_app(backend, ttl=100).test_client()
+    client.get('/login/u1')
+    current = sid(client)
+
+    # Within the first half of the ttl nothing is re-saved
+    clock.now += 40
+    client.get('/whoami')
+    assert backend.load(current)[1] == 1100.0
+    clock.now += 20
+    client.get('/whoami')
+    assert backend.load(current)[1] == 1160.0
+
+    clock.now += 100
+    assert client.get('/whoami').get_data(as_text=True) == ''
+    assert sid(client) is None
+
+def test_logout_and_revocation_end_the_session(backend, clock):
+    app = session_app(backend)
+    client = app.test_client()
+    client.get('/login/u1')
+    current = sid(client)
+    client.get('/logout')
+    assert sid(client) is None and backend.load(current) is None
+
+    client.get('/login/u1')
+    other = app.test_client()
+    other.get('/login/u1')
+    assert app.session_interface.revoke_user('u1') == 2
+    assert client.get('/whoami').get_data(as_text=True) == ''
+    assert other.get('/whoami').get_data(as_text=True) == ''
+
+def test_suspension_signs_the_user_out(login):
+    user = login()
+    admin = login(is_admin=True)
+    assert user.get('/api/current_user').get_json()['username'] == user.user.username
+    response = admin.post('/api/admin/moderate_users', json={'action': 'suspend', 'usernames': [user.user.username]})
+    assert response.get_json()['changed'] == 1
+    assert user.get('/api/current_user').get_json() == {'error': 'Not logged in'}
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from conftest import make_post, make_user
+from models import Message, Report
+from snapshot import SnapshotStore, read_header
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'aura.snap')
+
+def _state(store):
+    """Everything a restart has to bring back, as comparable values"""
+    return {
+        'users': sorted((u.id, u.username, u.bio, u.is_active) for u in store.iter_users()),
+        'follows': sorted(store.iter_follows()),
+        'posts': [(p.id, p.seq, p.content, p.likes, p.loves, p.is_approved)
+                  for p in store.posts_after(0, 1000)],
+        'timeline': [p.id for p in store.timeline_page(limit=100)[0]],
+        'reports': sorted((r.id, r.status) for r in store.iter_reports()),
+        'unread': {u.id: store.unread_count(u.id) for u in store.iter_users()},
+    }
+
+def _populate(store):
+    alice, bob = make_user(store), make_user(store, 'bob')
+    store.add_follow(bob.id, alice.id)
+    posts = [make_post(store, alice, f'post {i}') for i in range(4)]
+    store.apply_reactions({posts[0].id: {'likes': 3, 'loves': 1}})
+    store.set_approved(posts[1], False)
+    store.add_report(Report(posts[2].id, bob.id, 'spam'))
+    store.add_message(Message(alice.id, bob.id, 'hi'))
+    return alice, bob, posts
+
+def test_restart_restores_snapshot_and_log(path):
+    store = SnapshotStore(path)
+    alice, bob, posts = _populate(store)
+    store.snapshot()
+    # Written after the snapshot, so only the log has these
+    store.update_user(alice, bio='updated')
+    store.remove_follow(bob.id, alice.id)
+    store.delete_post(posts[3].id)
+    store.resolve_reports([posts[2].id], 'resolved')
+    later = make_post(store, bob, 'after the snapshot')
+    expected = _state(store)
+    store.close()
+
+    reopened = SnapshotStore(path)
+    try:
+        assert _state(reopened) == expected
+        assert make_post(reopened, alice, 'next').seq > later.seq
+    finally:
+        reopened.close()
+
+def test_snapshot_drops_the_logs_it_covers(path):
+    store = SnapshotStore(path)
+    _populate(store)
+    store.snapshot()
+    make_post(store, store.get_user_by_username('alice'), 'logged')
+    store.snapshot()
+    store.close()
+    assert read_header(path)['generation'] == 2
+    assert sorted(name for name in os.listdir(os.path.dirname(path)) if name.endswith('.log')) == \
+        ['aura.snap.00000002.log']
+
+def test_torn_log_tail_is_truncated(path):
+    store = SnapshotStore(path)
+    alice, _, _ = _populate(store)
+    expected = _state(store)
+    log_path = store._log_path(store.generation)
+    store.close()
+    size = os.path.getsize(log_path)
+    with open(log_path, 'ab') as f:
+        f.write(b'\x40\x00\x00\x00partial frame')
+
+    reopened = SnapshotStore(path)
+    try:
+        assert _state(reopened) == expected
+        assert os.path.getsize(log_path) == size
+        make_post(reopened, alice, 'appended after the repair')
+    finally:
+        reopened.close()
+    again = SnapshotStore(path)
+    try:
+        assert len(again.posts_after(0, 100)) == len(expected['posts']) + 1
+    finally:
+        again.close()
+
+def test_a_second_owner_is_refused(path):
+    store = SnapshotStore(path)
+    try:
+        with pytest.raises(RuntimeError):
+            SnapshotStore(path)
+    finally:
+        store.close()
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+
+from conftest import make_post, make_user
+from models import Report
+from stats import StatsAggregator
+
+def days_ago(n):
+    return (datetime.now() - timedelta(days=n)).isoformat()
+
+def test_seed_keeps_today_whatever_the_user_order(store):
+    # Seeding walks users by created_at but buckets them by last_login
+    make_user(store, 'recent', created_at=days_ago(60), last_login=days_ago(0))
+    for i in range(40):
+        make_user(store, f'user{i}', created_at=days_ago(50 - i), last_login=days_ago(i + 1))
+    snapshot = StatsAggregator(store).snapshot()
+    assert snapshot['active_today'] == 1
+    assert snapshot['total_users'] == 41
+
+def test_buckets_older_than_retention_are_dropped(store):
+    stats = StatsAggregator(store, keep_days=7)
+    stats.snapshot()
+    for i in range(20):
+        stats.on_register(make_user(store, f'user{i}', created_at=days_ago(i), last_login=days_ago(i)))
+    cutoff = (date.today() - timedelta(days=6)).isoformat()
+    assert min(stats.new_users_by_day) >= cutoff
+    assert len(stats.active_by_day) == 7
+    assert stats.snapshot()['new_users_today'] == 1
+
+def test_hooks_only_count_after_seeding(store):
+    user = make_user(store)
+    stats = StatsAggregator(store)
+    # Before the first read the seeding pass sees the post
+    stats.on_post_created(make_post(store, user).user_id)
+    assert stats.snapshot()['total_posts'] == 1
+    post = make_post(store, user)
+    stats.on_post_created(post.user_id)
+    assert stats.post_count(user.id) == 2
+    stats.on_post_deleted(post.user_id)
+    assert stats.snapshot()['total_posts'] == 1
+
+def test_login_marks_user_active_today(store):
+    user = make_user(store, last_login=days_ago(3))
+    stats = StatsAggregator(store)
+    assert stats.snapshot()['active_today'] == 0
+    store.update_user(user, last_login=days_ago(0))
+    stats.on_login(user)
+    stats.on_login(user)
+    assert stats.snapshot()['active_today'] == 1
+
+def test_pending_reports(store):
+    user = make_user(store)
+    post = make_post(store, user)
+    store.add_report(Report(post.id, user.id, 'spam'))
+    stats = StatsAggregator(store)
+    assert stats.snapshot()['pending_reports'] == 1
+    stats.on_report_filed()
+    stats.on_report_resolved(2)
+    assert stats.snapshot()['pending_reports'] == 0
@@ -0,0 +1,89 @@
+from conftest import make_post, make_user
+from models import Message
+
+def test_user_lookups(store):
+    user = make_user(store)
+    assert store.get_user(user.id).username == 'alice'
+    assert store.get_user_by_username('alice').id == user.id
+    assert store.has_username('alice')
+    assert not store.has_username('bob')
+    store.update_user(user, last_login='2024-01-01T00:00:00')
+    assert store.get_user(user.id).last_login == '2024-01-01T00:00:00'
+
+def test_seqs_increase_in_insert_order(store):
+    user = make_user(store)
+    seqs = [make_post(store, user, f'post {i}').seq for i in range(5)]
+    assert seqs == sorted(seqs)
+    assert len(set(seqs)) == 5
+
+def test_deleted_seq_is_not_reused(store):
+    user = make_user(store)
+    make_post(store, user, 'first')
+    second = make_post(store, user, 'second')
+    store.delete_post(second.id)
+    third = make_post(store, user, 'third')
+    assert third.seq > second.seq
+
+def test_timeline_pages_skip_hidden_posts(store):
+    user = make_user(store)
+    posts = [make_post(store, user, f'post {i}') for i in range(5)]
+    store.set_approved(posts[3], False)
+    page, cursor = store.timeline_page(None, 2)
+    assert [post.id for post in page] == [posts[4].id, posts[2].id]
+    page, cursor = store.timeline_page(cursor, 2)
+    assert [post.id for post in page] == [posts[1].id, posts[0].id]
+    assert cursor is None
+
+def test_a_zero_cursor_is_past_the_oldest_post(store):
+    alice, bob = make_user(store), make_user(store, 'bob')
+    make_post(store, alice)
+    store.add_message(Message(alice.id, bob.id, 'hi'))
+    conversation = store.get_conversation(alice.id, bob.id)
+    assert store.timeline_page(0)[0] == []
+    assert store.all_posts_page(0)[0] == []
+    assert store.author_page(alice.id, 0)[0] == []
+    assert store.conversation_page(conversation.id, 0)[0] == []
+    assert store.inbox_page(alice.id, 0)[0] == []
+    assert len(store.timeline_page(None)[0]) == 1
+
+def test_author_page_and_counts(store):
+    alice, bob = make_user(store), make_user(store, 'bob')
+    make_post(store, alice)
+    make_post(store, bob)
+    make_post(store, alice)
+    page, cursor = store.author_page(alice.id, None, 10)
+    assert [post.user_id for post in page] == [alice.id, alice.id]
+    assert cursor is None
+    assert store.count_posts() == 3
+    assert store.count_posts_for_user(bob.id) == 1
+
+def test_posts_after_streams_oldest_first(store):
+    user = make_user(store)
+    posts = [make_post(store, user, f'post {i}') for i in range(5)]
+    first = store.posts_after(0, 3)
+    rest = store.posts_after(first[-1].seq, 3)
+    assert [post.id for post in first + rest] == [post.id for post in posts]
+
+def test_reactions_are_applied_in_batches(store):
+    user = make_user(store)
+    post = make_post(store, user)
+    store.apply_reactions({post.id: {'likes': 2, 'wows': 1}})
+    store.apply_reactions({post.id: {'likes': 1}})
+    assert store.reaction_counts([post.id], ('likes', 'wows')) == {post.id: {'likes': 3, 'wows': 1}}
+
+def test_batch_moderation_returns_changed_posts(store):
+    user = make_user(store)
+    posts = [make_post(store, user, f'post {i}') for i in range(3)]
+    store.set_approved(posts[0], False)
+    changed = store.set_approved_many([post.id for post in posts], False)
+    assert sorted(post.id for post in changed) == sorted(post.id for post in posts[1:])
+    deleted = store.delete_posts([posts[0].id, 'missing'])
+    assert [post.id for post in deleted] == [posts[0].id]
+    assert store.get_post(posts[0].id) is None
+
+def test_post_signals_newest_approved_first(store):
+    user = make_user(store)
+    posts = [make_post(store, user, f'post {i}') for i in range(4)]
+    store.set_approved(posts[2], False)
+    signals = store.post_signals(10)
+    assert [row[1] for row in signals] == [posts[3].id, posts[1].id, posts[0].id]
@@ -0,0 +1,267 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+# '#tag' and '@name' only count at the start of a word, so 'C#', URL
+# fragments and email addresses are left alone.  A hashtag needs at
+# least one non-digit ('#1' is not a topic).
+HASHTAG_RE = re.compile(r'(?<![\w#&/])#(\w*[^\W\d]\w*)')
+MENTION_RE = re.compile(r'(?<![\w@./])@(\w+)')
+MAX_TAG_LENGTH = 64
+# Extra tags or mentions in one post are ignored, which caps the index
+# writes and notifications a single post can cause
+MAX_TAGS = 10
+MAX_MENTIONS = 10
+
+def extract_hashtags(text):
+    """Distinct hashtags in ``text``, lower-cased, in order of first use"""
+    tags = dict.fromkeys(tag.lower() for tag in HASHTAG_RE.findall(text) if len(tag) <= MAX_TAG_LENGTH)
+    return list(tags)[:MAX_TAGS]
+
+def extract_mentions(text):
+    """Distinct ``@username`` mentions in ``text``, as written"""
+    return list(dict.fromkeys(MENTION_RE.findall(text)))[:MAX_MENTIONS]
+
+def normalize_tag(tag):
+    """``'#Aura'`` or ``'aura'`` -> ``'aura'``; None if it is not a valid hashtag"""
+    tags = extract_hashtags('#' + tag.lstrip('#'))
+    return tags[0] if tags and tags[0] == tag.lstrip('#').lower() else None
+
+def parse_timestamp(stamp):
+    """Epoch seconds of a minute-resolution local post timestamp"""
+    return datetime.strptime(stamp, '%Y-%m-%d %H:%M').timestamp()
+
+def post_time(post):
+    return parse_timestamp(post.timestamp)
+
+class HashtagIndex:
+    """Hashtag -> approved posts, maintained as posts are created and moderated.
+
+    Each tag keeps a sorted list of post seqs, so a tag's posts page
+    newest first by cursor like the store's feeds.  SQLite deployments
+    use database.SQLiteHashtagIndex instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = {}
+        self.post_ids = {}
+        self.doc_tags = {}
+
+    def add(self, post, tags=None):
+        tags = extract_hashtags(post.content) if tags is None else tags
+        with self._lock:
+            if post.id in self.doc_tags:
+                self._remove(post.id)
+            if not tags:
+                return
+            self.doc_tags[post.id] = (post.seq, tuple(tags))
+            self.post_ids[post.seq] = post.id
+            for tag in tags:
+                insort(self.postings.setdefault(tag, []), post.seq)
+
+    def remove(self, post):
+        with self._lock:
+            self._remove(post.id)
+
+    def _remove(self, post_id):
+        seq, tags = self.doc_tags.pop(post_id, (None, ()))
+        self.post_ids.pop(seq, None)
+        for tag in tags:
+            seqs = self.postings.get(tag)
+            if seqs is None:
+                continue
+            i = bisect_left(seqs, seq)
+            if i < len(seqs) and seqs[i] == seq:
+                del seqs[i]
+            if not seqs:
+                del self.postings[tag]
+
+    def page(self, tag, before=None, limit=20):
+        """``(post_ids, next_cursor)`` for posts tagged ``tag``, newest first"""
+        with self._lock:
+            seqs = self.postings.get(tag, [])
+            end = bisect_left(seqs, before) if before is not None else len(seqs)
+            start = max(0, end - limit)
+            post_ids = [self.post_ids[s] for s in reversed(seqs[start:end])]
+            next_cursor = seqs[start] if start > 0 else None
+        return post_ids, next_cursor
+
+    def count(self, tag):
+        return len(self.postings.get(tag, ()))
+
+class SpaceSaving:
+    """Approximate counts of the most frequent keys in ``capacity`` slots.
+
+    The Space-Saving algorithm (Metwally et al.): a key arriving when
+    every slot is taken replaces the key with the smallest count and
+    inherits that count, so a count overestimates by at most the count
+    it inherited, and any key seen more than ``total / capacity`` times
+    is always held.  The minimum is found through a heap of
+    ``(count, key)`` entries; an update pushes a fresh entry and stale
+    ones are skipped, as in moderation.ReportQueue.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self._heap = []
+
+    def add(self, key, n=1):
+        self.total += n
+        count = self.counts.get(key)
+        if count is None:
+            count = 0
+            if len(self.counts) >= self.capacity:
+                count, evicted = self._pop_min()
+                del self.counts[evicted]
+        count += n
+        self.counts[key] = count
+        self._push(count, key)
+
+    def discard(self, key, n=1):
+        """Take back ``n`` earlier adds of ``key``, if it is still held"""
+        count = self.counts.get(key)
+        if count is None:
+            return
+        self.total -= min(n, count)
+        if count <= n:
+            del self.counts[key]
+        else:
+            self.counts[key] = count - n
+            self._push(count - n, key)
+
+    def _push(self, count, key):
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 2 * len(self.counts) + 64:
+            self._heap = [(c, k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return count, key
+
+class TrendingTopics:
+    """Hashtags used most over the last ``window`` seconds.
+
+    The window is split into ``bucket``-second slices, each counted by a
+    SpaceSaving sketch of ``capacity`` tags; a slice is dropped whole once
+    it leaves the window.  Memory is therefore fixed at
+    ``window / bucket * capacity`` counters whatever the post volume, and
+    a read merges at most that many counts.  Tags are ranked by their
+    counts with each slice weighted down by its age (halving every
+    ``half_life`` seconds), so a tag that is rising now outranks one that
+    peaked an hour ago.  The ranking is recomputed at most every
+    ``refresh`` seconds.
+
+    Seeded on first read from the store's posts inside the window; after
+    that routes call ``on_post_created``/``on_post_removed``.
+    """
+
+    def __init__(self, store, window=3600, bucket=60, capacity=200, half_life=900, refresh=5.0):
+        self.store = store
+        self.window = window
+        self.bucket = bucket
+        self.capacity = capacity
+        self.half_life = half_life
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        self._built = False
+        self._buckets = {}
+        self._ranking = []
+        self._ranked_at = None
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            self._built = True
+            cutoff = time.time() - self.window
+            before = None
+            while True:
+                posts, before = self.store.all_posts_page(before, 500)
+                for post in posts:
+                    if post_time(post) < cutoff:
+                        return
+                    if post.is_approved:
+                        self._count(post_time(post), extract_hashtags(post.content))
+                if before is None:
+                    return
+
+    def _slot(self, when):
+        return int(when // self.bucket) * self.bucket
+
+    def _count(self, when, tags, discard=False):
+        start = self._slot(when)
+        if start <= time.time() - self.window:
+            return
+        sketch = self._buckets.get(start)
+        if sketch is None:
+            if discard:
+                return
+            sketch = self._buckets[start] = SpaceSaving(self.capacity)
+            self._expire()
+        for tag in tags:
+            if discard:
+                sketch.discard(tag)
+            else:
+                sketch.add(tag)
+
+    def _expire(self):
+        cutoff = time.time() - self.window
+        for start in [s for s in self._buckets if s <= cutoff]:
+            del self._buckets[start]
+
+    # ---------- Write hooks ---------- #
+    # Like StatsAggregator, these only count once the seeding pass has run
+    def on_post_created(self, post, tags=None):
+        tags = extract_hashtags(post.content) if tags is None else tags
+        if tags:
+            with self._lock:
+                if self._built:
+                    self._count(post_time(post), tags)
+
+    def on_post_removed(self, timestamp, tags):
+        """Uncount ``tags`` of a post made at ``timestamp``; the post may be deleted already"""
+        if tags:
+            with self._lock:
+                if self._built:
+                    self._count(parse_timestamp(timestamp), tags, discard=True)
+
+    def reset(self):
+        with self._lock:
+            self._built = False
+            self._buckets.clear()
+            self._ranking = []
+            self._ranked_at = None
+
+    # ---------- Reads ---------- #
+    def top(self, limit=10):
+        """``[(tag, posts_in_window)]`` for the ``limit`` top trending tags"""
+        self._ensure_built()
+        now = time.monotonic()
+        with self._lock:
+            if self._ranked_at is None or now - self._ranked_at >= self.refresh:
+                self._ranking = self._rank()
+                self._ranked_at = now
+            return self._ranking[:limit]
+
+    def _rank(self):
+        self._expire()
+        now = time.time()
+        scores, counts = {}, {}
+        for start, sketch in self._buckets.items():
+            weight = 0.5 ** (max(0.0, now - start) / self.half_life)
+            for tag, count in sketch.counts.items():
+                scores[tag] = scores.get(tag, 0.0) + count * weight
+                counts[tag] = counts.get(tag, 0) + count
+        ranked = sorted(scores, key=lambda tag: (-scores[tag], tag))
+        return [(tag, counts[tag]) for tag in ranked[:self.capacity]]